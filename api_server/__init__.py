@@ -5,7 +5,10 @@ from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
 
 from gpt_client import GPTClient, GPTRequest, GPTResponse
-from app.ingestion.cli import run_ingestion
+from app.ingestion.jobs import JobManager
+from app.ingestion.registry import REGISTRY
+from bot.core.response_cache import ResponseCache, make_cache_key
+from bot.core.singleflight import SingleFlight
 
 # Fallback if python-dotenv is not available
 try:
@@ -24,6 +27,25 @@ app = FastAPI(
 # Initialize GPT client
 gpt_client = GPTClient()
 
+# Cache for repeated low-temperature (or explicitly cached) prompts
+API_CACHE_SIZE = int(os.getenv("API_CACHE_SIZE", "512"))
+response_cache = (
+    ResponseCache(
+        max_entries=API_CACHE_SIZE,
+        ttl_seconds=float(os.getenv("API_CACHE_TTL_SECONDS", "3600")),
+        db_path=os.getenv("API_CACHE_DB") or None,
+        max_temperature=float(os.getenv("API_CACHE_MAX_TEMPERATURE", "0.2")),
+    )
+    if API_CACHE_SIZE > 0
+    else None
+)
+
+# Identical concurrent cacheable /gpt prompts share one upstream call
+inflight_requests = SingleFlight()
+
+# Ingestion runs off the event loop as background jobs
+ingestion_jobs = JobManager()
+
 
 class HealthResponse(BaseModel):
     message: str
@@ -64,8 +86,30 @@ async def gpt_endpoint(request: GPTRequest):
             detail="GPT service unavailable. OpenAI API key not configured."
         )
     
+    request_key = make_cache_key(
+        "openai",
+        request.model,
+        [{"role": "user", "content": request.prompt}],
+        request.temperature,
+        request.max_tokens,
+    )
+    cacheable = response_cache is not None and response_cache.is_cacheable(
+        request.temperature, request.cache
+    )
+    if cacheable:
+        cached = response_cache.get(request_key)
+        if cached is not None:
+            return GPTResponse(**cached)
+
     try:
-        response = await gpt_client.generate_response(request)
+        if cacheable:
+            # Only callers that accept a reused answer share an in-flight call
+            response = await inflight_requests.do(
+                request_key, lambda: gpt_client.generate_response(request)
+            )
+            response_cache.set(request_key, response.model_dump())
+        else:
+            response = await gpt_client.generate_response(request)
         return response
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -73,31 +117,35 @@ async def gpt_endpoint(request: GPTRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/v1/sources/{source}/sync")
+@app.post("/v1/sources/{source}/sync", status_code=202)
 async def sync_ingestion(
-    source: str, limit: Optional[int] = Query(default=None, ge=1, description="Limit processed items")
+    source: str,
+    limit: Optional[int] = Query(default=None, ge=1, description="Limit processed items"),
+    workers: Optional[int] = Query(default=None, ge=1, le=32, description="Concurrent downloads"),
 ) -> Dict[str, Any]:
+    """Start an ingestion job in the background and return its id."""
     normalized_source = source.lower()
-    try:
-        result = run_ingestion(normalized_source, limit=limit)
-    except ValueError as exc:
-        raise HTTPException(status_code=404, detail=str(exc)) from exc
-    except ImportError as exc:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Missing dependency for ingestion: {exc}",
-        ) from exc
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=f"Ingestion failed: {exc}") from exc
+    if normalized_source not in REGISTRY:
+        raise HTTPException(status_code=404, detail=f"Unknown ingestion source: {source}")
 
+    job = ingestion_jobs.submit(normalized_source, limit=limit, workers=workers)
     return {
-        "status": "ok",
-        "source": result["source"],
-        "count": result["count"],
-        "index_path": result["index_path"],
+        "status": "accepted",
+        "job_id": job.id,
+        "source": normalized_source,
+        "status_url": f"/v1/jobs/{job.id}",
     }
 
 
+@app.get("/v1/jobs/{job_id}")
+async def get_ingestion_job(job_id: str) -> Dict[str, Any]:
+    """Report the status, progress and throughput of an ingestion job."""
+    job = ingestion_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job.to_dict()
+
+
 if __name__ == "__main__":
     # Try to import uvicorn, fall back to basic message if not available
     try:
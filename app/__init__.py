@@ -1,3 +1,3 @@
 """Application package for Top-TieR Global HUB AI services."""
 
-__all__ = ["ingestion"]
+__all__ = ["ingestion", "rag"]
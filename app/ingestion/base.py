@@ -2,37 +2,212 @@
 
 from __future__ import annotations
 
+import multiprocessing
+import os
+import threading
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+DEFAULT_WORKERS = int(os.getenv("INGESTION_WORKERS", "1"))
+DEFAULT_PARSE_PROCESSES = int(os.getenv("INGESTION_PARSE_PROCESSES", "0"))
+
+
+@dataclass
+class ItemResult:
+    """Outcome of one discovery item, in discovery order."""
+
+    index: int
+    item: Dict
+    record: Optional[Dict] = None
+    error: Optional[str] = None
+    fetched: Any = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def skipped(self) -> bool:
+        """Processed without error but produced no record (e.g. unchanged)."""
+        return self.error is None and not self.record
 
 
 class BaseIngestor(ABC):
-    """Abstract base class for ingestion pipelines."""
+    """Abstract base class for ingestion pipelines.
+
+    Sources either implement ``fetch_and_parse`` in one step, or split it into
+    ``fetch`` (network/disk I/O, run on a thread pool) and ``parse`` (CPU-bound,
+    optionally run on a process pool). ``run`` processes items serially by
+    default and concurrently when ``workers`` > 1. ``fetch`` may return
+    ``None`` to skip an item (for example when it has not changed).
+    """
 
     name: str = "base"
+    # Attributes that stay behind when the ingestor is pickled to a parse process
+    transient_attrs: Tuple[str, ...] = ("_local",)
 
     @abstractmethod
     def discover(self) -> List[Dict]:
         """Return a list of discovery items (title, url, metadata)."""
         raise NotImplementedError
 
-    @abstractmethod
-    def fetch_and_parse(self, item: Dict) -> Dict:
-        """Fetch a single discovery item and convert it to a structured record."""
+    def fetch(self, item: Dict) -> Any:
+        """Download a discovery item; the result is handed to ``parse``."""
+        raise NotImplementedError
+
+    def parse(self, item: Dict, fetched: Any) -> Optional[Dict]:
+        """Convert fetched data to a structured record (must be picklable)."""
         raise NotImplementedError
 
-    def run(self, limit: Optional[int] = None) -> List[Dict]:
-        """Execute the ingestion pipeline for the configured source."""
+    def fetch_and_parse(self, item: Dict) -> Optional[Dict]:
+        """Fetch a single discovery item and convert it to a structured record."""
+        return self.parse(item, self.fetch(item))
+
+    @property
+    def session(self) -> requests.Session:
+        """HTTP session of the calling thread (reused across its items)."""
+        local = self.__dict__.get("_local")
+        if local is None:
+            local = self.__dict__.setdefault("_local", threading.local())
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        return session
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Thread-local sessions stay behind when parse runs in another process
+        state = self.__dict__.copy()
+        for attr in self.transient_attrs:
+            state.pop(attr, None)
+        return state
+
+    def _is_two_phase(self) -> bool:
+        return type(self).fetch is not BaseIngestor.fetch
+
+    def _process(self, item: Dict, parse_pool: Optional[Executor]) -> Tuple[Optional[Dict], Any]:
+        if not self._is_two_phase():
+            return self.fetch_and_parse(item), None
+        fetched = self.fetch(item)
+        if fetched is None:
+            return None, None
+        if parse_pool is None:
+            return self.parse(item, fetched), fetched
+        return parse_pool.submit(self.parse, item, fetched).result(), fetched
+
+    def commit(self, result: ItemResult) -> None:
+        """Hook called on the caller's thread for each item processed without error."""
+
+    def checkpoint(self) -> None:
+        """Hook called after emitted records have been durably written."""
+
+    def iter_results(
+        self,
+        items: List[Dict],
+        workers: Optional[int] = None,
+        processes: Optional[int] = None,
+    ) -> Iterator[ItemResult]:
+        """Process items and yield their results in input order.
+
+        Args:
+            items: Discovery items
+            workers: Concurrent fetches (1 = serial)
+            processes: Parse worker processes (0 = parse in the fetch thread)
+        """
+        workers = DEFAULT_WORKERS if workers is None else max(1, workers)
+        processes = DEFAULT_PARSE_PROCESSES if processes is None else max(0, processes)
+
+        if workers == 1 and processes == 0:
+            for index, item in enumerate(items):
+                yield self._result(index, item, lambda: self._process(item, None))
+            return
+
+        use_processes = processes > 0 and self._is_two_phase()
+        # "spawn": parse workers are started from fetch threads, where fork is unsafe
+        parse_context = (
+            ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn"))
+            if use_processes
+            else nullcontext()
+        )
+        with ThreadPoolExecutor(workers, thread_name_prefix=f"ingest-{self.name}") as fetch_pool, \
+                parse_context as parse_pool:
+            # Bounded window: at most 2x workers items are held at once
+            window: Deque[Tuple[int, Dict, Future]] = deque()
+            for index, item in enumerate(items):
+                window.append((index, item, fetch_pool.submit(self._process, item, parse_pool)))
+                if len(window) >= workers * 2:
+                    yield self._collect(*window.popleft())
+            while window:
+                yield self._collect(*window.popleft())
+
+    def _collect(self, index: int, item: Dict, future: Future) -> ItemResult:
+        return self._result(index, item, future.result)
+
+    def _result(self, index: int, item: Dict, compute) -> ItemResult:
+        try:
+            record, fetched = compute()
+            return ItemResult(index, item, record=record, fetched=fetched)
+        except Exception as exc:  # per-item errors never stop the run
+            print(f"[{self.name}] خطأ في {item.get('url')}: {exc}")
+            return ItemResult(index, item, error=str(exc))
+
+    def iter_records(
+        self,
+        limit: Optional[int] = None,
+        workers: Optional[int] = None,
+        processes: Optional[int] = None,
+        on_result: Optional[Callable[[ItemResult], None]] = None,
+    ) -> Iterator[Dict]:
+        """Stream the records of the configured source in discovery order.
+
+        Only a bounded window of items is in memory at a time. ``self.total``
+        is set once discovery finishes; failed items are collected in
+        ``self.errors`` as ``{"url", "title", "error"}`` dicts and items that
+        produced no record are counted in ``self.skipped``. ``on_result`` is
+        called for every item (including failed and skipped ones) before its
+        record is yielded.
+        """
 
         items = self.discover()
         if limit is not None:
             items = items[:limit]
-        results: List[Dict] = []
-        for candidate in items:
-            try:
-                record = self.fetch_and_parse(candidate)
-                if record:
-                    results.append(record)
-            except Exception as exc:  # pragma: no cover - defensive logging
-                print(f"[{self.name}] خطأ في {candidate.get('url')}: {exc}")
-        return results
+        self.total = len(items)
+        self.errors: List[Dict] = []
+        self.skipped = 0
+        for result in self.iter_results(items, workers=workers, processes=processes):
+            if on_result:
+                on_result(result)
+            if result.error is not None:
+                self.errors.append(
+                    {"url": result.item.get("url"), "title": result.item.get("title"), "error": result.error}
+                )
+                continue
+            if result.record:
+                yield result.record
+                # Committed only once the consumer has taken the record
+                self.commit(result)
+            else:
+                self.skipped += 1
+                self.commit(result)
+
+    def run(
+        self,
+        limit: Optional[int] = None,
+        workers: Optional[int] = None,
+        processes: Optional[int] = None,
+    ) -> List[Dict]:
+        """Execute the ingestion pipeline and collect every record.
+
+        Prefer ``iter_records`` for large sources; this keeps all records
+        (with their full text) in memory. ``checkpoint`` runs once every
+        record has been handed back to the caller.
+        """
+
+        records = list(self.iter_records(limit=limit, workers=workers, processes=processes))
+        self.checkpoint()
+        return records
@@ -5,10 +5,15 @@ from __future__ import annotations
 import argparse
 import json
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
+from app.ingestion.base import ItemResult
 from app.ingestion.registry import REGISTRY, get_ingestor
 
+FLUSH_EVERY = max(1, int(os.getenv("INGESTION_FLUSH_EVERY", "20")))
+FSYNC_EVERY = max(1, int(os.getenv("INGESTION_FSYNC_EVERY", "200")))
+UPDATE_SEARCH_INDEX = os.getenv("INGESTION_UPDATE_SEARCH_INDEX", "false").lower() == "true"
+
 
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Unified ingestion runner")
@@ -22,44 +27,154 @@ def build_parser() -> argparse.ArgumentParser:
         ),
         help="Path to the JSONL index file",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Concurrent downloads (env INGESTION_WORKERS, default 1 = serial)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="Processes for PDF parsing (env INGESTION_PARSE_PROCESSES, default 0)",
+    )
+    parser.add_argument(
+        "--update-index",
+        action="store_true",
+        default=UPDATE_SEARCH_INDEX,
+        help="Update the JSONL search index after the run (env INGESTION_UPDATE_SEARCH_INDEX)",
+    )
     return parser
 
 
 def run_ingestion(
-    source: str, limit: Optional[int] = None, index_jsonl: Optional[str] = None
+    source: str,
+    limit: Optional[int] = None,
+    index_jsonl: Optional[str] = None,
+    workers: Optional[int] = None,
+    processes: Optional[int] = None,
+    on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    update_index: Optional[bool] = None,
 ) -> Dict[str, Any]:
+    """Stream a source's records into the JSONL index and return a summary.
+
+    Records are appended as they are produced, so memory stays bounded by the
+    ingestor's in-flight window. The file is flushed every ``FLUSH_EVERY``
+    records and fsynced every ``FSYNC_EVERY`` records, after which the
+    ingestor's ``checkpoint`` hook runs. ``on_progress`` receives a copy of
+    the cursor after every processed item; ``end_offset`` in the cursor is
+    the durable (fsynced) end of the file. The summary holds counts and the
+    final cursor, not the records. With ``update_index`` (default
+    ``INGESTION_UPDATE_SEARCH_INDEX``) the ``app.rag.jsonl_index`` search
+    index is brought up to date afterwards.
+    """
     if index_jsonl is None:
         index_jsonl = os.getenv(
             "CIRCULARS_INDEX",
             "data/sama_regulations/sama_circulars.index.jsonl",
         )
+    if update_index is None:
+        update_index = UPDATE_SEARCH_INDEX
 
     ingestor = get_ingestor(source)
-    records = ingestor.run(limit=limit)
 
     directory = os.path.dirname(index_jsonl)
     if directory:
         os.makedirs(directory, exist_ok=True)
 
-    with open(index_jsonl, "a", encoding="utf-8") as handle:
+    cursor: Dict[str, Any] = {
+        "total": None,
+        "processed": 0,
+        "fetched": 0,
+        "parsed": 0,
+        "skipped": 0,
+        "failed": 0,
+        "last_doc_id": None,
+        "start_offset": None,
+        "end_offset": None,
+    }
+
+    def report() -> None:
+        if on_progress:
+            on_progress(dict(cursor))
+
+    def track(result: ItemResult) -> None:
+        cursor["total"] = getattr(ingestor, "total", None)
+        cursor["processed"] += 1
+        if result.error is not None:
+            cursor["failed"] += 1
+        else:
+            cursor["fetched"] += 1
+            if result.record:
+                cursor["parsed"] += 1
+                cursor["last_doc_id"] = result.record.get("doc_id")
+            else:
+                cursor["skipped"] += 1
+        report()
+
+    def sync(handle) -> None:
+        handle.flush()
+        os.fsync(handle.fileno())
+        ingestor.checkpoint()
+        cursor["end_offset"] = handle.tell()
+
+    count = 0
+    with open(index_jsonl, "ab") as handle:
+        cursor["start_offset"] = cursor["end_offset"] = handle.tell()
+        records = ingestor.iter_records(
+            limit=limit, workers=workers, processes=processes, on_result=track
+        )
         for record in records:
-            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+            handle.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            count += 1
+            if count % FSYNC_EVERY == 0:
+                sync(handle)
+            elif count % FLUSH_EVERY == 0:
+                handle.flush()
+        cursor["total"] = getattr(ingestor, "total", cursor["processed"])
+        sync(handle)
+        report()
+
+    search_indexed = None
+    if update_index:
+        # Only the records appended by this run are tokenized
+        try:
+            from app.rag.jsonl_index import JsonlIndex
+
+            search_indexed = JsonlIndex(index_jsonl).update()
+        except Exception as exc:  # the JSONL stays authoritative; rebuild later
+            print(f"[{ingestor.name}] تعذر تحديث فهرس البحث: {exc}")
 
     return {
         "source": ingestor.name,
-        "count": len(records),
+        "count": count,
         "index_path": index_jsonl,
-        "records": records,
+        "errors": ingestor.errors,
+        "skipped": ingestor.skipped,
+        "cursor": cursor,
+        "search_indexed": search_indexed,
     }
 
 
 def main(argv: Optional[List[str]] = None) -> None:
     parser = build_parser()
     args = parser.parse_args(argv)
-    result = run_ingestion(args.source, args.limit, args.index_jsonl)
+    result = run_ingestion(
+        args.source,
+        args.limit,
+        args.index_jsonl,
+        workers=args.workers,
+        processes=args.processes,
+        update_index=args.update_index,
+    )
     print(
         f"[{result['source']}] تم حفظ {result['count']} سجل/سجلات في {result['index_path']}"
     )
+    if result["skipped"]:
+        print(f"[{result['source']}] تم تخطي {result['skipped']} مستند/مستندات دون تغيير")
+    if result["errors"]:
+        print(f"[{result['source']}] تعذر معالجة {len(result['errors'])} عنصر/عناصر")
 
 
 if __name__ == "__main__":  # pragma: no cover - CLI entry point
@@ -0,0 +1,150 @@
+"""Background ingestion jobs with per-source concurrency limits."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional
+
+from app.ingestion.cli import run_ingestion
+
+DEFAULT_MAX_JOBS = int(os.getenv("INGESTION_MAX_JOBS", "4"))
+DEFAULT_PER_SOURCE = int(os.getenv("INGESTION_JOBS_PER_SOURCE", "1"))
+DEFAULT_KEEP_JOBS = int(os.getenv("INGESTION_KEEP_JOBS", "100"))
+
+
+@dataclass
+class IngestionJob:
+    """State of one ingestion run, updated from its worker thread."""
+
+    id: str
+    source: str
+    params: Dict[str, Any]
+    status: str = "queued"  # queued -> running -> succeeded | failed
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: Dict[str, Any] = field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        progress = dict(self.progress)
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        processed = progress.get("processed", 0)
+        return {
+            "job_id": self.id,
+            "source": self.source,
+            "params": self.params,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": {
+                "discovered": progress.get("total"),
+                "processed": processed,
+                "fetched": progress.get("fetched", 0),
+                "parsed": progress.get("parsed", 0),
+                "skipped": progress.get("skipped", 0),
+                "failed": progress.get("failed", 0),
+                "last_doc_id": progress.get("last_doc_id"),
+            },
+            "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+            "items_per_second": round(processed / elapsed, 3) if elapsed else None,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Runs ingestion jobs on a thread pool, at most ``per_source`` per source.
+
+    Jobs beyond a source's limit wait in a per-source queue and are handed to
+    the pool when a running job of that source finishes, so a waiting job
+    never holds a worker thread. Only the newest ``keep`` finished jobs are
+    retained.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_MAX_JOBS,
+        per_source: int = DEFAULT_PER_SOURCE,
+        keep: int = DEFAULT_KEEP_JOBS,
+        runner: Callable[..., Dict[str, Any]] = run_ingestion,
+    ):
+        self.per_source = max(1, per_source)
+        self.keep = max(1, keep)
+        self.runner = runner
+        self._executor = ThreadPoolExecutor(max(1, max_workers), thread_name_prefix="ingest-job")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._running: Dict[str, int] = {}
+        self._pending: Dict[str, Deque[IngestionJob]] = {}
+
+    def submit(self, source: str, **params: Any) -> IngestionJob:
+        job = IngestionJob(id=uuid.uuid4().hex, source=source, params=params)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._pending.setdefault(source, deque()).append(job)
+            self._dispatch(source)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses: Dict[str, int] = {}
+            for job in self._jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+            return {"jobs": len(self._jobs), "running_by_source": dict(self._running), **statuses}
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _dispatch(self, source: str) -> None:
+        # Caller holds the lock
+        pending = self._pending.get(source)
+        while pending and self._running.get(source, 0) < self.per_source:
+            job = pending.popleft()
+            self._running[source] = self._running.get(source, 0) + 1
+            self._executor.submit(self._run, job)
+
+    def _run(self, job: IngestionJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+
+        def on_progress(cursor: Dict[str, Any]) -> None:
+            job.progress = cursor
+
+        try:
+            job.result = self.runner(job.source, on_progress=on_progress, **job.params)
+            job.status = "succeeded"
+        except Exception as exc:  # reported through the job, never raised
+            print(f"[jobs] فشلت مهمة {job.id} ({job.source}): {exc}")
+            job.error = f"{type(exc).__name__}: {exc}"
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._running[job.source] -= 1
+                self._dispatch(job.source)
+                self._prune()
+
+    def _prune(self) -> None:
+        # Caller holds the lock; drops the oldest finished jobs beyond ``keep``
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[: max(0, len(finished) - self.keep)]:
+            del self._jobs[job_id]
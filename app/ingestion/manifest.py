@@ -0,0 +1,70 @@
+"""Per-source manifest of ingested documents for incremental runs."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from app.ingestion.utils import now_iso
+
+
+class IngestionManifest:
+    """JSON map of ``doc_id`` to the validators of the last ingested version.
+
+    Entries hold the source URL, the HTTP ``etag``/``last_modified`` validators
+    and the ``pdf_sha1``/``text_sha1`` digests. Updates are thread-safe and
+    ``save`` replaces the file atomically.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as handle:
+                    self._entries = json.load(handle)
+            except (OSError, ValueError) as exc:
+                print(f"[manifest] تعذر قراءة {path}، سيتم البدء من جديد: {exc}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(doc_id)
+            return dict(entry) if entry else None
+
+    def update(self, doc_id: str, **fields: Any) -> None:
+        """Merge fields into an entry (``None`` values are ignored)."""
+        with self._lock:
+            entry = self._entries.setdefault(doc_id, {})
+            entry.update({key: value for key, value in fields.items() if value is not None})
+            entry["updated_at"] = now_iso()
+            self._dirty = True
+
+    def conditional_headers(self, doc_id: str) -> Dict[str, str]:
+        """``If-None-Match``/``If-Modified-Since`` headers for a known document."""
+        entry = self.get(doc_id) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                json.dump(self._entries, handle, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
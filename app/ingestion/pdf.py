@@ -0,0 +1,154 @@
+"""Page-parallel PDF text extraction with a text cache keyed by ``pdf_sha1``."""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+try:  # pragma: no cover - optional dependency guard
+    import fitz  # type: ignore
+except ImportError as exc:  # pragma: no cover - handled lazily
+    fitz = None  # type: ignore
+    _FITZ_IMPORT_ERROR = exc
+else:
+    _FITZ_IMPORT_ERROR = None
+
+# Bump when normalization changes so cached text is re-extracted
+NORMALIZE_VERSION = 1
+
+# Page-parallel extraction is opt-in; 0/1 extracts in the calling process
+DEFAULT_PROCESSES = int(os.getenv("PDF_EXTRACT_PROCESSES", "0"))
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+CACHE_DIR = os.getenv("PDF_TEXT_CACHE_DIR", "data/cache/pdf_text")
+
+_CRLF_RE = re.compile(r"\r\n?")
+_SPACES_RE = re.compile(r"[ \t]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_size = 0
+_pool_lock = threading.Lock()
+
+
+def _require_fitz() -> None:
+    if fitz is None:  # pragma: no cover - executed only when dependency missing
+        raise ImportError("PyMuPDF is required for PDF parsing") from _FITZ_IMPORT_ERROR
+
+
+def normalize_page(text: str) -> str:
+    """Normalize line endings and runs of spaces within one page."""
+    return _SPACES_RE.sub(" ", _CRLF_RE.sub("\n", text))
+
+
+def join_pages(pages: List[str]) -> str:
+    """Join normalized pages; blank-line runs may span page boundaries."""
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(pages).strip())
+
+
+def page_ranges(page_count: int, parts: int) -> List[Tuple[int, int]]:
+    """Split ``[0, page_count)`` into at most ``parts`` contiguous ranges."""
+    parts = max(1, min(parts, page_count))
+    size, extra = divmod(page_count, parts)
+    ranges, start = [], 0
+    for index in range(parts):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def page_count(pdf_path: str) -> int:
+    _require_fitz()
+    with fitz.open(pdf_path) as doc:  # type: ignore[attr-defined]
+        return doc.page_count
+
+
+def extract_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """Extract and normalize pages ``[start, end)``; runs in worker processes."""
+    _require_fitz()
+    with fitz.open(pdf_path) as doc:  # type: ignore[attr-defined]
+        return [normalize_page(doc[index].get_text("text")) for index in range(start, end)]
+
+
+def _get_pool(processes: int) -> ProcessPoolExecutor:
+    global _pool, _pool_size
+    with _pool_lock:
+        if _pool is None or _pool_size != processes:
+            if _pool is not None:
+                # Queued ranges still finish on the old workers
+                _pool.shutdown(wait=False)
+            # "spawn": extraction is started from ingestion threads, where fork is unsafe
+            _pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("spawn"))
+            _pool_size = processes
+        return _pool
+
+
+class TextCache:
+    """Extracted text stored on disk as ``<dir>/<sha1[:2]>/<sha1>.v<N>.txt``."""
+
+    def __init__(self, directory: str = CACHE_DIR):
+        self.directory = directory
+
+    def path(self, pdf_sha1: str) -> str:
+        return os.path.join(self.directory, pdf_sha1[:2], f"{pdf_sha1}.v{NORMALIZE_VERSION}.txt")
+
+    def get(self, pdf_sha1: str) -> Optional[str]:
+        try:
+            with open(self.path(pdf_sha1), "r", encoding="utf-8") as handle:
+                return handle.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, pdf_sha1: str, text: str) -> None:
+        path = self.path(pdf_sha1)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            handle.write(text)
+        os.replace(tmp_path, path)
+
+
+def extract_text(
+    pdf_path: str,
+    pdf_sha1: Optional[str] = None,
+    processes: Optional[int] = None,
+    cache: Optional[TextCache] = None,
+) -> str:
+    """Extract normalized text from a PDF.
+
+    Args:
+        pdf_path: Path of the PDF on disk
+        pdf_sha1: Digest of the PDF bytes; enables the text cache when given
+        processes: Worker processes for page ranges (<= 1 extracts in-process);
+            ignored inside a child process such as an ingestion parse worker
+        cache: Text cache (default: one rooted at ``PDF_TEXT_CACHE_DIR``)
+    """
+    if pdf_sha1:
+        cache = cache or TextCache()
+        cached = cache.get(pdf_sha1)
+        if cached is not None:
+            return cached
+
+    processes = DEFAULT_PROCESSES if processes is None else processes
+    if multiprocessing.parent_process() is not None:
+        # Already one of several parse workers; a nested pool would multiply them
+        processes = 0
+    count = page_count(pdf_path)
+    if processes <= 1 or count < PARALLEL_MIN_PAGES:
+        pages = extract_range(pdf_path, 0, count)
+    else:
+        pool = _get_pool(processes)
+        futures = [
+            pool.submit(extract_range, pdf_path, start, end)
+            for start, end in page_ranges(count, processes)
+        ]
+        pages = [page for future in futures for page in future.result()]
+
+    text = join_pages(pages)
+    if pdf_sha1:
+        cache.put(pdf_sha1, text)
+    return text
@@ -2,12 +2,11 @@
 
 from __future__ import annotations
 
+import hashlib
 import os
 from typing import Dict, List, Optional
 from urllib.parse import urljoin
 
-import requests
-
 try:  # pragma: no cover - optional dependency guard
     from bs4 import BeautifulSoup
 except ImportError as exc:  # pragma: no cover - handled lazily
@@ -16,7 +15,8 @@ except ImportError as exc:  # pragma: no cover - handled lazily
 else:
     _BS4_IMPORT_ERROR = None
 
-from app.ingestion.base import BaseIngestor
+from app.ingestion.base import BaseIngestor, ItemResult
+from app.ingestion.manifest import IngestionManifest
 from app.ingestion.utils import (
     ensure_dir,
     now_iso,
@@ -33,19 +33,25 @@ CIRCULARS_URL = os.getenv(
     "https://www.sama.gov.sa/ar-sa/RulesInstructions/Pages/Circulars.aspx",
 )
 OUT_DIR = os.getenv("SAMA_OUT_DIR", "data/sama_regulations")
+MANIFEST_PATH = os.getenv("SAMA_MANIFEST", os.path.join(OUT_DIR, "manifest.json"))
 HEADERS = {"User-Agent": "MotebAI-Ingestor/1.0"}
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
 
 
 class SamaIngestor(BaseIngestor):
     """Ingestor responsible for SAMA circular documents."""
 
     name = "sama"
+    transient_attrs = ("_local", "manifest")
+
+    def __init__(self, manifest_path: Optional[str] = None):
+        self.manifest = IngestionManifest(manifest_path or MANIFEST_PATH)
 
     def discover(self) -> List[Dict]:
         if BeautifulSoup is None:  # pragma: no cover - executed only when dependency missing
             raise ImportError("beautifulsoup4 is required for discovery") from _BS4_IMPORT_ERROR
 
-        response = requests.get(CIRCULARS_URL, headers=HEADERS, timeout=30)
+        response = self.session.get(CIRCULARS_URL, headers=HEADERS, timeout=30)
         response.raise_for_status()
         soup = BeautifulSoup(response.text, "html.parser")
 
@@ -68,47 +74,109 @@ class SamaIngestor(BaseIngestor):
             unique.append(candidate)
         return unique
 
+    def checkpoint(self) -> None:
+        self.manifest.save()
+
     def _download_pdf(
-        self, session: requests.Session, url: str, pdf_path: str
-    ) -> Optional[bytes]:
-        response = session.get(url, headers=HEADERS, timeout=60, stream=True)
+        self, url: str, pdf_path: str, conditional: Optional[Dict[str, str]] = None
+    ) -> Optional[Dict]:
+        """Stream a PDF to disk, hashing it on the way.
+
+        Returns ``None`` for non-PDF responses, ``{"not_modified": True}`` for
+        a 304, otherwise the SHA-1 and the response's HTTP validators.
+        """
+        response = self.session.get(
+            url, headers={**HEADERS, **(conditional or {})}, timeout=60, stream=True
+        )
+        if response.status_code == 304:
+            response.close()
+            return {"not_modified": True}
         response.raise_for_status()
         content_type = response.headers.get("Content-Type", "").lower()
-        if "pdf" in content_type or url.lower().endswith(".pdf"):
-            payload = response.content
-            with open(pdf_path, "wb") as handle:
-                handle.write(payload)
-            return payload
-        return None
-
-    def fetch_and_parse(self, item: Dict) -> Dict:
+        if "pdf" not in content_type and not url.lower().endswith(".pdf"):
+            response.close()
+            return None
+
+        digest = hashlib.sha1()
+        partial_path = f"{pdf_path}.part"
+        with open(partial_path, "wb") as handle:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+                handle.write(chunk)
+        os.replace(partial_path, pdf_path)
+        return {
+            "not_modified": False,
+            "pdf_sha1": digest.hexdigest(),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+    def fetch(self, item: Dict) -> Optional[Dict]:
         ensure_dir(OUT_DIR)
-        base_name = slugify(item["title"]) or sha1_text(item["url"])
+        doc_id = sha1_text(item["url"])
+        base_name = slugify(item["title"]) or doc_id
         pdf_path = os.path.join(OUT_DIR, f"{base_name}.pdf")
         json_path = os.path.join(OUT_DIR, f"{base_name}.json")
+        entry = self.manifest.get(doc_id) or {}
+        fetched = {"doc_id": doc_id, "pdf_path": pdf_path, "json_path": json_path}
+
+        if os.path.exists(pdf_path) and not entry:
+            # Downloaded before the manifest existed: hash once, then track it
+            with open(pdf_path, "rb") as source:
+                fetched["pdf_sha1"] = sha1_bytes(source.read())
+            return fetched
+
+        # Conditional GET only when the local copy can stand in for a 304
+        conditional = self.manifest.conditional_headers(doc_id) if os.path.exists(pdf_path) else {}
+        download = self._download_pdf(item["url"], pdf_path, conditional)
+        if download is None:
+            raise RuntimeError("ليس PDF")
+        if download["not_modified"]:
+            return None
+
+        if entry.get("text_sha1") and entry.get("pdf_sha1") == download["pdf_sha1"]:
+            # Same bytes without validator support: refresh validators, skip parsing
+            self.manifest.update(doc_id, etag=download["etag"], last_modified=download["last_modified"])
+            return None
+
+        fetched.update(
+            pdf_sha1=download["pdf_sha1"],
+            etag=download["etag"],
+            last_modified=download["last_modified"],
+            previous_text_sha1=entry.get("text_sha1"),
+        )
+        return fetched
+
+    def parse(self, item: Dict, fetched: Dict) -> Optional[Dict]:
+        text = pdf_to_text(fetched["pdf_path"], pdf_sha1=fetched["pdf_sha1"])
+        text_sha1 = sha1_text(text)
+        if text_sha1 == fetched.get("previous_text_sha1"):
+            return None  # new PDF bytes, same text: nothing to re-emit
 
-        with requests.Session() as session:
-            if not os.path.exists(pdf_path):
-                content = self._download_pdf(session, item["url"], pdf_path)
-                if content is None:
-                    raise RuntimeError("ليس PDF")
-                pdf_sha1 = sha1_bytes(content)
-            else:
-                with open(pdf_path, "rb") as source:
-                    pdf_sha1 = sha1_bytes(source.read())
-
-        text = pdf_to_text(pdf_path)
         record = {
-            "doc_id": sha1_text(item["url"]),
+            "doc_id": fetched["doc_id"],
             "title": item["title"],
             "source_url": item["url"],
             "source_type": "pdf",
             "language": "ar",
             "ingested_at": now_iso(),
-            "pdf_sha1": pdf_sha1,
-            "text_sha1": sha1_text(text),
+            "pdf_sha1": fetched["pdf_sha1"],
+            "text_sha1": text_sha1,
             "content": text,
             "regulatory_guess": {"jurisdiction": "KSA", "regulator": "SAMA"},
         }
-        save_json(json_path, record)
+        save_json(fetched["json_path"], record)
         return record
+
+    def commit(self, result: ItemResult) -> None:
+        fetched = result.fetched
+        if not fetched:
+            return
+        self.manifest.update(
+            fetched["doc_id"],
+            url=result.item["url"],
+            etag=fetched.get("etag"),
+            last_modified=fetched.get("last_modified"),
+            pdf_sha1=fetched["pdf_sha1"],
+            text_sha1=result.record["text_sha1"] if result.record else None,
+        )
@@ -7,15 +7,9 @@ import hashlib
 import json
 import os
 import re
-from typing import Dict
+from typing import Dict, Optional
 
-try:  # pragma: no cover - optional dependency guard
-    import fitz  # type: ignore
-except ImportError as exc:  # pragma: no cover - handled lazily
-    fitz = None  # type: ignore
-    _FITZ_IMPORT_ERROR = exc
-else:
-    _FITZ_IMPORT_ERROR = None
+from app.ingestion.pdf import extract_text
 
 
 def ensure_dir(path: str) -> None:
@@ -40,19 +34,9 @@ def slugify(title: str) -> str:
     return safe[:150]
 
 
-def pdf_to_text(pdf_path: str) -> str:
-    if fitz is None:  # pragma: no cover - executed only when dependency missing
-        raise ImportError("PyMuPDF is required for PDF parsing") from _FITZ_IMPORT_ERROR
-
-    parts = []
-    with fitz.open(pdf_path) as doc:  # type: ignore[attr-defined]
-        for page in doc:
-            parts.append(page.get_text("text"))
-    text = "\n".join(parts).strip()
-    text = re.sub(r"\r\n?", "\n", text)
-    text = re.sub(r"[ \t]+", " ", text)
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    return text
+def pdf_to_text(pdf_path: str, pdf_sha1: Optional[str] = None) -> str:
+    """Extract normalized PDF text (see ``app.ingestion.pdf.extract_text``)."""
+    return extract_text(pdf_path, pdf_sha1=pdf_sha1)
 
 
 def save_json(path: str, data: Dict) -> None:
@@ -0,0 +1,6 @@
+"""Retrieval helpers (chunking, Arabic normalization, pooled storage, vector search) for the committee RAG service."""
+
+from .arabic import normalize_arabic
+from .chunker import Chunk, Chunker, chunk_text
+
+__all__ = ["Chunk", "Chunker", "chunk_text", "normalize_arabic"]
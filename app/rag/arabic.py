@@ -0,0 +1,38 @@
+"""Arabic text normalization shared by indexing and querying."""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, List
+
+# Harakat, shadda, sukun, dagger alef and Quranic annotation marks
+DIACRITICS = "".join(chr(code) for code in range(0x064B, 0x0653)) + "ٰ" + "".join(
+    chr(code) for code in range(0x06D6, 0x06EE)
+)
+TATWEEL = "ـ"
+# Alef with hamza above/below, madda and wasla -> bare alef; alef maksura -> yaa
+LETTER_FORMS: Dict[str, str] = {
+    "أ": "ا",
+    "إ": "ا",
+    "آ": "ا",
+    "ٱ": "ا",
+    "ى": "ي",
+}
+
+_TABLE = str.maketrans({**LETTER_FORMS, **{ch: None for ch in DIACRITICS + TATWEEL}})
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def normalize_arabic(text: str) -> str:
+    """Strip diacritics and tatweel and unify alef/yaa forms.
+
+    Must stay in sync with ``rag.normalize_arabic`` in
+    ``db/postgres/migrations/001_rag_chunks_fulltext.sql``, which applies the
+    same mapping when the search index is built.
+    """
+    return text.translate(_TABLE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Normalized, lower-cased word tokens; single letters (not digits) are dropped."""
+    return [token for token in _TOKEN_RE.findall(normalize_arabic(text).lower()) if len(token) > 1 or token.isdigit()]
@@ -0,0 +1,45 @@
+"""In-memory Okapi BM25 over tokenized chunks."""
+
+from __future__ import annotations
+
+import math
+from collections import Counter
+from typing import Container, Dict, List, Sequence, Tuple
+
+
+class BM25Index:
+    """Term -> {row: term frequency} postings with Okapi BM25 scoring."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.lengths: Dict[int, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, row: int, tokens: Sequence[str]) -> None:
+        for term, count in Counter(tokens).items():
+            self.postings.setdefault(term, {})[row] = count
+        self.lengths[row] = len(tokens)
+        self._total_length += len(tokens)
+
+    def search(self, tokens: Sequence[str], k: int, exclude: Container[int] = ()) -> List[Tuple[int, float]]:
+        if not self.lengths:
+            return []
+        count = len(self.lengths)
+        average = self._total_length / count or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokens):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for row, tf in postings.items():
+                if row in exclude:
+                    continue
+                norm = tf + self.k1 * (1 - self.b + self.b * self.lengths[row] / average)
+                scores[row] = scores.get(row, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
@@ -0,0 +1,126 @@
+"""Paragraph- and sentence-aware chunking of documents for retrieval."""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Tuple
+
+from app.rag.tokens import estimate_tokens
+
+DEFAULT_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+DEFAULT_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+# Latin and Arabic sentence terminators, or a single line break inside a paragraph
+_SENTENCE_RE = re.compile(r"(?<=[.!?؟…۔])\s+|\n")
+
+# (separator before the unit, unit text, unit tokens)
+Unit = Tuple[str, str, int]
+
+
+@dataclass
+class Chunk:
+    """One retrieval chunk of a document."""
+
+    chunk_no: int
+    content: str
+    tokens: int
+
+
+class Chunker:
+    """Packs paragraphs, then sentences, then words into token-bounded chunks.
+
+    Boundaries are never placed inside a word. Consecutive chunks share up to
+    ``overlap_tokens`` of trailing sentences so context survives the cut.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+    ):
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be positive")
+        if not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("overlap_tokens must be in [0, max_tokens)")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.count_tokens = count_tokens
+
+    def split(self, text: str) -> List[Chunk]:
+        chunks: List[Chunk] = []
+        current: List[Unit] = []
+        size = 0
+        for unit in self._units(text):
+            if current and size + unit[2] > self.max_tokens:
+                chunks.append(self._make_chunk(len(chunks), current))
+                current = self._overlap(current, unit[2])
+                size = sum(tokens for _, _, tokens in current)
+            current.append(unit)
+            size += unit[2]
+        if current:
+            chunks.append(self._make_chunk(len(chunks), current))
+        return chunks
+
+    def _units(self, text: str) -> Iterator[Unit]:
+        for paragraph in _PARAGRAPH_RE.split(text):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            separator = "\n\n"
+            tokens = self.count_tokens(paragraph)
+            if tokens <= self.max_tokens:
+                yield separator, paragraph, tokens
+                continue
+            for sentence in _SENTENCE_RE.split(paragraph):
+                sentence = sentence.strip()
+                if not sentence:
+                    continue
+                for piece in self._fit(sentence):
+                    yield separator, piece, self.count_tokens(piece)
+                    separator = " "
+
+    def _fit(self, sentence: str) -> Iterator[str]:
+        """Yield the sentence, or word runs of it when it exceeds ``max_tokens``."""
+        if self.count_tokens(sentence) <= self.max_tokens:
+            yield sentence
+            return
+        words: List[str] = []
+        size = 0
+        for word in sentence.split():
+            tokens = self.count_tokens(word)
+            if words and size + tokens > self.max_tokens:
+                yield " ".join(words)
+                words, size = [], 0
+            words.append(word)
+            size += tokens
+        if words:
+            yield " ".join(words)
+
+    def _overlap(self, units: List[Unit], incoming: int) -> List[Unit]:
+        # Trailing units that fit the overlap budget and leave room for the next unit
+        budget = min(self.overlap_tokens, self.max_tokens - incoming)
+        carried: List[Unit] = []
+        used = 0
+        for unit in reversed(units[1:]):
+            if used + unit[2] > budget:
+                break
+            carried.insert(0, unit)
+            used += unit[2]
+        return carried
+
+    def _make_chunk(self, chunk_no: int, units: List[Unit]) -> Chunk:
+        content = units[0][1] + "".join(separator + text for separator, text, _ in units[1:])
+        return Chunk(chunk_no=chunk_no, content=content, tokens=self.count_tokens(content))
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+) -> List[Chunk]:
+    """Split text with a default ``Chunker``."""
+    return Chunker(max_tokens=max_tokens, overlap_tokens=overlap_tokens).split(text)
@@ -0,0 +1,378 @@
+"""Memory-mapped inverted index over an append-only JSONL record log.
+
+Layout of ``<jsonl>.idx/``:
+
+* ``docs.bin`` - doc-offset table, one ``(offset, length, key)`` entry per
+  record; ``key`` is a 64-bit hash of ``doc_id`` used to hide superseded
+  versions of a document.
+* ``seg-NNNNN.dict`` - sorted term dictionary: a term count, fixed-size
+  ``(term_offset, term_length, postings_offset, df)`` entries and the UTF-8
+  term blob, binary-searched in place.
+* ``seg-NNNNN.post`` - per term, ``df`` uint32 doc numbers followed by ``df``
+  uint32 term frequencies, read as zero-copy ``memoryview`` casts.
+* ``manifest.json`` - indexed JSONL size, doc count and live segments.
+
+``update`` indexes only the bytes appended since the last run into a new
+segment; segments are merged once there are more than ``MAX_SEGMENTS``. A
+JSONL that was truncated or rewritten below the indexed size is re-indexed
+from scratch.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.rag.arabic import tokenize
+
+DOC_ENTRY = struct.Struct("<QIQ")
+TERM_ENTRY = struct.Struct("<IIQI")
+COUNT = struct.Struct("<I")
+MAX_SEGMENTS = int(os.getenv("JSONL_INDEX_MAX_SEGMENTS", "8"))
+FORMAT_VERSION = 1
+
+Postings = Tuple[memoryview, memoryview]
+
+
+def doc_key(doc_id: Any) -> int:
+    return int.from_bytes(hashlib.blake2b(str(doc_id).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _map(path: str) -> Optional[mmap.mmap]:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, "rb") as handle:
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def write_segment(prefix: str, postings: Dict[str, Tuple[List[int], List[int]]]) -> None:
+    """Write ``term -> (doc numbers, term frequencies)`` as a dict/post pair."""
+    terms = sorted((term.encode("utf-8"), term) for term in postings)
+    entries = []
+    blob = bytearray()
+    with open(f"{prefix}.post.tmp", "wb") as post:
+        for encoded, term in terms:
+            docs, tfs = postings[term]
+            entries.append(TERM_ENTRY.pack(len(blob), len(encoded), post.tell(), len(docs)))
+            blob += encoded
+            post.write(array("I", docs).tobytes())
+            post.write(array("I", tfs).tobytes())
+        post.flush()
+        os.fsync(post.fileno())
+    with open(f"{prefix}.dict.tmp", "wb") as handle:
+        handle.write(COUNT.pack(len(entries)))
+        handle.write(b"".join(entries))
+        handle.write(bytes(blob))
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(f"{prefix}.post.tmp", f"{prefix}.post")
+    os.replace(f"{prefix}.dict.tmp", f"{prefix}.dict")
+
+
+class Segment:
+    """One immutable, memory-mapped dict/post pair."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._dict = _map(f"{prefix}.dict")
+        self._post = _map(f"{prefix}.post")
+        self.count = COUNT.unpack_from(self._dict, 0)[0] if self._dict else 0
+        self._blob_start = COUNT.size + self.count * TERM_ENTRY.size
+
+    def _entry(self, index: int) -> Tuple[bytes, int, int]:
+        term_offset, term_length, postings_offset, df = TERM_ENTRY.unpack_from(
+            self._dict, COUNT.size + index * TERM_ENTRY.size
+        )
+        start = self._blob_start + term_offset
+        return self._dict[start:start + term_length], postings_offset, df
+
+    def _postings(self, postings_offset: int, df: int) -> Postings:
+        block = memoryview(self._post)[postings_offset:postings_offset + 8 * df]
+        return block[: 4 * df].cast("I"), block[4 * df:].cast("I")
+
+    def find(self, term: str) -> Optional[Postings]:
+        encoded = term.encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            candidate, postings_offset, df = self._entry(middle)
+            if candidate == encoded:
+                return self._postings(postings_offset, df)
+            if candidate < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def items(self) -> Iterator[Tuple[str, List[int], List[int]]]:
+        # Copies, so no view into the mapping outlives the segment
+        for index in range(self.count):
+            term, postings_offset, df = self._entry(index)
+            docs, tfs = self._postings(postings_offset, df)
+            yield term.decode("utf-8"), docs.tolist(), tfs.tolist()
+
+    def close(self) -> None:
+        for mapped in (self._dict, self._post):
+            if mapped is not None:
+                mapped.close()
+
+    def remove(self) -> None:
+        self.close()
+        for suffix in (".dict", ".post"):
+            if os.path.exists(self.prefix + suffix):
+                os.remove(self.prefix + suffix)
+
+
+class JsonlIndex:
+    """Inverted index over the ``title``/``content`` of JSONL records.
+
+    Queries binary-search each segment's mmap'd dictionary, intersect the
+    postings and read only the matching records, seeking into the JSONL by
+    byte offset. When a ``doc_id`` appears more than once only its newest
+    record is returned.
+    """
+
+    def __init__(self, jsonl_path: str, index_dir: Optional[str] = None):
+        self.jsonl_path = jsonl_path
+        self.index_dir = index_dir or f"{jsonl_path}.idx"
+        self.docs_path = os.path.join(self.index_dir, "docs.bin")
+        self.manifest_path = os.path.join(self.index_dir, "manifest.json")
+        self._lock = threading.RLock()
+        self._segments: List[Segment] = []
+        self._docs: Optional[mmap.mmap] = None
+        self._jsonl: Optional[mmap.mmap] = None
+        self._latest: Optional[Dict[int, int]] = None
+        self.manifest: Dict[str, Any] = {
+            "version": FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "jsonl_size": 0,
+            "docs": 0,
+            "next_segment": 1,
+            "segments": [],
+        }
+        os.makedirs(self.index_dir, exist_ok=True)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as handle:
+                stored = json.load(handle)
+            if stored.get("version") != FORMAT_VERSION or stored.get("byteorder") != sys.byteorder:
+                raise ValueError(f"index {self.index_dir} has an incompatible format; delete it to rebuild")
+            self.manifest = stored
+        if self._is_stale():
+            self._reset()
+        self._open()
+
+    def __len__(self) -> int:
+        return self.manifest["docs"]
+
+    def _open(self) -> None:
+        self.close()
+        # Drop doc entries written by an update that never reached the manifest
+        if os.path.exists(self.docs_path):
+            with open(self.docs_path, "r+b") as handle:
+                handle.truncate(self.manifest["docs"] * DOC_ENTRY.size)
+        self._docs = _map(self.docs_path)
+        self._jsonl = _map(self.jsonl_path) if self.manifest["jsonl_size"] else None
+        self._segments = [Segment(os.path.join(self.index_dir, name)) for name in self.manifest["segments"]]
+        self._latest = None
+
+    def close(self) -> None:
+        for segment in self._segments:
+            segment.close()
+        for mapped in (self._docs, self._jsonl):
+            if mapped is not None:
+                mapped.close()
+        self._segments, self._docs, self._jsonl = [], None, None
+
+    def _save_manifest(self) -> None:
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(self.manifest, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    def _is_stale(self) -> bool:
+        """Whether the JSONL no longer ends a record where the index stopped."""
+        size = self.manifest["jsonl_size"]
+        if not size:
+            return False
+        if not os.path.exists(self.jsonl_path) or os.path.getsize(self.jsonl_path) < size:
+            return True
+        with open(self.jsonl_path, "rb") as handle:
+            handle.seek(size - 1)
+            return handle.read(1) != b"\n"
+
+    def _reset(self) -> None:
+        """Drop every segment and doc entry so the next update starts at byte 0."""
+        print(f"[rag] تغير الملف {self.jsonl_path} منذ آخر فهرسة؛ ستتم إعادة بناء الفهرس")
+        self.close()
+        for name in self.manifest["segments"]:
+            Segment(os.path.join(self.index_dir, name)).remove()
+        if os.path.exists(self.docs_path):
+            os.remove(self.docs_path)
+        self.manifest.update(jsonl_size=0, docs=0, segments=[])
+        self._save_manifest()
+
+    def _new_segment_prefix(self) -> Tuple[str, str]:
+        name = f"seg-{self.manifest['next_segment']:05d}"
+        self.manifest["next_segment"] += 1
+        return name, os.path.join(self.index_dir, name)
+
+    def update(self) -> int:
+        """Index records appended since the last update; returns how many."""
+        with self._lock:
+            if self._is_stale():
+                self._reset()
+                self._open()
+            if not os.path.exists(self.jsonl_path):
+                return 0
+            start_doc = self.manifest["docs"]
+            postings: Dict[str, Tuple[List[int], List[int]]] = {}
+            entries = []
+            offset = self.manifest["jsonl_size"]
+            with open(self.jsonl_path, "rb") as handle:
+                handle.seek(offset)
+                for line in handle:
+                    if not line.endswith(b"\n"):
+                        break  # record still being written
+                    if line.strip():
+                        record = json.loads(line)
+                        docnum = start_doc + len(entries)
+                        entries.append(DOC_ENTRY.pack(offset, len(line), doc_key(record.get("doc_id"))))
+                        text = f"{record.get('title', '')}\n{record.get('content', '')}"
+                        for term, tf in Counter(tokenize(text)).items():
+                            docs, tfs = postings.setdefault(term, ([], []))
+                            docs.append(docnum)
+                            tfs.append(tf)
+                    offset += len(line)
+            if offset == self.manifest["jsonl_size"]:
+                return 0
+
+            if postings:
+                name, prefix = self._new_segment_prefix()
+                write_segment(prefix, postings)
+                self.manifest["segments"].append(name)
+            with open(self.docs_path, "ab") as handle:
+                handle.truncate(start_doc * DOC_ENTRY.size)
+                handle.write(b"".join(entries))
+                handle.flush()
+                os.fsync(handle.fileno())
+            self.manifest["docs"] = start_doc + len(entries)
+            self.manifest["jsonl_size"] = offset
+            self._save_manifest()
+            self._open()
+            if len(self._segments) > MAX_SEGMENTS:
+                self.compact()
+            return len(entries)
+
+    def compact(self) -> None:
+        """Merge all segments into one."""
+        with self._lock:
+            if len(self._segments) <= 1:
+                return
+            merged: Dict[str, Tuple[List[int], List[int]]] = {}
+            # Segments cover increasing doc ranges, so appending keeps postings sorted
+            for segment in self._segments:
+                for term, docs, tfs in segment.items():
+                    target = merged.setdefault(term, ([], []))
+                    target[0].extend(docs)
+                    target[1].extend(tfs)
+            name, prefix = self._new_segment_prefix()
+            write_segment(prefix, merged)
+            old = self._segments
+            self.manifest["segments"] = [name]
+            self._save_manifest()
+            self._segments = []
+            for segment in old:
+                segment.remove()
+            self._open()
+
+    def _doc(self, docnum: int) -> Tuple[int, int, int]:
+        return DOC_ENTRY.unpack_from(self._docs, docnum * DOC_ENTRY.size)
+
+    def _is_latest(self, docnum: int) -> bool:
+        if self._latest is None:
+            latest: Dict[int, int] = {}
+            for number in range(len(self)):
+                latest[self._doc(number)[2]] = number
+            self._latest = latest
+        return self._latest.get(self._doc(docnum)[2]) == docnum
+
+    def get(self, docnum: int) -> Dict[str, Any]:
+        """Decode the record stored at ``docnum`` straight from its byte range."""
+        offset, length, _ = self._doc(docnum)
+        return json.loads(self._jsonl[offset:offset + length])
+
+    def postings(self, term: str) -> Dict[int, int]:
+        """Doc number -> term frequency for an already-normalized term."""
+        found: Dict[int, int] = {}
+        for segment in self._segments:
+            hit = segment.find(term)
+            if hit is not None:
+                found.update(zip(hit[0], hit[1]))
+        return found
+
+    def search(self, query: str, k: int = 10, match_all: bool = True) -> List[Dict[str, Any]]:
+        """Top-k records by TF-IDF; all terms must match unless ``match_all`` is false.
+
+        Each result is the decoded record with ``_doc`` and ``_score`` added.
+        """
+        with self._lock:
+            terms = list(dict.fromkeys(tokenize(query)))
+            if not terms or not len(self):
+                return []
+            lists = sorted((self.postings(term) for term in terms), key=len)
+            if match_all:
+                if not lists[0]:
+                    return []
+                candidates = set(lists[0])
+                for other in lists[1:]:
+                    candidates.intersection_update(other)
+            else:
+                candidates = set().union(*lists)
+            total = len(self)
+            scores = {}
+            for docnum in candidates:
+                if not self._is_latest(docnum):
+                    continue
+                scores[docnum] = sum(
+                    (1 + math.log(found[docnum])) * math.log(1 + total / len(found))
+                    for found in lists
+                    if docnum in found
+                )
+            best = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:k]
+            return [{**self.get(docnum), "_doc": docnum, "_score": round(score, 6)} for docnum, score in best]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build or query the JSONL inverted index")
+    parser.add_argument(
+        "--jsonl",
+        default=os.getenv("CIRCULARS_INDEX", "data/sama_regulations/sama_circulars.index.jsonl"),
+        help="Path to the JSONL index file",
+    )
+    parser.add_argument("--query", default=None, help="Query to run after updating")
+    parser.add_argument("--any", action="store_true", help="Match any query term instead of all")
+    parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    index = JsonlIndex(args.jsonl)
+    added = index.update()
+    print(f"[jsonl-index] {added} سجل جديد، الإجمالي {len(index)} في {index.index_dir}")
+    if args.query:
+        for hit in index.search(args.query, k=args.k, match_all=not args.any):
+            print(f"{hit['_score']:.4f}  {hit.get('title', '')}  ({hit.get('doc_id')})")
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    main()
@@ -0,0 +1,209 @@
+"""Vector, BM25 and hybrid retrieval over committee and SAMA chunks."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.rag.arabic import tokenize
+from app.rag.bm25 import BM25Index
+from app.rag.chunker import Chunker
+from app.rag.vectors import Embedder, HashingEmbedder, IVFIndex, SentenceTransformerEmbedder, VectorStore
+
+RAG_VECTOR_DIR = os.getenv("RAG_VECTOR_DIR", "data/rag/vectors")
+RAG_EMBED_DIM = int(os.getenv("RAG_EMBED_DIM", "256"))
+RAG_EMBED_MODEL = os.getenv("RAG_EMBED_MODEL", "")  # local sentence-transformers path
+RAG_IVF_NPROBE = int(os.getenv("RAG_IVF_NPROBE", "8"))
+# Reciprocal-rank-fusion constant for hybrid mode
+RRF_K = 60
+MODES = ("vector", "bm25", "hybrid")
+
+
+def default_embedder() -> Embedder:
+    if RAG_EMBED_MODEL:
+        return SentenceTransformerEmbedder(RAG_EMBED_MODEL)
+    return HashingEmbedder(dim=RAG_EMBED_DIM)
+
+
+class RetrievalEngine:
+    """Embeds chunks into a ``VectorStore`` and searches it offline.
+
+    ``vector`` mode scores by cosine similarity (through the IVF index once
+    one has been trained with ``build_ivf``), ``bm25`` by keyword relevance,
+    and ``hybrid`` fuses both rankings with reciprocal rank fusion. Each
+    ``(source, doc_id, text_sha1)`` is indexed at most once; when a document
+    is re-indexed with new text, the chunks of its older version stop
+    matching.
+    """
+
+    def __init__(
+        self,
+        directory: str = RAG_VECTOR_DIR,
+        embedder: Optional[Embedder] = None,
+        chunker: Optional[Chunker] = None,
+        nprobe: int = RAG_IVF_NPROBE,
+    ):
+        self.directory = directory
+        self.embedder = embedder or default_embedder()
+        self.chunker = chunker or Chunker()
+        self.nprobe = nprobe
+        self.store = VectorStore(directory, self.embedder.dim, self.embedder.name)
+        self.bm25 = BM25Index()
+        self._lock = threading.Lock()
+        self._seen = set()
+        # (source, doc_id) -> (text_sha1, rows) of the current version
+        self._current: Dict[Tuple[Any, Any], Tuple[Any, List[int]]] = {}
+        self._superseded: set = set()
+        for row, payload in self.store.iter_payloads():
+            self.bm25.add(row, tokenize(payload.get("text", "")))
+            self._seen.add(self._document_key(payload))
+            self._track(payload, [row])
+
+        self.ivf = IVFIndex.load(directory)
+        if self.ivf is not None:
+            indexed = len(self.ivf.assignments)
+            if indexed > len(self.store):
+                self.ivf.assignments = self.ivf.assignments[: len(self.store)]
+            elif indexed < len(self.store):
+                self.ivf.add(np.asarray(self.store.matrix[indexed:]))
+
+    @staticmethod
+    def _document_key(payload: Dict[str, Any]) -> Tuple[Any, Any, Any]:
+        return payload.get("source"), payload.get("doc_id"), payload.get("text_sha1")
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def _track(self, payload: Dict[str, Any], rows: List[int]) -> None:
+        source, doc_id, text_sha1 = self._document_key(payload)
+        previous = self._current.get((source, doc_id))
+        if previous is not None and previous[0] == text_sha1:
+            previous[1].extend(rows)
+            return
+        if previous is not None:
+            self._superseded.update(previous[1])
+        self._current[(source, doc_id)] = (text_sha1, list(rows))
+
+    def add_document(
+        self,
+        doc_id: Any,
+        title: str,
+        text: str,
+        source: str,
+        text_sha1: Optional[str] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """Chunk and index a document; returns the number of chunks added."""
+        base = {"source": source, "doc_id": doc_id, "title": title, "text_sha1": text_sha1, **(meta or {})}
+        with self._lock:
+            if text_sha1 and self._document_key(base) in self._seen:
+                return 0
+            chunks = self.chunker.split(text)
+            if not chunks:
+                return 0
+            payloads = [{**base, "chunk_no": c.chunk_no, "text": c.content} for c in chunks]
+            vectors = self.embedder.embed([c.content for c in chunks])
+            rows = self.store.add(vectors, payloads)
+            for row, chunk in zip(rows, chunks):
+                self.bm25.add(row, tokenize(chunk.content))
+            self._track(base, list(rows))
+            if self.ivf is not None:
+                self.ivf.add(vectors)
+                self.ivf.save(self.directory)
+            self._seen.add(self._document_key(base))
+            return len(chunks)
+
+    def index_jsonl(self, path: str, source: str = "sama") -> int:
+        """Index ingestion records (``doc_id``/``title``/``content``) from a JSONL file."""
+        added = 0
+        with open(path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                added += self.add_document(
+                    record["doc_id"],
+                    record.get("title", ""),
+                    record.get("content", ""),
+                    source,
+                    text_sha1=record.get("text_sha1"),
+                    meta={"source_url": record.get("source_url")},
+                )
+        return added
+
+    def build_ivf(self, nlist: Optional[int] = None) -> IVFIndex:
+        """Train and persist the IVF index (default ``nlist`` ~ 4 * sqrt(rows))."""
+        with self._lock:
+            matrix = np.asarray(self.store.matrix)
+            nlist = nlist or max(1, int(4 * np.sqrt(len(matrix))))
+            self.ivf = IVFIndex.train(matrix, nlist)
+            self.ivf.save(self.directory)
+            return self.ivf
+
+    def _vector_hits(self, query: str, k: int) -> List[Tuple[int, float]]:
+        vector = self.embedder.embed([query])[0]
+        rows = self.ivf.candidates(vector, self.nprobe) if self.ivf is not None else None
+        exclude = np.fromiter(self._superseded, dtype=np.int64) if self._superseded else None
+        return self.store.search(vector, k, rows=rows, exclude=exclude)
+
+    def search(self, query: str, k: int = 5, mode: str = "hybrid") -> List[Dict[str, Any]]:
+        """Top-k chunks as payload dicts with ``row`` and ``score`` added."""
+        if mode not in MODES:
+            raise ValueError(f"unknown retrieval mode {mode!r}; expected one of {MODES}")
+        if not len(self.store) or not query.strip():
+            return []
+        with self._lock:
+            if mode == "vector":
+                hits = self._vector_hits(query, k)
+            elif mode == "bm25":
+                hits = self.bm25.search(tokenize(query), k, exclude=self._superseded)
+            else:
+                depth = max(k * 4, 20)
+                fused: Dict[int, float] = {}
+                for ranking in (self._vector_hits(query, depth), self.bm25.search(tokenize(query), depth, exclude=self._superseded)):
+                    for rank, (row, _) in enumerate(ranking):
+                        fused[row] = fused.get(row, 0.0) + 1.0 / (RRF_K + rank + 1)
+                hits = sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [{**self.store.payload(row), "row": row, "score": round(score, 6)} for row, score in hits]
+
+
+_engine: Optional[RetrievalEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> RetrievalEngine:
+    """Process-wide engine rooted at ``RAG_VECTOR_DIR``."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RetrievalEngine()
+        return _engine
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the offline RAG vector index")
+    parser.add_argument("--jsonl", action="append", default=[], help="Ingestion JSONL to index (repeatable)")
+    parser.add_argument("--source", default="sama", help="Source label stored with the chunks")
+    parser.add_argument("--ivf", type=int, nargs="?", const=0, default=None, help="Train the IVF index (optional nlist)")
+    parser.add_argument("--query", default=None, help="Run a query after indexing")
+    parser.add_argument("--mode", choices=MODES, default="hybrid")
+    args = parser.parse_args(argv)
+
+    engine = get_engine()
+    for path in args.jsonl:
+        print(f"[rag] تمت فهرسة {engine.index_jsonl(path, args.source)} مقطع/مقاطع من {path}")
+    if args.ivf is not None:
+        ivf = engine.build_ivf(args.ivf or None)
+        print(f"[rag] تم بناء فهرس IVF بعدد {len(ivf.centroids)} قائمة لـ {len(engine)} متجه")
+    if args.query:
+        for hit in engine.search(args.query, mode=args.mode):
+            print(f"{hit['score']:.4f}  {hit['title']}  #{hit['chunk_no']}")
+
+
+if __name__ == "__main__":  # pragma: no cover - CLI entry point
+    main()
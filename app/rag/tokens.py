@@ -0,0 +1,23 @@
+"""Tokenizer-free token estimates shared by the chunker and the chat bot."""
+
+from __future__ import annotations
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of text without a tokenizer.
+
+    ASCII text averages about 4 characters per token; Arabic and other
+    non-ASCII scripts tokenize much denser, closer to 2 characters per token.
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Approximate token count (at least 1 for non-empty text)
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    ascii_chars = len(text) - non_ascii
+    return max(1, (ascii_chars + 3) // 4 + (non_ascii + 1) // 2)
@@ -0,0 +1,262 @@
+"""Offline embeddings, a memory-mapped vector store and an IVF index."""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Protocol, Sequence, Tuple
+
+import numpy as np
+
+from app.rag.arabic import tokenize
+
+DTYPE = np.float32
+
+
+class Embedder(Protocol):
+    """In-process embedding backend returning L2-normalized float32 rows."""
+
+    name: str
+    dim: int
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        ...
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(DTYPE, copy=False)
+
+
+class HashingEmbedder:
+    """Deterministic feature-hashing embedder (no model, no network).
+
+    Word tokens and character trigrams of each token are hashed with CRC-32
+    into ``dim`` signed buckets, so related Arabic word forms (prefixes such
+    as ال, و, ب) still share most of their features.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 256, ngram: int = 3, ngram_weight: float = 0.5):
+        self.dim = dim
+        self.ngram = ngram
+        self.ngram_weight = ngram_weight
+
+    def _features(self, text: str) -> Iterator[Tuple[str, float]]:
+        for token in tokenize(text):
+            yield f"w:{token}", 1.0
+            padded = f"#{token}#"
+            for start in range(len(padded) - self.ngram + 1):
+                yield f"g:{padded[start:start + self.ngram]}", self.ngram_weight
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=DTYPE)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                matrix[row, digest % self.dim] += weight if digest & 0x80000000 else -weight
+        return _normalize_rows(matrix)
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model loaded from disk (never downloaded)."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_path: str):
+        try:
+            from sentence_transformers import SentenceTransformer  # type: ignore
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise ImportError("sentence-transformers is required for RAG_EMBED_MODEL") from exc
+        self.model = SentenceTransformer(model_path, local_files_only=True)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"sentence-transformers:{os.path.basename(model_path.rstrip('/'))}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = self.model.encode(list(texts), convert_to_numpy=True, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=DTYPE).reshape(len(texts), self.dim)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class VectorStore:
+    """Append-only float32 matrix in ``vectors.f32`` with payloads in ``meta.jsonl``.
+
+    The matrix is opened with ``np.memmap``; payloads are read on demand via a
+    byte-offset table. Rows are never rewritten, and a torn tail left by a
+    crash is truncated on open.
+    """
+
+    def __init__(self, directory: str, dim: int, embedder_name: str = "hashing"):
+        self.directory = directory
+        self.dim = dim
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.meta_path = os.path.join(directory, "meta.jsonl")
+        header_path = os.path.join(directory, "store.json")
+        os.makedirs(directory, exist_ok=True)
+
+        header = {"dim": dim, "embedder": embedder_name}
+        if os.path.exists(header_path):
+            with open(header_path, "r", encoding="utf-8") as handle:
+                stored = json.load(handle)
+            if stored != header:
+                raise ValueError(f"vector store {directory} was built with {stored}, not {header}")
+        else:
+            with open(header_path, "w", encoding="utf-8") as handle:
+                json.dump(header, handle)
+
+        self._lock = threading.Lock()
+        self._offsets: List[int] = []
+        self._recover()
+        self._matrix: Optional[np.ndarray] = None
+
+    @property
+    def row_bytes(self) -> int:
+        return self.dim * np.dtype(DTYPE).itemsize
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def _recover(self) -> None:
+        offset = 0
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "rb") as handle:
+                for line in handle:
+                    if not line.endswith(b"\n"):
+                        break
+                    self._offsets.append(offset)
+                    offset += len(line)
+        vector_rows = os.path.getsize(self.vectors_path) // self.row_bytes if os.path.exists(self.vectors_path) else 0
+        count = min(len(self._offsets), vector_rows)
+        meta_end = self._offsets[count] if count < len(self._offsets) else offset
+        del self._offsets[count:]
+        with open(self.meta_path, "ab") as handle:
+            handle.truncate(meta_end)
+        with open(self.vectors_path, "ab") as handle:
+            handle.truncate(count * self.row_bytes)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Read-only ``(len(self), dim)`` view of all vectors."""
+        with self._lock:
+            if self._matrix is None or len(self._matrix) != len(self._offsets):
+                if not self._offsets:
+                    self._matrix = np.zeros((0, self.dim), dtype=DTYPE)
+                else:
+                    self._matrix = np.memmap(
+                        self.vectors_path, dtype=DTYPE, mode="r", shape=(len(self._offsets), self.dim)
+                    )
+            return self._matrix
+
+    def add(self, vectors: np.ndarray, payloads: List[Dict[str, Any]]) -> range:
+        """Append rows and return their row ids."""
+        vectors = np.ascontiguousarray(vectors, dtype=DTYPE)
+        if vectors.shape != (len(payloads), self.dim):
+            raise ValueError(f"expected {len(payloads)} vectors of dim {self.dim}, got {vectors.shape}")
+        with self._lock:
+            start = len(self._offsets)
+            with open(self.meta_path, "ab") as meta:
+                offset = meta.tell()
+                lines = [(json.dumps(p, ensure_ascii=False) + "\n").encode("utf-8") for p in payloads]
+                meta.write(b"".join(lines))
+            with open(self.vectors_path, "ab") as handle:
+                handle.write(vectors.tobytes())
+            for line in lines:
+                self._offsets.append(offset)
+                offset += len(line)
+            return range(start, len(self._offsets))
+
+    def payload(self, row: int) -> Dict[str, Any]:
+        with open(self.meta_path, "rb") as handle:
+            handle.seek(self._offsets[row])
+            return json.loads(handle.readline())
+
+    def iter_payloads(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        with open(self.meta_path, "rb") as handle:
+            for row in range(len(self._offsets)):
+                yield row, json.loads(handle.readline())
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        rows: Optional[np.ndarray] = None,
+        exclude: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """Exact inner-product top-k over all rows or over ``rows``, minus ``exclude``."""
+        matrix = self.matrix
+        if rows is not None:
+            matrix = matrix[rows]
+        if not len(matrix):
+            return []
+        scores = matrix @ query.astype(DTYPE, copy=False)
+        if exclude is not None and len(exclude):
+            ids = rows if rows is not None else np.arange(len(scores))
+            scores[np.isin(ids, exclude)] = -np.inf
+        best = top_k(scores, k)
+        ids = rows[best] if rows is not None else best
+        return [(int(row), float(scores[index])) for row, index in zip(ids, best) if np.isfinite(scores[index])]
+
+
+class IVFIndex:
+    """Inverted-file index: spherical k-means lists probed ``nprobe`` at a time."""
+
+    def __init__(self, centroids: np.ndarray, assignments: np.ndarray):
+        self.centroids = centroids.astype(DTYPE, copy=False)
+        self.assignments = assignments.astype(np.int32, copy=False)
+        self._lists: Optional[List[np.ndarray]] = None
+
+    @classmethod
+    def train(cls, matrix: np.ndarray, nlist: int, iterations: int = 10, seed: int = 0) -> "IVFIndex":
+        rng = np.random.default_rng(seed)
+        nlist = max(1, min(nlist, len(matrix)))
+        centroids = np.array(matrix[rng.choice(len(matrix), nlist, replace=False)], dtype=DTYPE)
+        assignments = np.zeros(len(matrix), dtype=np.int32)
+        for _ in range(iterations):
+            assignments = cls._nearest(matrix, centroids)
+            for cluster in range(nlist):
+                members = matrix[assignments == cluster]
+                # Empty lists are re-seeded from a random row
+                centroids[cluster] = members.sum(axis=0) if len(members) else matrix[rng.integers(len(matrix))]
+            centroids = _normalize_rows(centroids)
+        return cls(centroids, cls._nearest(matrix, centroids))
+
+    @staticmethod
+    def _nearest(matrix: np.ndarray, centroids: np.ndarray, batch: int = 65536) -> np.ndarray:
+        out = np.empty(len(matrix), dtype=np.int32)
+        for start in range(0, len(matrix), batch):
+            out[start:start + batch] = np.argmax(np.asarray(matrix[start:start + batch]) @ centroids.T, axis=1)
+        return out
+
+    def add(self, vectors: np.ndarray) -> None:
+        self.assignments = np.concatenate([self.assignments, self._nearest(vectors, self.centroids)])
+        self._lists = None
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind="stable")
+            bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+        probes = top_k(self.centroids @ query, nprobe)
+        return np.concatenate([self._lists[i] for i in probes])
+
+    def save(self, directory: str) -> None:
+        np.save(os.path.join(directory, "ivf_centroids.npy"), self.centroids)
+        np.save(os.path.join(directory, "ivf_assignments.npy"), self.assignments)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["IVFIndex"]:
+        path = os.path.join(directory, "ivf_centroids.npy")
+        if not os.path.exists(path):
+            return None
+        return cls(np.load(path), np.load(os.path.join(directory, "ivf_assignments.npy")))
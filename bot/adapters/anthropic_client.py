@@ -3,82 +3,65 @@
 """
 anthropic_client.py
 
-Anthropic (Claude) chat completion wrapper (placeholder/basic implementation).
+Anthropic (Claude) Messages API wrapper (blocking, async and streaming).
 محول Anthropic للدردشة.
-"""
 
-import os
-import logging
-from typing import List, Dict, Optional
+POSTs to ``/v1/messages`` with ``x-api-key`` and a pinned
+``anthropic-version`` header. System messages are joined into the top-level
+``system`` field, ``max_tokens`` is required, and streamed text arrives as
+``content_block_delta`` events.
+"""
 
-import requests
+import json
+from typing import Any, Dict, List, Optional, Tuple
 
-logger = logging.getLogger(__name__)
+from bot.adapters.base import BaseProvider, ProviderError
 
 
-class AnthropicError(Exception):
+class AnthropicError(ProviderError):
     """Anthropic API error."""
     pass
 
 
-class AnthropicClient:
+class AnthropicClient(BaseProvider):
     """Anthropic Claude client."""
     
-    def __init__(self, api_key: Optional[str] = None):
-        """
-        Initialize Anthropic client.
-        
-        Args:
-            api_key: Anthropic API key (defaults to env var)
-        """
-        self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
-        self.base_url = "https://api.anthropic.com/v1"
-        
-        if not self.api_key:
-            logger.warning("[anthropic_client] No API key configured")
+    name = "anthropic"
+    display_name = "Anthropic"
+    error_class = AnthropicError
+    api_key_env = "ANTHROPIC_API_KEY"
+    default_base_url = "https://api.anthropic.com/v1"
+    default_model = "claude-3-5-sonnet-20241022"
+    completion_path = "/messages"
+    remaining_header = "anthropic-ratelimit-requests-remaining"
+    reset_header = "anthropic-ratelimit-requests-reset"
     
-    def is_available(self) -> bool:
-        """Check if Anthropic is available."""
-        return bool(self.api_key)
+    def _headers(self) -> Dict[str, str]:
+        """Request headers (API key header and version pin)."""
+        return {
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01",
+            "Content-Type": "application/json"
+        }
     
-    def chat_completion(
+    def _build_payload(
         self,
         messages: List[Dict[str, str]],
-        model: str = "claude-3-5-sonnet-20241022",
-        temperature: float = 0.7,
-        max_tokens: int = 1000,
-        timeout: int = 60
-    ) -> str:
-        """
-        Call Anthropic messages API.
-        
-        Args:
-            messages: List of message dicts with 'role' and 'content'
-            model: Model name
-            temperature: Sampling temperature
-            max_tokens: Maximum tokens to generate
-            timeout: Request timeout in seconds
-            
-        Returns:
-            Generated text response
-            
-        Raises:
-            AnthropicError: If API call fails
-        """
-        if not self.api_key:
-            raise AnthropicError("مفتاح Anthropic غير مهيأ - Anthropic API key not configured")
-        
-        # Convert messages: extract system prompt if present
-        system_prompt = ""
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Dict[str, Any]:
+        """Request body with the system messages moved into ``system``."""
+        # Persona prompt and running summary arrive as separate system messages
+        system_parts = []
         api_messages = []
         
         for msg in messages:
             if msg["role"] == "system":
-                system_prompt = msg["content"]
+                system_parts.append(msg["content"])
             else:
                 api_messages.append(msg)
-        
-        url = f"{self.base_url}/messages"
+        system_prompt = "\n\n".join(part for part in system_parts if part)
         
         payload = {
             "model": model,
@@ -90,44 +73,36 @@ class AnthropicClient:
         if system_prompt:
             payload["system"] = system_prompt
         
-        headers = {
-            "x-api-key": self.api_key,
-            "anthropic-version": "2023-06-01",
-            "Content-Type": "application/json"
-        }
-        
-        try:
-            response = requests.post(url, json=payload, headers=headers, timeout=timeout)
-            
-            if response.status_code != 200:
-                error_msg = f"Anthropic error {response.status_code}: {response.text[:200]}"
-                logger.error(f"[anthropic_client] {error_msg}")
-                raise AnthropicError(error_msg)
-            
-            data = response.json()
-            
-            # Validate response structure
-            if "content" not in data or not data["content"]:
-                raise AnthropicError("استجابة غير متوقعة: لا توجد content - No content in response")
-            
-            content = data["content"][0]["text"]
-            
-            # Log usage
-            usage = data.get("usage", {})
-            logger.info(
-                f"[anthropic_client] model={model} "
-                f"input_tokens={usage.get('input_tokens', 'N/A')} "
-                f"output_tokens={usage.get('output_tokens', 'N/A')}"
+        return payload
+    
+    def _extract_content(self, data: Any) -> str:
+        """Text of the first content block."""
+        if "content" not in data or not data["content"]:
+            raise AnthropicError("استجابة غير متوقعة: لا توجد content - No content in response")
+        return data["content"][0]["text"]
+    
+    def _log_usage(self, model: str, usage: Dict[str, Any]) -> None:
+        """Log input/output token usage."""
+        self.logger.info(
+            f"{self.log_prefix} model={model} "
+            f"input_tokens={usage.get('input_tokens', 'N/A')} "
+            f"output_tokens={usage.get('output_tokens', 'N/A')}"
+        )
+    
+    def _parse_stream_data(self, data: str) -> Tuple[Optional[str], bool]:
+        """Parse one event of the messages stream."""
+        event = json.loads(data)
+        event_type = event.get("type")
+        if event_type == "content_block_delta":
+            delta = event.get("delta", {})
+            if delta.get("type") == "text_delta":
+                return delta.get("text"), False
+        elif event_type == "error":
+            error = event.get("error", {})
+            raise AnthropicError(
+                f"Anthropic stream error: {error.get('message', data[:200])}",
+                status_code=529 if error.get("type") == "overloaded_error" else None
             )
-            
-            return content
-            
-        except requests.exceptions.Timeout:
-            raise AnthropicError("انتهت مهلة الاتصال بـ Anthropic - Anthropic request timeout")
-        except requests.exceptions.RequestException as e:
-            raise AnthropicError(f"خطأ في الاتصال بـ Anthropic - Connection error: {e}")
-        except (KeyError, IndexError) as e:
-            raise AnthropicError(f"استجابة غير متوقعة من Anthropic - Unexpected response: {e}")
-        except Exception as e:
-            logger.error(f"[anthropic_client] Unexpected error: {e}")
-            raise AnthropicError(f"خطأ غير متوقع - Unexpected error: {e}")
+        elif event_type == "message_stop":
+            return None, True
+        return None, False
@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+base.py
+
+Shared base class of the chat provider adapters.
+الفئة الأساسية المشتركة لمحولات موفري النماذج.
+
+``BaseProvider`` owns request building, response parsing, error mapping and
+usage logging, plus the resilience every provider needs: transient failures
+(timeouts, connection errors, 429/5xx) are retried with exponential backoff
+and jitter, ``Retry-After`` is honored, and requests are paced per API key
+to the limits the provider reports (see ``pacing.py``). Subclasses only
+describe their wire format through a few small hooks.
+
+Every adapter provides a blocking ``chat_completion`` (pooled
+``requests.Session``), a non-blocking ``achat_completion`` on the shared async
+connection pool, and ``astream_chat_completion`` which yields text deltas as
+they arrive.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Tuple
+
+import requests
+
+from bot.adapters.http_pool import aiter_sse_data, get_async_client, httpx
+from bot.adapters.pacing import RateLimitPacer, get_pacer, parse_retry_after
+
+MAX_RETRIES = int(os.getenv("BOT_PROVIDER_MAX_RETRIES", "2"))
+BACKOFF_BASE = float(os.getenv("BOT_PROVIDER_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("BOT_PROVIDER_BACKOFF_MAX", "8"))
+MAX_QUEUE_WAIT = float(os.getenv("BOT_PROVIDER_MAX_QUEUE_SECONDS", "20"))
+
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504, 529})
+
+
+class ProviderError(Exception):
+    """Provider API error (``status_code`` is set for HTTP errors, ``timeout`` for timeouts)."""
+    
+    def __init__(
+        self,
+        message: str = "",
+        status_code: Optional[int] = None,
+        timeout: bool = False,
+        transient: bool = False,
+        retry_after: Optional[float] = None
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.timeout = timeout
+        self.transient = transient or timeout
+        self.retry_after = retry_after
+    
+    @property
+    def retryable(self) -> bool:
+        """Whether the same request may succeed if sent again."""
+        return self.transient or self.status_code in RETRYABLE_STATUS_CODES
+
+
+class BaseProvider:
+    """Chat completion client with retries, backoff and per-key pacing."""
+    
+    name = "provider"
+    display_name = "Provider"
+    error_class = ProviderError
+    api_key_env = ""
+    base_url_env = ""
+    default_base_url = ""
+    default_model = ""
+    completion_path = "/chat/completions"
+    remaining_header = "x-ratelimit-remaining-requests"
+    reset_header = "x-ratelimit-reset-requests"
+    
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        http_client: Optional["httpx.AsyncClient"] = None,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_max: float = BACKOFF_MAX,
+        max_queue_wait: float = MAX_QUEUE_WAIT
+    ):
+        """
+        Initialize provider client.
+        
+        Args:
+            api_key: API key (defaults to the provider's env var)
+            base_url: Base URL for API (defaults to env var or official)
+            http_client: Async HTTP client (defaults to the shared pool)
+            max_retries: Retries of transient failures per call
+            backoff_base: First backoff delay in seconds (doubles per retry)
+            backoff_max: Upper bound of a backoff delay
+            max_queue_wait: Longest wait for rate-limit pacing or Retry-After
+        """
+        self.logger = logging.getLogger(type(self).__module__)
+        self.log_prefix = f"[{type(self).__module__.rsplit('.', 1)[-1]}]"
+        self.api_key = api_key or os.getenv(self.api_key_env)
+        env_base_url = os.getenv(self.base_url_env) if self.base_url_env else None
+        self.base_url = (base_url or env_base_url or self.default_base_url).rstrip("/")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_queue_wait = max_queue_wait
+        self._session = requests.Session()
+        self._http_client = http_client
+        self._pacer: Optional[RateLimitPacer] = None
+        
+        if not self.api_key:
+            self.logger.warning(f"{self.log_prefix} No API key configured")
+    
+    def is_available(self) -> bool:
+        """Check if the provider is configured."""
+        return bool(self.api_key)
+    
+    @property
+    def pacer(self) -> RateLimitPacer:
+        """Pacer shared by every client using this API key."""
+        if self._pacer is None:
+            self._pacer = get_pacer(self.name, self.api_key or "", self.remaining_header, self.reset_header)
+        return self._pacer
+    
+    # ---- Wire format hooks -------------------------------------------------
+    
+    def _headers(self) -> Dict[str, str]:
+        """Request headers (OpenAI-compatible bearer auth by default)."""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+    
+    def _build_payload(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Dict[str, Any]:
+        """Request body (OpenAI-compatible by default)."""
+        return {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }
+    
+    def _extract_content(self, data: Any) -> str:
+        """Generated text of a response body (OpenAI-compatible by default)."""
+        if "choices" not in data or not data["choices"]:
+            raise self.error_class("استجابة غير متوقعة: لا توجد choices - No choices in response")
+        return data["choices"][0]["message"]["content"]
+    
+    def _log_usage(self, model: str, usage: Dict[str, Any]) -> None:
+        """Log token usage of a response."""
+        self.logger.info(
+            f"{self.log_prefix} model={model} "
+            f"tokens={usage.get('total_tokens', 'N/A')} "
+            f"prompt={usage.get('prompt_tokens', 'N/A')} "
+            f"completion={usage.get('completion_tokens', 'N/A')}"
+        )
+    
+    def _parse_stream_data(self, data: str) -> Tuple[Optional[str], bool]:
+        """
+        Parse one server-sent event payload.
+        
+        Returns:
+            Tuple of (text delta or None, stream finished)
+        """
+        if data == "[DONE]":
+            return None, True
+        chunk = json.loads(data)
+        choices = chunk.get("choices") or []
+        return (choices[0].get("delta", {}).get("content") if choices else None), False
+    
+    # ---- Shared request handling --------------------------------------------
+    
+    def _build_request(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        """Build URL, payload and headers for a chat completion."""
+        if not self.api_key:
+            raise self.error_class(
+                f"مفتاح {self.display_name} غير مهيأ - {self.display_name} API key not configured"
+            )
+        url = f"{self.base_url}{self.completion_path}"
+        return url, self._build_payload(messages, model, temperature, max_tokens), self._headers()
+    
+    def _parse_response(
+        self,
+        status_code: int,
+        text: str,
+        data: Any,
+        model: str,
+        headers: Optional[Mapping[str, str]] = None
+    ) -> str:
+        """Validate a response and extract the generated text."""
+        if status_code != 200:
+            error_msg = f"{self.display_name} error {status_code}: {text[:200]}"
+            self.logger.error(f"{self.log_prefix} {error_msg}")
+            raise self.error_class(
+                error_msg,
+                status_code=status_code,
+                retry_after=parse_retry_after(headers)
+            )
+        
+        content = self._extract_content(data)
+        self._log_usage(model, data.get("usage", {}))
+        return content
+    
+    def _wrap_error(self, error: Exception) -> ProviderError:
+        """Map a transport or parsing exception to the provider error."""
+        name = self.display_name
+        if isinstance(error, ProviderError):
+            return error
+        if isinstance(error, requests.exceptions.Timeout) or (
+            httpx is not None and isinstance(error, httpx.TimeoutException)
+        ):
+            return self.error_class(f"انتهت مهلة الاتصال بـ {name} - {name} request timeout", timeout=True)
+        if isinstance(error, requests.exceptions.RequestException) or (
+            httpx is not None and isinstance(error, httpx.HTTPError)
+        ):
+            return self.error_class(f"خطأ في الاتصال بـ {name} - Connection error: {error}", transient=True)
+        if isinstance(error, (KeyError, IndexError, TypeError, ValueError)):
+            return self.error_class(f"استجابة غير متوقعة من {name} - Unexpected response: {error}")
+        self.logger.error(f"{self.log_prefix} Unexpected error: {error}")
+        return self.error_class(f"خطأ غير متوقع - Unexpected error: {error}")
+    
+    def _retry_delay(self, error: ProviderError, attempt: int) -> Optional[float]:
+        """
+        Seconds to wait before retrying, or None if the error is final.
+        
+        ``Retry-After`` wins over backoff; a wait longer than
+        ``max_queue_wait`` is not worth queueing for and ends the call.
+        """
+        if attempt > self.max_retries or not error.retryable:
+            return None
+        if error.retry_after is not None:
+            return error.retry_after if error.retry_after <= self.max_queue_wait else None
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    def _handle_failure(self, error: Exception, attempt: int) -> float:
+        """Return the retry delay for a failed attempt or raise the mapped error."""
+        mapped = self._wrap_error(error)
+        delay = self._retry_delay(mapped, attempt)
+        if delay is None:
+            if mapped is error:
+                raise mapped
+            raise mapped from error
+        self.logger.warning(
+            f"{self.log_prefix} {mapped} – retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})"
+        )
+        return delay
+    
+    def _pace_delay(self) -> float:
+        """Seconds to queue before the next request on this API key."""
+        wait = self.pacer.reserve()
+        if wait > self.max_queue_wait:
+            raise self.error_class(
+                f"{self.display_name} rate limit: next slot in {wait:.0f}s",
+                status_code=429,
+                retry_after=wait
+            )
+        if wait > 0:
+            self.logger.info(f"{self.log_prefix} Rate limit pacing: waiting {wait:.2f}s")
+        return wait
+    
+    # ---- Public API ----------------------------------------------------------
+    
+    def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        timeout: int = 60
+    ) -> str:
+        """
+        Call the chat completion API (blocking).
+        
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            model: Model name (defaults to the provider default)
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            timeout: Request timeout in seconds
+        
+        Returns:
+            Generated text response
+        
+        Raises:
+            ProviderError: The provider's error class if the call fails
+        """
+        model = model or self.default_model
+        url, payload, headers = self._build_request(messages, model, temperature, max_tokens)
+        
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                wait = self._pace_delay()
+                if wait:
+                    time.sleep(wait)
+                response = self._session.post(url, json=payload, headers=headers, timeout=timeout)
+                self.pacer.update(response.headers, response.status_code)
+                data = response.json() if response.status_code == 200 else None
+                return self._parse_response(response.status_code, response.text, data, model, response.headers)
+            except Exception as e:
+                time.sleep(self._handle_failure(e, attempt))
+    
+    async def achat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        timeout: int = 60
+    ) -> str:
+        """
+        Call the chat completion API without blocking the event loop.
+        
+        Same arguments, return value and errors as ``chat_completion``.
+        """
+        model = model or self.default_model
+        url, payload, headers = self._build_request(messages, model, temperature, max_tokens)
+        client = self._http_client or get_async_client()
+        
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                wait = self._pace_delay()
+                if wait:
+                    await asyncio.sleep(wait)
+                response = await client.post(url, json=payload, headers=headers, timeout=timeout)
+                self.pacer.update(response.headers, response.status_code)
+                data = response.json() if response.status_code == 200 else None
+                return self._parse_response(response.status_code, response.text, data, model, response.headers)
+            except Exception as e:
+                await asyncio.sleep(self._handle_failure(e, attempt))
+    
+    async def astream_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        timeout: int = 60
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as text deltas (server-sent events).
+        
+        Failures are retried only until the first delta has been yielded.
+        
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            model: Model name (defaults to the provider default)
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            timeout: Request timeout in seconds
+        
+        Yields:
+            Text fragments in generation order
+        
+        Raises:
+            ProviderError: The provider's error class if the call fails
+        """
+        model = model or self.default_model
+        url, payload, headers = self._build_request(messages, model, temperature, max_tokens)
+        payload["stream"] = True
+        client = self._http_client or get_async_client()
+        
+        attempt = 0
+        produced = False
+        while True:
+            attempt += 1
+            try:
+                wait = self._pace_delay()
+                if wait:
+                    await asyncio.sleep(wait)
+                async with client.stream("POST", url, json=payload, headers=headers, timeout=timeout) as response:
+                    self.pacer.update(response.headers, response.status_code)
+                    if response.status_code != 200:
+                        body = (await response.aread()).decode("utf-8", errors="replace")
+                        self._parse_response(response.status_code, body, None, model, response.headers)
+                    
+                    async for data in aiter_sse_data(response):
+                        delta, done = self._parse_stream_data(data)
+                        if delta:
+                            produced = True
+                            yield delta
+                        if done:
+                            break
+                
+                self.logger.info(f"{self.log_prefix} model={model} stream=complete")
+                return
+            except Exception as e:
+                if produced:
+                    mapped = self._wrap_error(e)
+                    if mapped is e:
+                        raise
+                    raise mapped from e
+                await asyncio.sleep(self._handle_failure(e, attempt))
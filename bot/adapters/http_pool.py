@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+http_pool.py
+
+Shared keep-alive HTTP connection pool for async provider adapters.
+مجمع اتصالات HTTP مشترك للمحولات غير المتزامنة.
+
+One ``httpx.AsyncClient`` is kept per event loop so every adapter reuses the
+same TLS connections. HTTP/2 is enabled when the optional ``h2`` package is
+installed (``pip install httpx[http2]``).
+"""
+
+import asyncio
+import logging
+import os
+import weakref
+from typing import AsyncIterator, Optional
+
+try:  # pragma: no cover - optional dependency guard
+    import httpx
+except ImportError as exc:  # pragma: no cover - handled lazily
+    httpx = None  # type: ignore
+    _HTTPX_IMPORT_ERROR = exc
+else:
+    _HTTPX_IMPORT_ERROR = None
+
+try:  # pragma: no cover - optional dependency guard
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover - HTTP/1.1 fallback
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = int(os.getenv("BOT_HTTP_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE = int(os.getenv("BOT_HTTP_MAX_KEEPALIVE", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("BOT_HTTP_KEEPALIVE_EXPIRY", "30"))
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client() -> "httpx.AsyncClient":
+    """Get the pooled async HTTP client for the running event loop."""
+    if httpx is None:  # pragma: no cover - executed only when dependency missing
+        raise ImportError("httpx is required for async provider calls") from _HTTPX_IMPORT_ERROR
+    
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(60.0, connect=10.0)
+        )
+        _clients[loop] = client
+        logger.info(
+            f"[http_pool] Created pooled client http2={HTTP2_AVAILABLE} "
+            f"max_connections={MAX_CONNECTIONS} keepalive={MAX_KEEPALIVE}"
+        )
+    return client
+
+
+async def close_async_client() -> None:
+    """Close the pooled client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    client: Optional["httpx.AsyncClient"] = _clients.pop(loop, None)
+    if client is not None and not client.is_closed:
+        await client.aclose()
+        logger.info("[http_pool] Closed pooled client")
+
+
+async def aiter_sse_data(response: "httpx.Response") -> AsyncIterator[str]:
+    """
+    Yield the ``data:`` payloads of a server-sent event stream.
+    
+    Comment lines, event names and blank separators are skipped.
+    """
+    async for line in response.aiter_lines():
+        if not line.startswith("data:"):
+            continue
+        yield line[5:].strip()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+pacing.py
+
+Per-API-key request pacing from provider rate-limit headers.
+تنظيم وتيرة الطلبات لكل مفتاح حسب حدود الموفر.
+
+Providers report how many requests are left in the current window and when
+it resets (``x-ratelimit-*`` for OpenAI/Groq, ``anthropic-ratelimit-*`` for
+Anthropic), and send ``Retry-After`` with 429 responses. A ``RateLimitPacer``
+keeps that state per API key and tells callers how long to wait before the
+next request, so bursts queue briefly instead of being rejected upstream.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Parse a rate-limit reset value into seconds from now.
+    
+    Accepts plain seconds (``"2"``), Go-style durations (``"6m0s"``,
+    ``"250ms"``), RFC 3339 timestamps and HTTP dates.
+    
+    Returns:
+        Non-negative seconds, or None if the value cannot be parsed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        return sum(float(n) * _DURATION_UNITS[u] for n, u in parts)
+    
+    now = time.time() if now is None else now
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, moment.timestamp() - now)
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Read ``Retry-After`` (seconds or HTTP date) from response headers."""
+    if not headers:
+        return None
+    return parse_reset(headers.get("retry-after"))
+
+
+class RateLimitPacer:
+    """Request budget of one API key as last reported by the provider."""
+    
+    def __init__(
+        self,
+        remaining_header: str = "x-ratelimit-remaining-requests",
+        reset_header: str = "x-ratelimit-reset-requests",
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize pacer.
+        
+        Args:
+            remaining_header: Header with requests left in the window
+            reset_header: Header with the time until the window resets
+            clock: Monotonic time source
+        """
+        self.remaining_header = remaining_header
+        self.reset_header = reset_header
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.blocked_until = 0.0
+    
+    def reserve(self) -> float:
+        """
+        Claim a slot for the next request.
+        
+        Returns:
+            Seconds the caller should wait before sending (0 to send now)
+        """
+        with self._lock:
+            now = self._clock()
+            wait = max(0.0, self.blocked_until - now)
+            
+            if self.reset_at is not None and now >= self.reset_at:
+                # Window rolled over; the next response reports fresh numbers
+                self.remaining = None
+                self.reset_at = None
+            
+            if self.remaining is not None:
+                if self.remaining > 0:
+                    self.remaining -= 1
+                elif self.reset_at is not None:
+                    wait = max(wait, self.reset_at - now)
+            
+            return wait
+    
+    def update(self, headers: Optional[Mapping[str, str]], status_code: int) -> None:
+        """Record the rate-limit state reported with a response."""
+        if not headers:
+            return
+        
+        with self._lock:
+            now = self._clock()
+            remaining = headers.get(self.remaining_header)
+            if remaining is not None:
+                try:
+                    self.remaining = int(float(remaining))
+                except ValueError:
+                    pass
+            
+            reset = parse_reset(headers.get(self.reset_header))
+            if reset is not None:
+                self.reset_at = now + reset
+            
+            if status_code == 429:
+                retry_after = parse_retry_after(headers)
+                if retry_after is None:
+                    retry_after = reset
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+
+
+_pacers: Dict[Tuple[str, str], RateLimitPacer] = {}
+_pacers_lock = threading.Lock()
+
+
+def get_pacer(provider: str, api_key: str, remaining_header: str, reset_header: str) -> RateLimitPacer:
+    """Get the shared pacer of an API key (clients with the same key share it)."""
+    key = (provider, hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16])
+    with _pacers_lock:
+        pacer = _pacers.get(key)
+        if pacer is None:
+            pacer = _pacers[key] = RateLimitPacer(remaining_header, reset_header)
+        return pacer
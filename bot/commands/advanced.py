@@ -73,19 +73,32 @@ async def cmd_summarize(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     try:
         await update.message.chat.send_action("typing")
         
-        summary = client.chat_completion(
-            messages=summary_messages,
-            model=model,
-            temperature=0.3,
-            max_tokens=500
-        )
+        # Summaries of an unchanged conversation are reused (explicit opt-in)
+        response_cache = bot_data.get("response_cache")
+        if response_cache:
+            summary = await response_cache.acomplete(
+                client,
+                provider,
+                summary_messages,
+                model=model,
+                temperature=0.3,
+                max_tokens=500,
+                force=True
+            )
+        else:
+            summary = await client.achat_completion(
+                messages=summary_messages,
+                model=model,
+                temperature=0.3,
+                max_tokens=500
+            )
         
         await update.message.reply_markdown(
             f"📝 **ملخص المحادثة:**\n\n{summary}"
         )
         
         logger.info(f"[bot] user={user_id} cmd=summarize session={current_session}")
-        
+    
     except Exception as e:
         await update.message.reply_text(f"❌ فشل التلخيص: {e}")
         logger.error(f"[bot] user={user_id} summarize_error: {e}")
@@ -146,7 +159,7 @@ async def cmd_continue(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     try:
         await update.message.chat.send_action("typing")
         
-        continuation = client.chat_completion(
+        continuation = await client.achat_completion(
             messages=continue_messages,
             model=model,
             temperature=0.7,
@@ -165,7 +178,7 @@ async def cmd_continue(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         await update.message.reply_text(f"➕ **استمرار:**\n\n{continuation}")
         
         logger.info(f"[bot] user={user_id} cmd=continue session={current_session}")
-        
+    
     except Exception as e:
         await update.message.reply_text(f"❌ فشل الاستمرار: {e}")
         logger.error(f"[bot] user={user_id} continue_error: {e}")
@@ -205,7 +218,7 @@ async def cmd_regen(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.message.reply_text("ℹ️ لا يوجد رد من المساعد لإعادة توليده")
         return
     
-    # Remove last assistant message
+    # Remove last assistant message (from our copy; saved only once a new reply exists)
     messages.pop(last_assistant_idx)
     
     # Get AI client
@@ -239,14 +252,15 @@ async def cmd_regen(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     try:
         await update.message.chat.send_action("typing")
         
-        new_response = client.chat_completion(
+        new_response = await client.achat_completion(
             messages=api_messages,
             model=model,
             temperature=0.8,  # Higher temperature for variety
             max_tokens=1000
         )
         
-        # Add new response to session
+        # Replace the old response with the new one in the session
+        session_store.save_session(user_id, current_session, session_data)
         session_store.append_message(user_id, current_session, "assistant", new_response)
         
         # Add suggestions
@@ -257,12 +271,9 @@ async def cmd_regen(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         await update.message.reply_text(f"🔄 **رد جديد:**\n\n{new_response}")
         
         logger.info(f"[bot] user={user_id} cmd=regen session={current_session}")
-        
+    
     except Exception as e:
-        # Restore the removed message on error
-        session_data["messages"] = messages
-        session_store.save_session(user_id, current_session, session_data)
-        
+        # The stored session still holds the previous response
         await update.message.reply_text(f"❌ فشل إعادة التوليد: {e}")
         logger.error(f"[bot] user={user_id} regen_error: {e}")
 
@@ -11,6 +11,9 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from bot.core.response_cache import make_cache_key
+from bot.utils.stream_editor import StreamingReply
+
 logger = logging.getLogger(__name__)
 
 
@@ -36,18 +39,14 @@ async def process_chat_message(
     safety_filter = bot_data.get("safety_filter")
     response_builder = bot_data.get("response_builder")
     persona_manager = bot_data.get("persona_manager")
-    
-    # Check rate limit
-    if rate_limiter and not rate_limiter.check_limit(user_id):
-        remaining_time = rate_limiter.get_reset_time(user_id)
-        minutes = remaining_time // 60
-        await update.message.reply_text(
-            f"⏱️ **تم تجاوز حد الرسائل**\n\n"
-            f"لقد وصلت إلى الحد الأقصى للرسائل ({rate_limiter.max_messages} رسالة كل {rate_limiter.window_seconds // 60} دقيقة).\n"
-            f"الرجاء الانتظار {minutes} دقيقة تقريباً."
-        )
-        logger.warning(f"[bot] user={user_id} rate_limited")
-        return
+    model_registry = bot_data.get("model_registry")
+    context_builder = bot_data.get("context_builder")
+    summarizer = bot_data.get("summarizer")
+    response_cache = bot_data.get("response_cache")
+    provider_router = bot_data.get("provider_router")
+    singleflight = bot_data.get("singleflight")
+    max_tokens = 1000
+    temperature = bot_data.get("temperature", 0.7)
     
     # Safety check
     if safety_filter:
@@ -87,36 +86,142 @@ async def process_chat_message(
         logger.error(f"[bot] user={user_id} provider={provider} unavailable")
         return
     
+    # Check and record rate limit atomically (refunded if the call fails)
+    if rate_limiter and not rate_limiter.acquire(user_id):
+        remaining_time = rate_limiter.get_reset_time(user_id)
+        minutes = remaining_time // 60
+        await update.message.reply_text(
+            f"⏱️ **تم تجاوز حد الرسائل**\n\n"
+            f"لقد وصلت إلى الحد الأقصى للرسائل ({rate_limiter.max_messages} رسالة كل {rate_limiter.window_seconds // 60} دقيقة).\n"
+            f"الرجاء الانتظار {minutes} دقيقة تقريباً."
+        )
+        logger.warning(f"[bot] user={user_id} rate_limited")
+        return
+    
     # Save user message to session
     if session_store:
         session_store.append_message(user_id, current_session, "user", user_message)
     
     # Build messages for API
     messages = []
+    context_stats = None
+    system_prompt = persona_manager.get_system_prompt(persona) if persona_manager else None
     
-    # Add system prompt
-    if persona_manager:
-        system_prompt = persona_manager.get_system_prompt(persona)
-        messages.append({"role": "system", "content": system_prompt})
-    
-    # Add conversation history
-    if session_store:
-        history = session_store.get_messages(user_id, current_session)
-        messages.extend(history)
+    if session_store and context_builder:
+        # Running summary of older turns + the newest unsummarized turns
+        history = session_store.get_history(user_id, current_session)
+        summary = None
+        if summarizer:
+            summary = session_store.get_metadata(user_id, current_session, "summary")
+            if summary:
+                summary_upto = session_store.get_metadata(user_id, current_session, "summary_upto")
+                _, history = summarizer.split_history(history, summary_upto)
+        
+        # Pack them into the model's token budget
+        messages, context_stats = context_builder.build(
+            history,
+            model=model,
+            max_tokens=max_tokens,
+            system_prompt=system_prompt,
+            summary=summary
+        )
     else:
-        messages.append({"role": "user", "content": user_message})
+        # Add system prompt
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        
+        # Add conversation history
+        if session_store:
+            history = session_store.get_messages(user_id, current_session)
+            messages.extend(history)
+        else:
+            messages.append({"role": "user", "content": user_message})
+    
+    # Stream tokens into an edited placeholder when the model supports it
+    model_info = model_registry.get_model(model) if model_registry else None
+    use_streaming = (
+        bot_data.get("streaming", False)
+        and hasattr(client, "astream_chat_completion")
+        and (model_info is None or model_info.supports_streaming)
+    )
+    stream_reply = None
+    served_by = None
+    
+    # Reuse an identical answer when the temperature is low enough or chat
+    # caching is opted into (BOT_CACHE_CHAT)
+    cache_key = None
+    cached = None
+    force_cache = True if bot_data.get("cache_chat") else None
+    if response_cache and response_cache.is_cacheable(temperature, force_cache):
+        cache_key = make_cache_key(provider, model, messages, temperature, max_tokens)
+        cached = response_cache.get(cache_key)
     
     # Call AI
     try:
-        # Send "typing" indicator
-        await update.message.chat.send_action("typing")
+        if cached is not None:
+            response = cached
+        elif use_streaming:
+            # Streams are never coalesced: each reply edits its own message
+            stream_reply = StreamingReply(
+                update.message,
+                min_interval=bot_data.get("stream_edit_interval", 1.0)
+            )
+            await stream_reply.start()
+            
+            if provider_router:
+                # Fails over to an equivalent model until the first token arrives
+                stream = provider_router.astream(
+                    messages,
+                    provider=provider,
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            else:
+                stream = client.astream_chat_completion(
+                    messages=messages,
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            
+            response = ""
+            async for delta in stream:
+                response += delta
+                await stream_reply.update(response)
+        else:
+            # Send "typing" indicator
+            await update.message.chat.send_action("typing")
+            
+            async def call_provider():
+                if provider_router:
+                    # Failover (and optional hedging) across equivalent models
+                    result = await provider_router.complete(
+                        messages,
+                        provider=provider,
+                        model=model,
+                        temperature=temperature,
+                        max_tokens=max_tokens
+                    )
+                    return result.content, (result.provider, result.model)
+                content = await client.achat_completion(
+                    messages=messages,
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+                return content, (provider, model)
+            
+            if singleflight and cache_key:
+                # Identical concurrent cacheable prompts share one upstream call
+                response, route = await singleflight.do(cache_key, call_provider)
+            else:
+                response, route = await call_provider()
+            if route != (provider, model):
+                served_by = f"{route[0]}/{route[1]}"
         
-        response = client.chat_completion(
-            messages=messages,
-            model=model,
-            temperature=0.7,
-            max_tokens=1000
-        )
+        if cache_key and cached is None and response:
+            response_cache.set(cache_key, response)
         
         # Save assistant response
         if session_store:
@@ -130,27 +235,43 @@ async def process_chat_message(
         if response_builder:
             response = response_builder.truncate_if_needed(response, max_length=4000)
         
-        # Record message for rate limiting
-        if rate_limiter:
-            rate_limiter.record_message(user_id)
-        
         # Send response
-        await update.message.reply_text(response)
+        if stream_reply:
+            await stream_reply.finish(response)
+        else:
+            await update.message.reply_text(response)
         
         # Log with token approximation
         approx_tokens = len(user_message + response) // 4
         logger.info(
             f"[bot] user={user_id} cmd=chat session={current_session} "
             f"provider={provider} model={model} tokens_approx={approx_tokens}"
+            + (f" context={context_stats.used}/{context_stats.budget} dropped={context_stats.dropped}"
+               if context_stats else "")
+            + (f" stream_edits={stream_reply.edits}" if stream_reply else "")
+            + (" cache=hit" if cached is not None else "")
+            + (f" served_by={served_by}" if served_by else "")
         )
         
+        # Fold older turns into the running summary off the reply path
+        if session_store and summarizer and summarizer.enabled:
+            context.application.create_task(
+                summarizer.maybe_summarize(session_store, client, model, user_id, current_session)
+            )
+    
     except Exception as e:
+        if rate_limiter:
+            rate_limiter.refund(user_id)
+        
         error_msg = str(e)
         
         if response_builder:
             error_msg = response_builder.format_error(error_msg)
         
-        await update.message.reply_text(error_msg)
+        if stream_reply and stream_reply.started:
+            await stream_reply.finish(error_msg)
+        else:
+            await update.message.reply_text(error_msg)
         logger.error(f"[bot] user={user_id} chat_error: {e}")
 
 
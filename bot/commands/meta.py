@@ -142,6 +142,7 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     anthropic_client = bot_data.get("anthropic_client")
     groq_client = bot_data.get("groq_client")
     rate_limiter = bot_data.get("rate_limiter")
+    session_store = bot_data.get("session_store")
     
     # Build status message
     status_lines = [
@@ -179,6 +180,23 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         status_lines.append("")
         status_lines.append(f"**حد الرسائل:** {remaining}/{max_msgs} متبقي ({window} دقيقة)")
     
+    # Session cache info
+    if session_store and session_store.cache_size:
+        stats = session_store.get_cache_stats()
+        status_lines.append(
+            f"**ذاكرة الجلسات:** {stats['size']}/{stats['capacity']} "
+            f"(hits={stats['hits']} misses={stats['misses']} evictions={stats['evictions']})"
+        )
+    
+    # Response cache info
+    response_cache = bot_data.get("response_cache")
+    if response_cache:
+        stats = response_cache.get_stats()
+        status_lines.append(
+            f"**ذاكرة الردود:** {stats['size']}/{stats['capacity']} "
+            f"(hit_rate={stats['hit_rate']:.0%} hits={stats['hits']} misses={stats['misses']})"
+        )
+    
     await update.message.reply_markdown("\n".join(status_lines))
     logger.info(f"[bot] user={user_id} cmd=status")
 
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+context_builder.py
+
+Token-aware packing of chat history into a model's context window.
+بناء سياق المحادثة ضمن حدود التوكنات لكل نموذج.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.rag.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Per-message framing overhead (role markers, separators) in chat formats
+MESSAGE_OVERHEAD_TOKENS = 4
+DEFAULT_CONTEXT_WINDOW = 8192
+SUMMARY_PREFIX = "ملخص ما سبق من المحادثة (Summary of earlier conversation):"
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    """Get the token count of a message, preferring the cached ``tokens`` field."""
+    tokens = message.get("tokens")
+    if tokens is None:
+        tokens = estimate_tokens(message.get("content", ""))
+    return tokens + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class ContextStats:
+    """What the builder kept and dropped."""
+    budget: int
+    used: int
+    kept: int
+    dropped: int
+
+
+class ContextBuilder:
+    """Packs the most recent turns into a per-model token budget."""
+    
+    def __init__(
+        self,
+        model_registry=None,
+        max_context_tokens: int = 0,
+        default_context_window: int = DEFAULT_CONTEXT_WINDOW,
+        safety_margin: float = 0.05
+    ):
+        """
+        Initialize context builder.
+        
+        Args:
+            model_registry: ModelRegistry used to look up context windows
+            max_context_tokens: Cap on prompt tokens regardless of model (0 = no cap)
+            default_context_window: Window assumed for unknown models
+            safety_margin: Fraction of the window kept free for estimate error
+        """
+        self.model_registry = model_registry
+        self.max_context_tokens = max_context_tokens
+        self.default_context_window = default_context_window
+        self.safety_margin = safety_margin
+    
+    def get_budget(self, model: str, max_tokens: int) -> int:
+        """
+        Get the prompt token budget for a model.
+        
+        Args:
+            model: Model name
+            max_tokens: Tokens reserved for the completion
+        
+        Returns:
+            Tokens available for system prompt and history
+        """
+        model_info = self.model_registry.get_model(model) if self.model_registry else None
+        window = model_info.context_window if model_info else self.default_context_window
+        
+        budget = int(window * (1 - self.safety_margin)) - max_tokens
+        if self.max_context_tokens:
+            budget = min(budget, self.max_context_tokens)
+        return max(budget, 0)
+    
+    def build(
+        self,
+        history: List[Dict[str, Any]],
+        model: str,
+        max_tokens: int,
+        system_prompt: Optional[str] = None,
+        summary: Optional[str] = None
+    ) -> Tuple[List[Dict[str, str]], ContextStats]:
+        """
+        Build the API message list from the newest turns that fit.
+        
+        The newest message is always kept. Older turns are added while they
+        fit, and the window never starts with an assistant turn (providers
+        such as Anthropic require the first message to come from the user).
+        
+        Args:
+            history: Stored session messages, oldest first
+            model: Target model name
+            max_tokens: Tokens reserved for the completion
+            system_prompt: Optional system prompt, always included
+            summary: Optional running summary of older turns, always included
+        
+        Returns:
+            Tuple of (messages in API format, ContextStats)
+        """
+        budget = self.get_budget(model, max_tokens)
+        used = 0
+        messages: List[Dict[str, str]] = []
+        
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+            used += estimate_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        
+        if summary:
+            summary_content = f"{SUMMARY_PREFIX}\n{summary}"
+            messages.append({"role": "system", "content": summary_content})
+            used += estimate_tokens(summary_content) + MESSAGE_OVERHEAD_TOKENS
+        
+        start = len(history)
+        for index in range(len(history) - 1, -1, -1):
+            cost = message_tokens(history[index])
+            if used + cost > budget and start < len(history):
+                break
+            used += cost
+            start = index
+        
+        # Drop leading assistant turns so the window opens with the user
+        while start < len(history) - 1 and history[start].get("role") == "assistant":
+            used -= message_tokens(history[start])
+            start += 1
+        
+        messages.extend(
+            {"role": msg["role"], "content": msg["content"]}
+            for msg in history[start:]
+        )
+        
+        stats = ContextStats(budget=budget, used=used, kept=len(history) - start, dropped=start)
+        if start:
+            logger.debug(
+                f"[context_builder] model={model} kept={stats.kept} dropped={stats.dropped} "
+                f"tokens={used}/{budget}"
+            )
+        return messages, stats
@@ -23,6 +23,7 @@ class ModelInfo:
     description: str
     context_window: int
     supports_streaming: bool = False
+    tier: str = ""  # Models of the same tier are interchangeable for failover
 
 
 class ModelRegistry:
@@ -41,7 +42,8 @@ class ModelRegistry:
             display_name="GPT-4o Mini",
             description="Fast and efficient OpenAI model",
             context_window=128000,
-            supports_streaming=True
+            supports_streaming=True,
+            tier="fast"
         ))
         
         self.register_model(ModelInfo(
@@ -50,7 +52,8 @@ class ModelRegistry:
             display_name="GPT-4o",
             description="Most capable OpenAI model",
             context_window=128000,
-            supports_streaming=True
+            supports_streaming=True,
+            tier="flagship"
         ))
         
         self.register_model(ModelInfo(
@@ -59,7 +62,8 @@ class ModelRegistry:
             display_name="GPT-4 Turbo",
             description="High performance GPT-4 variant",
             context_window=128000,
-            supports_streaming=True
+            supports_streaming=True,
+            tier="flagship"
         ))
         
         # Anthropic models
@@ -69,7 +73,8 @@ class ModelRegistry:
             display_name="Claude 3.5 Sonnet",
             description="Most intelligent Claude model",
             context_window=200000,
-            supports_streaming=True
+            supports_streaming=True,
+            tier="flagship"
         ))
         
         self.register_model(ModelInfo(
@@ -78,7 +83,8 @@ class ModelRegistry:
             display_name="Claude 3 Haiku",
             description="Fast and compact Claude model",
             context_window=200000,
-            supports_streaming=True
+            supports_streaming=True,
+            tier="fast"
         ))
         
         # Groq models
@@ -88,7 +94,8 @@ class ModelRegistry:
             display_name="Llama 3.1 70B",
             description="Fast Llama inference via Groq",
             context_window=32000,
-            supports_streaming=True
+            supports_streaming=True,
+            tier="fast"
         ))
         
         self.register_model(ModelInfo(
@@ -97,7 +104,8 @@ class ModelRegistry:
             display_name="Mixtral 8x7B",
             description="Mixture of experts model via Groq",
             context_window=32768,
-            supports_streaming=True
+            supports_streaming=True,
+            tier="fast"
         ))
         
         logger.info(f"[model_registry] Registered {len(self.models)} models")
@@ -121,6 +129,16 @@ class ModelRegistry:
         """List all unique providers."""
         return sorted(set(m.provider for m in self.models.values()))
     
+    def list_equivalents(self, model_name: str) -> List[ModelInfo]:
+        """List models of the same tier on other providers (failover targets)."""
+        model = self.get_model(model_name)
+        if not model or not model.tier:
+            return []
+        return [
+            m for m in self.models.values()
+            if m.tier == model.tier and m.provider != model.provider
+        ]
+    
     def get_default_model(self, provider: str = "openai") -> str:
         """Get default model for a provider."""
         defaults = {
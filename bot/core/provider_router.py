@@ -0,0 +1,387 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+provider_router.py
+
+Failover and hedged requests across the LLM provider adapters.
+توجيه الطلبات بين الموفرين مع التحويل التلقائي عند الأعطال.
+
+The router keeps rolling latency and error-rate windows per (provider, model).
+A request goes to the selected model first. On a timeout, a connection error
+or a 5xx/429 response it fails over to a model of the same tier on another
+provider (``ModelInfo.tier``), healthiest first, skipping models whose context
+window cannot hold the request. With hedging enabled, a second
+request is fired at the next candidate once the first has run longer than its
+p95 latency, and whichever answer arrives first wins; the loser is cancelled.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+from bot.adapters.http_pool import httpx
+from bot.core.context_builder import message_tokens
+
+logger = logging.getLogger(__name__)
+
+Route = Tuple[str, str]  # (provider, model)
+
+
+class ProviderUnavailableError(Exception):
+    """No configured provider could serve the request."""
+    pass
+
+
+@dataclass
+class RouteResult:
+    """Completion text and the route that produced it."""
+    content: str
+    provider: str
+    model: str
+    latency: float
+    attempts: int
+    hedged: bool = False
+
+
+class RouteStats:
+    """Rolling latency and outcome window of one route."""
+    
+    def __init__(self, window: int = 100):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+    
+    def record_success(self, latency: Optional[float] = None) -> None:
+        """Record a successful call (streams record no latency)."""
+        if latency is not None:
+            self.latencies.append(latency)
+        self.outcomes.append(True)
+    
+    def record_error(self) -> None:
+        """Record a failed call."""
+        self.outcomes.append(False)
+    
+    @property
+    def samples(self) -> int:
+        """Number of outcomes in the window."""
+        return len(self.outcomes)
+    
+    @property
+    def error_rate(self) -> float:
+        """Share of failed calls in the window."""
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+    
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile (0-1) of successful calls, None without samples."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def is_failover_error(error: BaseException) -> bool:
+    """
+    Decide whether an error is worth retrying on another provider.
+    
+    Timeouts, connection errors and 5xx/408/429 responses are. Other 4xx
+    responses (bad request, auth) and non-HTTP errors such as a missing API
+    key or an unparseable response are raised to the caller.
+    """
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    if getattr(error, "timeout", False) or getattr(error, "transient", False):
+        return True
+    if httpx is not None and isinstance(error, httpx.TransportError):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        return False
+    return status_code >= 500 or status_code in (408, 429)
+
+
+class ProviderRouter:
+    """Routes chat completions across provider adapters with failover and hedging."""
+    
+    def __init__(
+        self,
+        clients: Dict[str, object],
+        model_registry=None,
+        attempt_timeout: float = 30.0,
+        hedge: bool = False,
+        hedge_min_delay: float = 1.0,
+        min_samples: int = 20,
+        unhealthy_error_rate: float = 0.5,
+        window: int = 100
+    ):
+        """
+        Initialize provider router.
+        
+        Args:
+            clients: Adapters by provider name
+            model_registry: Registry used to find equivalent models
+            attempt_timeout: Seconds before a single attempt counts as timed out
+            hedge: Fire a second request when the first exceeds its p95
+            hedge_min_delay: Lower bound of the hedge delay in seconds
+            min_samples: Samples needed before p95/error rate are trusted
+            unhealthy_error_rate: Error rate that demotes the selected route
+            window: Rolling window size per route
+        """
+        self.clients = clients
+        self.model_registry = model_registry
+        self.attempt_timeout = attempt_timeout
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.min_samples = min_samples
+        self.unhealthy_error_rate = unhealthy_error_rate
+        self.window = window
+        self._stats: Dict[Route, RouteStats] = {}
+    
+    def stats_for(self, provider: str, model: str) -> RouteStats:
+        """Get (or create) the rolling stats of a route."""
+        route = (provider, model)
+        stats = self._stats.get(route)
+        if stats is None:
+            stats = self._stats[route] = RouteStats(self.window)
+        return stats
+    
+    def _is_unhealthy(self, route: Route) -> bool:
+        """Whether a route has failed too often recently."""
+        stats = self.stats_for(*route)
+        return stats.samples >= self.min_samples and stats.error_rate >= self.unhealthy_error_rate
+    
+    def _health_key(self, route: Route) -> Tuple[float, float]:
+        """Sort key: lower error rate first, then lower p95."""
+        stats = self.stats_for(*route)
+        p95 = stats.percentile(0.95)
+        return (stats.error_rate, p95 if p95 is not None else float("inf"))
+    
+    def candidates(self, provider: str, model: str, required_tokens: int = 0) -> List[Route]:
+        """
+        Ordered routes for a request.
+        
+        The selected route comes first unless it is unhealthy; equivalent
+        models on other configured providers follow, healthiest first.
+        Equivalents whose context window is smaller than ``required_tokens``
+        (prompt plus completion) are left out.
+        """
+        primary = (provider, model)
+        alternatives = []
+        if self.model_registry:
+            alternatives = [
+                (m.provider, m.name) for m in self.model_registry.list_equivalents(model)
+                if m.context_window >= required_tokens
+            ]
+        alternatives = [route for route in alternatives if self._client(route[0])]
+        alternatives.sort(key=self._health_key)
+        
+        routes = [primary] if self._client(provider) else []
+        if routes and alternatives and self._is_unhealthy(primary):
+            return alternatives + routes
+        return routes + alternatives
+    
+    @staticmethod
+    def required_tokens(messages: List[Dict[str, str]], max_tokens: int) -> int:
+        """Estimated context a request needs: its prompt plus the completion budget."""
+        return sum(message_tokens(m) for m in messages) + max_tokens
+    
+    def _client(self, provider: str):
+        """Get an available client or None."""
+        client = self.clients.get(provider)
+        return client if client and client.is_available() else None
+    
+    def hedge_delay(self, provider: str, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a route (None until p95 is known)."""
+        stats = self.stats_for(provider, model)
+        if len(stats.latencies) < self.min_samples:
+            return None
+        return max(self.hedge_min_delay, stats.percentile(0.95))
+    
+    async def _attempt(
+        self,
+        route: Route,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """Call one route and record its outcome."""
+        provider, model = route
+        stats = self.stats_for(provider, model)
+        started = time.monotonic()
+        try:
+            content = await asyncio.wait_for(
+                self.clients[provider].achat_completion(
+                    messages=messages,
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                ),
+                timeout=self.attempt_timeout
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            stats.record_error()
+            raise
+        stats.record_success(time.monotonic() - started)
+        return content
+    
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        provider: str,
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000,
+        hedge: Optional[bool] = None
+    ) -> RouteResult:
+        """
+        Complete a chat with failover (and optional hedging).
+        
+        Args:
+            messages: Chat messages
+            provider: Selected provider
+            model: Selected model
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            hedge: Override the router-wide hedging setting
+        
+        Returns:
+            RouteResult of the first successful route
+        
+        Raises:
+            ProviderUnavailableError: If no route is configured
+            Exception: The last adapter error if every route failed
+        """
+        routes = self.candidates(provider, model, self.required_tokens(messages, max_tokens))
+        if not routes:
+            raise ProviderUnavailableError(f"No available provider for {provider}/{model}")
+        
+        hedge = self.hedge if hedge is None else hedge
+        queue = iter(routes)
+        pending: Dict[asyncio.Task, Route] = {}
+        started = time.monotonic()
+        attempts = 0
+        hedged = False
+        failover = True
+        last_error: Optional[BaseException] = None
+        
+        def launch() -> bool:
+            nonlocal attempts
+            route = next(queue, None)
+            if route is None:
+                return False
+            attempts += 1
+            task = asyncio.ensure_future(self._attempt(route, messages, temperature, max_tokens))
+            pending[task] = route
+            return True
+        
+        launch()
+        try:
+            while pending:
+                delay = None
+                if hedge and not hedged and len(pending) == 1 and attempts < len(routes):
+                    current = next(iter(pending.values()))
+                    delay = self.hedge_delay(*current)
+                
+                done, _ = await asyncio.wait(
+                    list(pending), timeout=delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    logger.info(f"[provider_router] Hedging {current[0]}/{current[1]} after {delay:.2f}s")
+                    launch()
+                    continue
+                
+                for task in done:
+                    route = pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        if attempts > 1:
+                            logger.info(
+                                f"[provider_router] Served by {route[0]}/{route[1]} "
+                                f"after {attempts} attempts (hedged={hedged})"
+                            )
+                        return RouteResult(
+                            content=task.result(),
+                            provider=route[0],
+                            model=route[1],
+                            latency=time.monotonic() - started,
+                            attempts=attempts,
+                            hedged=hedged
+                        )
+                    
+                    last_error = error
+                    if is_failover_error(error):
+                        logger.warning(f"[provider_router] {route[0]}/{route[1]} failed, failing over: {error!r}")
+                    else:
+                        failover = False
+                
+                if not pending and failover:
+                    launch()
+        finally:
+            # Cancel the losing attempt and let it release its connection
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        raise last_error
+    
+    async def astream(
+        self,
+        messages: List[Dict[str, str]],
+        provider: str,
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int = 1000
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion, failing over until the first delta arrives.
+        
+        Once a route has produced text it is committed to; later errors are
+        raised to the caller. Streams are never hedged.
+        """
+        routes = self.candidates(provider, model, self.required_tokens(messages, max_tokens))
+        if not routes:
+            raise ProviderUnavailableError(f"No available provider for {provider}/{model}")
+        
+        last_error: Optional[BaseException] = None
+        for route_provider, route_model in routes:
+            stats = self.stats_for(route_provider, route_model)
+            produced = False
+            try:
+                async for delta in self.clients[route_provider].astream_chat_completion(
+                    messages=messages,
+                    model=route_model,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                ):
+                    produced = True
+                    yield delta
+            except Exception as e:
+                stats.record_error()
+                if produced or not is_failover_error(e):
+                    raise
+                last_error = e
+                logger.warning(f"[provider_router] {route_provider}/{route_model} stream failed, failing over: {e!r}")
+                continue
+            stats.record_success()
+            return
+        
+        raise last_error
+    
+    def get_stats(self) -> Dict[str, Dict[str, object]]:
+        """Get rolling stats per route."""
+        return {
+            f"{provider}/{model}": {
+                "samples": stats.samples,
+                "error_rate": round(stats.error_rate, 3),
+                "p50": stats.percentile(0.5),
+                "p95": stats.percentile(0.95),
+            }
+            for (provider, model), stats in self._stats.items()
+        }
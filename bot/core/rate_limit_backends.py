@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+rate_limit_backends.py
+
+Pluggable state backends for the sliding-window RateLimiter.
+واجهات تخزين حالة تحديد المعدل (ذاكرة محلية أو Redis مشترك).
+
+The in-memory backend keeps per-process deques. The Redis backend keeps one
+sorted set per user so every bot replica enforces the same quota; the
+check-and-record step runs as a single Lua script (one round trip, atomic)
+timed by the Redis server clock, so replica clock skew cannot shift windows.
+"""
+
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+try:  # pragma: no cover - optional dependency guard
+    import redis
+    from redis.exceptions import RedisError
+except ImportError as exc:  # pragma: no cover - handled lazily
+    redis = None  # type: ignore
+    # An injected client (e.g. fakeredis) may still raise; fail open on anything
+    RedisError = Exception  # type: ignore
+    _REDIS_IMPORT_ERROR = exc
+else:
+    _REDIS_IMPORT_ERROR = None
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitBackend(ABC):
+    """Storage interface for per-user message timestamps."""
+    
+    @abstractmethod
+    def acquire(self, user_id: int, now: float, window: float, limit: int) -> Tuple[bool, int]:
+        """
+        Atomically check the quota and record a message if allowed.
+        
+        Returns:
+            Tuple of (allowed, messages in window after the call)
+        """
+    
+    @abstractmethod
+    def record(self, user_id: int, now: float, window: float, limit: int) -> None:
+        """Record a message unconditionally, keeping at most ``limit`` entries."""
+    
+    @abstractmethod
+    def refund(self, user_id: int) -> None:
+        """Remove the entry of the user's latest acquire (e.g. when the request failed)."""
+    
+    @abstractmethod
+    def usage(self, user_id: int, now: float, window: float) -> Tuple[int, Optional[float]]:
+        """
+        Get the window usage of a user.
+        
+        Returns:
+            Tuple of (messages in window, oldest timestamp or None)
+        """
+    
+    def sweep(self, now: float, window: float) -> int:
+        """Forget idle users; returns how many were removed."""
+        return 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get backend statistics."""
+        return {}
+    
+    def close(self) -> None:
+        """Release backend resources."""
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Per-process backend: one bounded deque of epoch floats per user."""
+    
+    def __init__(self):
+        """Initialize in-memory backend."""
+        self.user_logs: Dict[int, Deque[float]] = {}
+    
+    def _trim(self, user_id: int, now: float, window: float) -> Optional[Deque[float]]:
+        """Drop timestamps outside the window and return the user's log."""
+        log = self.user_logs.get(user_id)
+        if log:
+            cutoff = now - window
+            while log and log[0] <= cutoff:
+                log.popleft()
+        return log
+    
+    def acquire(self, user_id: int, now: float, window: float, limit: int) -> Tuple[bool, int]:
+        """Check the quota and record a message if allowed."""
+        count = len(self._trim(user_id, now, window) or ())
+        if count >= limit:
+            return False, count
+        self.record(user_id, now, window, limit)
+        return True, count + 1
+    
+    def record(self, user_id: int, now: float, window: float, limit: int) -> None:
+        """Record a message timestamp."""
+        log = self.user_logs.get(user_id)
+        if log is None or log.maxlen != limit:
+            log = self.user_logs[user_id] = deque(log or (), maxlen=limit)
+        log.append(now)
+    
+    def refund(self, user_id: int) -> None:
+        """Remove the most recent timestamp."""
+        log = self.user_logs.get(user_id)
+        if log:
+            log.pop()
+    
+    def usage(self, user_id: int, now: float, window: float) -> Tuple[int, Optional[float]]:
+        """Get message count and oldest timestamp inside the window."""
+        log = self._trim(user_id, now, window)
+        if not log:
+            return 0, None
+        # Timestamps are appended in order, so the oldest is at the left
+        return len(log), log[0]
+    
+    def sweep(self, now: float, window: float) -> int:
+        """Forget users with no timestamps inside the window."""
+        cutoff = now - window
+        idle = [uid for uid, log in self.user_logs.items() if not log or log[-1] <= cutoff]
+        for uid in idle:
+            del self.user_logs[uid]
+        return len(idle)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get tracked user and timestamp counts."""
+        return {
+            "backend": "memory",
+            "users": len(self.user_logs),
+            "entries": sum(len(log) for log in self.user_logs.values()),
+        }
+
+
+# KEYS[1]=user key; ARGV: window, limit, member, force
+_ACQUIRE_SCRIPT = """
+local key = KEYS[1]
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+local count = redis.call('ZCARD', key)
+if count >= limit and ARGV[4] ~= '1' then
+    return {0, count}
+end
+redis.call('ZADD', key, now, ARGV[3])
+redis.call('ZREMRANGEBYRANK', key, 0, -(limit + 1))
+redis.call('PEXPIRE', key, math.ceil(window * 1000))
+return {1, math.min(count + 1, limit)}
+"""
+
+# KEYS[1]=user key; ARGV: window. Returns count, server seconds, microseconds, oldest score
+_USAGE_SCRIPT = """
+local key = KEYS[1]
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', key, '-inf', now - tonumber(ARGV[1]))
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+return {redis.call('ZCARD', key), time[1], time[2], oldest[2] or false}
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Shared backend storing each user's timestamps in a Redis sorted set.
+    
+    Entries are timestamped with the Redis server clock, so the ``now``
+    passed in is only used to report the oldest entry on the caller's clock.
+    Keys expire one window after the last message, so idle users are
+    dropped by Redis itself. When Redis is unreachable the limiter fails
+    open (the message is allowed) and logs a warning.
+    """
+    
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        client: Optional["redis.Redis"] = None,
+        prefix: str = "bot:ratelimit:"
+    ):
+        """
+        Initialize Redis backend.
+        
+        Args:
+            url: Redis connection URL (ignored when client is given)
+            client: Existing redis.Redis client
+            prefix: Key prefix for per-user sorted sets
+        """
+        if client is None:
+            if redis is None:  # pragma: no cover - executed only when dependency missing
+                raise ImportError("redis is required for the Redis rate limit backend") from _REDIS_IMPORT_ERROR
+            client = redis.Redis.from_url(url)
+        
+        self.client = client
+        self.prefix = prefix
+        self._acquire = client.register_script(_ACQUIRE_SCRIPT)
+        self._usage = client.register_script(_USAGE_SCRIPT)
+        # Member added by each user's latest acquire, so refund removes exactly that slot
+        self._acquired: Dict[int, Tuple[str, float]] = {}
+        self.errors = 0
+    
+    def _key(self, user_id: int) -> str:
+        """Build the sorted set key of a user."""
+        return f"{self.prefix}{user_id}"
+    
+    def _run(self, user_id: int, window: float, limit: int, force: bool) -> Tuple[bool, int, str]:
+        """Run the check-and-record script."""
+        # Unique member so two messages in the same microsecond both count
+        member = uuid.uuid4().hex
+        allowed, count = self._acquire(
+            keys=[self._key(user_id)],
+            args=[repr(float(window)), limit, member, "1" if force else "0"]
+        )
+        return bool(allowed), int(count), member
+    
+    def acquire(self, user_id: int, now: float, window: float, limit: int) -> Tuple[bool, int]:
+        """Check the quota and record a message in one round trip."""
+        try:
+            allowed, count, member = self._run(user_id, window, limit, force=False)
+            if allowed:
+                self._acquired[user_id] = (member, now)
+            return allowed, count
+        except RedisError as e:
+            self.errors += 1
+            logger.warning(f"[rate_limiter] Redis unavailable, allowing user {user_id}: {e}")
+            return True, 0
+    
+    def record(self, user_id: int, now: float, window: float, limit: int) -> None:
+        """Record a message unconditionally."""
+        try:
+            self._run(user_id, window, limit, force=True)
+        except RedisError as e:
+            self.errors += 1
+            logger.warning(f"[rate_limiter] Redis unavailable, message not recorded: {e}")
+    
+    def refund(self, user_id: int) -> None:
+        """Remove the entry this backend's latest acquire added for the user."""
+        acquired = self._acquired.pop(user_id, None)
+        if acquired is None:
+            return
+        try:
+            # Not ZPOPMAX: another replica may have added a newer entry since
+            self.client.zrem(self._key(user_id), acquired[0])
+        except RedisError as e:
+            self.errors += 1
+            logger.warning(f"[rate_limiter] Redis unavailable, refund skipped: {e}")
+    
+    def usage(self, user_id: int, now: float, window: float) -> Tuple[int, Optional[float]]:
+        """Get message count and oldest timestamp inside the window."""
+        try:
+            count, seconds, micros, oldest = self._usage(keys=[self._key(user_id)], args=[repr(float(window))])
+        except RedisError as e:
+            self.errors += 1
+            logger.warning(f"[rate_limiter] Redis unavailable, usage unknown: {e}")
+            return 0, None
+        
+        if oldest is None:
+            return int(count), None
+        # Report the oldest entry's age relative to the caller's clock
+        server_now = int(seconds) + int(micros) / 1_000_000
+        return int(count), now - (server_now - float(oldest))
+    
+    def sweep(self, now: float, window: float) -> int:
+        """Forget refund bookkeeping older than the window; Redis expires the keys."""
+        cutoff = now - window
+        stale = [uid for uid, (_, at) in list(self._acquired.items()) if at <= cutoff]
+        for uid in stale:
+            self._acquired.pop(uid, None)
+        return len(stale)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get backend statistics."""
+        return {"backend": "redis", "errors": self.errors}
+    
+    def close(self) -> None:
+        """Close the Redis connection pool."""
+        self.client.close()
+
+
+def create_rate_limit_backend(kind: str = "memory", **options: Any) -> RateLimitBackend:
+    """
+    Build a rate limit backend by name.
+    
+    Args:
+        kind: "memory" or "redis"
+        **options: Backend-specific options (e.g. url, prefix)
+    
+    Raises:
+        ValueError: If the backend is unknown
+    """
+    if kind == "redis":
+        return RedisRateLimitBackend(**options)
+    if kind == "memory":
+        return InMemoryRateLimitBackend()
+    raise ValueError(f"Unknown rate limit backend: {kind}")
@@ -5,40 +5,74 @@ rate_limiter.py
 
 Per-user rate limiting with sliding window.
 تحديد معدل الرسائل لكل مستخدم.
+
+RateLimiter keeps a fixed-size window of epoch timestamps per user in a
+pluggable backend (in-memory deques by default, or Redis so several bot
+replicas share one quota). Idle users are swept out periodically.
+GCRARateLimiter is an in-memory alternative storing one float per user.
 """
 
 import logging
-from typing import Dict, List
-from datetime import datetime, timedelta
+import math
+import time
+from typing import Any, Callable, Dict, Optional
+
+from bot.core.rate_limit_backends import InMemoryRateLimitBackend, RateLimitBackend
 
 logger = logging.getLogger(__name__)
 
 
 class RateLimiter:
-    """Simple in-memory rate limiter with sliding window."""
+    """Sliding-window rate limiter over a pluggable state backend."""
     
-    def __init__(self, window_seconds: int = 3600, max_messages: int = 30):
+    def __init__(
+        self,
+        window_seconds: int = 3600,
+        max_messages: int = 30,
+        sweep_interval: float = 300.0,
+        clock: Callable[[], float] = time.time,
+        backend: Optional[RateLimitBackend] = None
+    ):
         """
         Initialize rate limiter.
         
         Args:
             window_seconds: Time window in seconds (default 1 hour)
             max_messages: Maximum messages per window (default 30)
+            sweep_interval: Seconds between idle-user sweeps (0 disables)
+            clock: Time source returning epoch seconds
+            backend: State backend (default: in-memory deques)
         """
         self.window_seconds = window_seconds
         self.max_messages = max_messages
-        self.user_logs: Dict[int, List[datetime]] = {}
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self.backend = backend or InMemoryRateLimitBackend()
+        self._next_sweep = clock() + sweep_interval
         logger.info(f"[rate_limiter] Initialized: {max_messages} msgs per {window_seconds}s")
     
-    def _clean_old_entries(self, user_id: int) -> None:
-        """Remove timestamps outside the current window."""
-        if user_id not in self.user_logs:
-            return
+    def _maybe_sweep(self, now: float) -> None:
+        """Run an idle-user sweep when the sweep interval has elapsed."""
+        if self.sweep_interval and now >= self._next_sweep:
+            self.sweep(now)
+    
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Forget users with no timestamps inside the window.
+        
+        Args:
+            now: Current time (defaults to the limiter clock)
         
-        cutoff = datetime.utcnow() - timedelta(seconds=self.window_seconds)
-        self.user_logs[user_id] = [
-            ts for ts in self.user_logs[user_id] if ts > cutoff
-        ]
+        Returns:
+            Number of users removed
+        """
+        now = self._clock() if now is None else now
+        removed = self.backend.sweep(now, self.window_seconds)
+        self._next_sweep = now + self.sweep_interval
+        
+        if removed:
+            logger.debug(f"[rate_limiter] Swept {removed} idle users")
+        return removed
     
     def check_limit(self, user_id: int) -> bool:
         """
@@ -47,12 +81,9 @@ class RateLimiter:
         Returns:
             True if user can proceed, False if rate limited
         """
-        self._clean_old_entries(user_id)
-        
-        if user_id not in self.user_logs:
-            self.user_logs[user_id] = []
-        
-        current_count = len(self.user_logs[user_id])
+        now = self._clock()
+        self._maybe_sweep(now)
+        current_count, _ = self.backend.usage(user_id, now, self.window_seconds)
         
         if current_count >= self.max_messages:
             logger.warning(f"[rate_limiter] User {user_id} rate limited: {current_count}/{self.max_messages}")
@@ -60,35 +91,192 @@ class RateLimiter:
         
         return True
     
+    def acquire(self, user_id: int) -> bool:
+        """
+        Check the limit and record the message in one atomic step.
+        
+        Use this instead of check_limit + record_message when several bot
+        replicas share the backend; call refund() if the request fails.
+        
+        Returns:
+            True if user can proceed, False if rate limited
+        """
+        now = self._clock()
+        self._maybe_sweep(now)
+        allowed, current_count = self.backend.acquire(user_id, now, self.window_seconds, self.max_messages)
+        
+        if not allowed:
+            logger.warning(f"[rate_limiter] User {user_id} rate limited: {current_count}/{self.max_messages}")
+        return allowed
+    
+    def refund(self, user_id: int) -> None:
+        """Give back the most recently acquired message."""
+        self.backend.refund(user_id)
+    
     def record_message(self, user_id: int) -> None:
         """Record a message from user."""
-        if user_id not in self.user_logs:
-            self.user_logs[user_id] = []
-        
-        self.user_logs[user_id].append(datetime.utcnow())
+        self.backend.record(user_id, self._clock(), self.window_seconds, self.max_messages)
         logger.debug(f"[rate_limiter] Recorded message for user {user_id}")
     
     def get_remaining(self, user_id: int) -> int:
         """Get remaining message quota for user."""
-        self._clean_old_entries(user_id)
-        
-        if user_id not in self.user_logs:
-            return self.max_messages
-        
-        return max(0, self.max_messages - len(self.user_logs[user_id]))
+        current_count, _ = self.backend.usage(user_id, self._clock(), self.window_seconds)
+        return max(0, self.max_messages - current_count)
     
     def get_reset_time(self, user_id: int) -> int:
         """Get seconds until rate limit resets for user."""
-        self._clean_old_entries(user_id)
-        
-        if user_id not in self.user_logs or not self.user_logs[user_id]:
+        now = self._clock()
+        _, oldest = self.backend.usage(user_id, now, self.window_seconds)
+        if oldest is None:
             return 0
         
-        oldest = min(self.user_logs[user_id])
-        reset_time = oldest + timedelta(seconds=self.window_seconds)
-        now = datetime.utcnow()
+        reset_in = oldest + self.window_seconds - now
+        return max(0, int(reset_in))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backend statistics (tracked users, entries, errors)."""
+        return self.backend.stats()
+    
+    def close(self) -> None:
+        """Release backend resources."""
+        self.backend.close()
+
+
+class GCRARateLimiter:
+    """
+    Generic cell rate algorithm limiter storing one float per user.
+    
+    Allows bursts of up to ``max_messages`` and then one message every
+    ``window_seconds / max_messages`` seconds, so quota refills gradually
+    instead of all at once when the window ends.
+    """
+    
+    def __init__(
+        self,
+        window_seconds: int = 3600,
+        max_messages: int = 30,
+        sweep_interval: float = 300.0,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Initialize GCRA rate limiter.
         
-        if reset_time <= now:
-            return 0
+        Args:
+            window_seconds: Time window in seconds (default 1 hour)
+            max_messages: Maximum burst size per window (default 30)
+            sweep_interval: Seconds between idle-user sweeps (0 disables)
+            clock: Time source returning epoch seconds
+        """
+        self.window_seconds = window_seconds
+        self.max_messages = max_messages
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+        self._interval = window_seconds / max_messages
+        # Theoretical arrival time per user; at or before now means a full quota
+        self.user_tat: Dict[int, float] = {}
+        self._next_sweep = clock() + sweep_interval
+        logger.info(f"[rate_limiter] Initialized GCRA: {max_messages} msgs per {window_seconds}s")
+    
+    def sweep(self, now: Optional[float] = None) -> int:
+        """
+        Forget users whose quota has fully refilled.
+        
+        Args:
+            now: Current time (defaults to the limiter clock)
+        
+        Returns:
+            Number of users removed
+        """
+        now = self._clock() if now is None else now
+        idle = [uid for uid, tat in self.user_tat.items() if tat <= now]
+        for uid in idle:
+            del self.user_tat[uid]
+        self._next_sweep = now + self.sweep_interval
         
-        return int((reset_time - now).total_seconds())
+        if idle:
+            logger.debug(f"[rate_limiter] Swept {len(idle)} idle users, {len(self.user_tat)} tracked")
+        return len(idle)
+    
+    def check_limit(self, user_id: int) -> bool:
+        """
+        Check if user is within rate limit.
+        
+        Returns:
+            True if user can proceed, False if rate limited
+        """
+        now = self._clock()
+        if self.sweep_interval and now >= self._next_sweep:
+            self.sweep(now)
+        
+        if self.get_remaining(user_id, now) <= 0:
+            logger.warning(f"[rate_limiter] User {user_id} rate limited: {self.max_messages}/{self.max_messages}")
+            return False
+        
+        return True
+    
+    def acquire(self, user_id: int) -> bool:
+        """Check the limit and record the message in one step."""
+        if not self.check_limit(user_id):
+            return False
+        self.record_message(user_id)
+        return True
+    
+    def refund(self, user_id: int) -> None:
+        """Give back the most recently acquired message."""
+        tat = self.user_tat.get(user_id)
+        if tat is not None:
+            self.user_tat[user_id] = max(tat - self._interval, self._clock())
+    
+    def record_message(self, user_id: int) -> None:
+        """Record a message from user."""
+        now = self._clock()
+        tat = max(self.user_tat.get(user_id, now), now)
+        self.user_tat[user_id] = tat + self._interval
+        logger.debug(f"[rate_limiter] Recorded message for user {user_id}")
+    
+    def get_remaining(self, user_id: int, now: Optional[float] = None) -> int:
+        """Get remaining message quota for user."""
+        now = self._clock() if now is None else now
+        backlog = max(0.0, self.user_tat.get(user_id, now) - now)
+        # Round the backlog up: a partially refilled slot is not yet usable
+        used = math.ceil(backlog / self._interval - 1e-9)
+        return max(0, self.max_messages - used)
+    
+    def get_reset_time(self, user_id: int) -> int:
+        """Get seconds until the next message is allowed for user."""
+        now = self._clock()
+        backlog = self.user_tat.get(user_id, now) - now
+        wait = backlog - (self.window_seconds - self._interval)
+        return max(0, math.ceil(wait))
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tracked user count."""
+        return {"backend": "gcra", "users": len(self.user_tat), "entries": len(self.user_tat)}
+    
+    def close(self) -> None:
+        """Nothing to release for the in-memory limiter."""
+
+
+def create_rate_limiter(algorithm: str = "sliding", **options):
+    """
+    Create a rate limiter by algorithm name.
+    
+    Args:
+        algorithm: "sliding" (exact window) or "gcra" (one float per user)
+        **options: Forwarded to the limiter constructor (``backend`` is
+            only supported by the sliding window limiter)
+    
+    Returns:
+        RateLimiter or GCRARateLimiter instance
+    
+    Raises:
+        ValueError: If the algorithm is unknown
+    """
+    algorithm = (algorithm or "sliding").lower()
+    if algorithm == "sliding":
+        return RateLimiter(**options)
+    if algorithm == "gcra":
+        if options.pop("backend", None) is not None:
+            raise ValueError("The GCRA limiter only supports in-memory state")
+        return GCRARateLimiter(**options)
+    raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
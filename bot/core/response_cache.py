@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+response_cache.py
+
+Provider-agnostic cache for LLM completions.
+ذاكرة مؤقتة لردود النماذج اللغوية.
+
+Entries are keyed on a canonical SHA-256 of (provider, model, messages,
+temperature, max_tokens) and expire after a TTL. A bounded in-memory LRU tier
+can be backed by an optional SQLite file so cached answers survive restarts
+and are shared between processes on the same host. Only low-temperature
+requests are cached unless the caller opts in explicitly.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(
+    provider: str,
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: Optional[float],
+    max_tokens: Optional[int]
+) -> str:
+    """
+    Build the canonical cache key of a completion request.
+    
+    Messages are reduced to role/content and serialized with sorted keys so
+    equivalent requests hash identically.
+    """
+    canonical = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "messages": [{"role": m.get("role"), "content": m.get("content")} for m in messages],
+            "temperature": None if temperature is None else round(float(temperature), 3),
+            "max_tokens": max_tokens,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """TTL + LRU completion cache with an optional SQLite tier."""
+    
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600,
+        db_path: Optional[str] = None,
+        max_temperature: float = 0.2,
+        log_every: int = 100,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        Initialize response cache.
+        
+        Args:
+            max_entries: Entries kept in memory (LRU eviction)
+            ttl_seconds: Lifetime of an entry
+            db_path: Optional SQLite file for the persistent tier
+            max_temperature: Highest temperature cached without explicit opt-in
+            log_every: Log the hit rate every N lookups (0 disables)
+            clock: Time source returning epoch seconds
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self.log_every = log_every
+        self._clock = clock
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_response_cache_expires ON response_cache (expires_at)"
+            )
+            self._purge_disk()
+        
+        logger.info(
+            f"[response_cache] Initialized: entries={max_entries} ttl={ttl_seconds}s "
+            f"disk={db_path or 'off'} max_temperature={max_temperature}"
+        )
+    
+    def is_cacheable(self, temperature: Optional[float], force: Optional[bool] = None) -> bool:
+        """
+        Decide whether a request may be cached.
+        
+        Args:
+            temperature: Sampling temperature of the request
+            force: True/False overrides the temperature rule; None applies it
+        """
+        if force is not None:
+            return force
+        return temperature is not None and temperature <= self.max_temperature
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Look up a cached value (memory first, then disk)."""
+        now = self._clock()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._maybe_log()
+                    return entry[1]
+                del self._memory[key]
+            
+            value = self._disk_get(key, now)
+            if value is not None:
+                self._stats["hits"] += 1
+                self._stats["disk_hits"] += 1
+                self._maybe_log()
+                return value
+            
+            self._stats["misses"] += 1
+            self._maybe_log()
+            return None
+    
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        """Store a JSON-serializable value."""
+        expires_at = self._clock() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._memory_put(key, expires_at, value)
+            self._stats["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value, ensure_ascii=False), expires_at)
+                )
+                if self._stats["stores"] % 256 == 0:
+                    self._purge_disk()
+    
+    async def acomplete(
+        self,
+        client,
+        provider: str,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        force: Optional[bool] = None
+    ) -> str:
+        """
+        Return a cached completion or call ``client.achat_completion`` and cache it.
+        
+        Args:
+            client: Provider adapter with ``achat_completion``
+            provider: Provider name (part of the key)
+            messages: Chat messages
+            model: Model name
+            temperature: Sampling temperature
+            max_tokens: Completion token limit
+            force: Explicit opt-in/out (see is_cacheable)
+        """
+        if not self.is_cacheable(temperature, force):
+            return await client.achat_completion(
+                messages=messages, model=model, temperature=temperature, max_tokens=max_tokens
+            )
+        
+        key = make_cache_key(provider, model, messages, temperature, max_tokens)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        
+        response = await client.achat_completion(
+            messages=messages, model=model, temperature=temperature, max_tokens=max_tokens
+        )
+        self.set(key, response)
+        return response
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and sizes."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "size": len(self._memory),
+                "capacity": self.max_entries,
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+    
+    def clear(self) -> None:
+        """Drop all entries from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM response_cache")
+    
+    def close(self) -> None:
+        """Close the SQLite tier."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+    
+    def _memory_put(self, key: str, expires_at: float, value: Any) -> None:
+        """Insert into the LRU tier, evicting the least recently used entries."""
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+    
+    def _disk_get(self, key: str, now: float) -> Optional[Any]:
+        """Read a live entry from the SQLite tier and promote it to memory."""
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT value, expires_at FROM response_cache WHERE key = ? AND expires_at > ?",
+            (key, now)
+        ).fetchone()
+        if row is None:
+            return None
+        value = json.loads(row[0])
+        self._memory_put(key, row[1], value)
+        return value
+    
+    def _purge_disk(self) -> None:
+        """Delete expired rows from the SQLite tier."""
+        self._db.execute("DELETE FROM response_cache WHERE expires_at <= ?", (self._clock(),))
+    
+    def _maybe_log(self) -> None:
+        """Report the hit rate every ``log_every`` lookups."""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        if self.log_every and lookups % self.log_every == 0:
+            logger.info(
+                f"[response_cache] lookups={lookups} hit_rate={self._stats['hits'] / lookups:.3f} "
+                f"memory={len(self._memory)}/{self.max_entries} disk_hits={self._stats['disk_hits']}"
+            )
@@ -0,0 +1,769 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+session_backends.py
+
+Pluggable storage backends for SessionStore.
+واجهات تخزين الجلسات (ملفات JSON أو SQLite).
+
+Backends persist sessions and apply change entries produced by the store:
+- {"op": "append", "message": {...}, "at": ts}
+- {"op": "metadata", "key": k, "value": v, "at": ts}
+- {"op": "clear", "at": ts}
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def trim_messages(session_data: Dict[str, Any], max_messages: int, keep_unsummarized: bool = False) -> None:
+    """
+    Drop the oldest messages beyond ``max_messages``.
+    
+    With ``keep_unsummarized`` only messages already folded into the running
+    summary (timestamp at or before ``summary_upto``) may be dropped, so turns
+    are never lost before the summarizer has seen them.
+    """
+    messages = session_data.get("messages", [])
+    excess = len(messages) - max_messages
+    if excess <= 0:
+        return
+    if keep_unsummarized:
+        summary_upto = session_data.get("metadata", {}).get("summary_upto") or ""
+        summarized = 0
+        while summarized < excess and (messages[summarized].get("timestamp") or "") <= summary_upto:
+            summarized += 1
+        excess = summarized if summary_upto else 0
+    if excess:
+        session_data["messages"] = messages[excess:]
+
+
+def apply_entries(
+    session_data: Dict[str, Any],
+    entries: List[Dict[str, Any]],
+    max_messages: int,
+    keep_unsummarized: bool = False
+) -> Dict[str, Any]:
+    """Apply change entries to in-memory session data."""
+    for entry in entries:
+        op = entry.get("op")
+        if op == "append":
+            session_data.setdefault("messages", []).append(entry["message"])
+        elif op == "metadata":
+            session_data.setdefault("metadata", {})[entry["key"]] = entry["value"]
+        elif op == "clear":
+            session_data["messages"] = []
+        if entry.get("at"):
+            session_data["updated_at"] = entry["at"]
+    
+    trim_messages(session_data, max_messages, keep_unsummarized)
+    return session_data
+
+
+def summarize_session(name: str, session_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the listing summary for a session."""
+    return {
+        "name": session_data.get("name", name),
+        "created_at": session_data.get("created_at", "N/A"),
+        "updated_at": session_data.get("updated_at", "N/A"),
+        "message_count": len(session_data.get("messages", [])),
+        "model": session_data.get("metadata", {}).get("model", "N/A"),
+        "provider": session_data.get("metadata", {}).get("provider", "N/A")
+    }
+
+
+class SessionBackend(ABC):
+    """Storage interface used by SessionStore."""
+    
+    # True if apply() is cheaper than rewriting the whole session
+    incremental: bool = False
+    
+    def __init__(self):
+        self.max_messages = 50
+        # Only trim messages already folded into the summary (see trim_messages)
+        self.keep_unsummarized = False
+    
+    @abstractmethod
+    def exists(self, user_id: int, session_name: str) -> bool:
+        """Check whether a session exists."""
+    
+    @abstractmethod
+    def create(self, user_id: int, session_name: str, session_data: Dict[str, Any]) -> bool:
+        """Create a session; returns False if it already exists."""
+    
+    @abstractmethod
+    def load(self, user_id: int, session_name: str) -> Optional[Dict[str, Any]]:
+        """Load a full session, or None if it does not exist."""
+    
+    @abstractmethod
+    def save(self, user_id: int, session_name: str, session_data: Dict[str, Any]) -> bool:
+        """Replace a session with the given data."""
+    
+    @abstractmethod
+    def apply(self, user_id: int, session_name: str, entries: List[Dict[str, Any]]) -> bool:
+        """Persist change entries for an existing session."""
+    
+    @abstractmethod
+    def list_sessions(self, user_id: int) -> List[Dict[str, Any]]:
+        """List session summaries for a user, most recently updated first."""
+    
+    @abstractmethod
+    def delete(self, user_id: int, session_name: str) -> bool:
+        """Delete a session."""
+    
+    def load_metadata(self, user_id: int, session_name: str) -> Optional[Dict[str, Any]]:
+        """Load only session metadata."""
+        session_data = self.load(user_id, session_name)
+        if session_data is None:
+            return None
+        return session_data.get("metadata", {})
+    
+    def compact(self, user_id: int, session_name: str) -> bool:
+        """Compact a session's storage (no-op by default)."""
+        return False
+    
+    def close(self) -> None:
+        """Release backend resources."""
+
+
+class JsonFileBackend(SessionBackend):
+    """
+    Sessions as ``<base>/<user_id>/<session>.json`` files.
+    
+    In journal mode changes are appended to ``<session>.jsonl`` and folded
+    into the snapshot by a background compactor.
+    """
+    
+    def __init__(self, base_path: str = "analysis/sessions", journal: bool = False, compact_threshold: int = 50):
+        super().__init__()
+        self.base_path = Path(base_path)
+        self.base_path.mkdir(parents=True, exist_ok=True)
+        self.journal = journal
+        self.incremental = journal
+        self.compact_threshold = max(1, compact_threshold)
+        
+        self._locks: Dict[Path, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._journal_counts: Dict[Path, int] = {}
+        self._compact_queue: "queue.Queue[Optional[Tuple[int, str]]]" = queue.Queue()
+        self._compact_pending: set = set()
+        self._compactor: Optional[threading.Thread] = None
+    
+    def _get_user_dir(self, user_id: int) -> Path:
+        """Get or create user-specific directory."""
+        user_dir = self.base_path / str(user_id)
+        user_dir.mkdir(parents=True, exist_ok=True)
+        return user_dir
+    
+    def _get_session_path(self, user_id: int, session_name: str) -> Path:
+        """Get path to session file."""
+        return self._get_user_dir(user_id) / f"{session_name}.json"
+    
+    def _get_journal_path(self, user_id: int, session_name: str) -> Path:
+        """Get path to session journal file."""
+        return self._get_user_dir(user_id) / f"{session_name}.jsonl"
+    
+    def _lock_for(self, session_path: Path) -> threading.Lock:
+        """Get the lock guarding a session's snapshot and journal."""
+        with self._locks_guard:
+            lock = self._locks.get(session_path)
+            if lock is None:
+                lock = self._locks[session_path] = threading.Lock()
+            return lock
+    
+    # ==================== Low-level I/O ====================
+    
+    def _write_snapshot(self, session_path: Path, session_data: Dict[str, Any]) -> None:
+        """Atomically write a session snapshot."""
+        tmp_path = session_path.with_suffix(".json.tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(session_data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, session_path)
+    
+    def _read_journal(self, journal_path: Path) -> List[Dict[str, Any]]:
+        """Read journal entries, skipping a torn trailing line."""
+        if not journal_path.exists():
+            return []
+        
+        entries = []
+        with journal_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"[session_store] Skipping corrupt journal line in {journal_path}")
+        return entries
+    
+    def _load(self, user_id: int, session_name: str) -> Dict[str, Any]:
+        """Load a session from disk (snapshot plus journal replay)."""
+        session_path = self._get_session_path(user_id, session_name)
+        with session_path.open("r", encoding="utf-8") as f:
+            session_data = json.load(f)
+        
+        if self.journal:
+            journal_path = self._get_journal_path(user_id, session_name)
+            entries = self._read_journal(journal_path)
+            self._journal_counts[journal_path] = len(entries)
+            session_data = apply_entries(session_data, entries, self.max_messages, self.keep_unsummarized)
+        return session_data
+    
+    def _journal_write(self, user_id: int, session_name: str, entries: List[Dict[str, Any]]) -> bool:
+        """Append entries to a session journal in a single write."""
+        session_path = self._get_session_path(user_id, session_name)
+        journal_path = self._get_journal_path(user_id, session_name)
+        payload = "".join(
+            json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for entry in entries
+        )
+        
+        try:
+            with self._lock_for(session_path):
+                if journal_path not in self._journal_counts:
+                    self._journal_counts[journal_path] = len(self._read_journal(journal_path))
+                with journal_path.open("a", encoding="utf-8") as f:
+                    f.write(payload)
+                self._journal_counts[journal_path] += len(entries)
+                count = self._journal_counts[journal_path]
+        except Exception as e:
+            logger.error(f"[session_store] Failed to append to journal: {e}")
+            return False
+        
+        if count >= self.compact_threshold:
+            self._schedule_compaction(user_id, session_name)
+        return True
+    
+    # ==================== Compaction ====================
+    
+    def _schedule_compaction(self, user_id: int, session_name: str) -> None:
+        """Queue a session for background compaction."""
+        key = (user_id, session_name)
+        with self._locks_guard:
+            if key in self._compact_pending:
+                return
+            self._compact_pending.add(key)
+            if self._compactor is None or not self._compactor.is_alive():
+                self._compactor = threading.Thread(
+                    target=self._compaction_worker,
+                    name="session-compactor",
+                    daemon=True
+                )
+                self._compactor.start()
+        self._compact_queue.put(key)
+    
+    def _compaction_worker(self) -> None:
+        """Background loop folding journals into snapshots."""
+        while True:
+            key = self._compact_queue.get()
+            if key is None:
+                break
+            with self._locks_guard:
+                self._compact_pending.discard(key)
+            self.compact(*key)
+    
+    def compact(self, user_id: int, session_name: str) -> bool:
+        """
+        Fold a session journal into its snapshot and truncate the journal.
+        
+        ``max_messages`` trimming is applied while folding.
+        """
+        session_path = self._get_session_path(user_id, session_name)
+        journal_path = self._get_journal_path(user_id, session_name)
+        
+        try:
+            with self._lock_for(session_path):
+                if not session_path.exists() or not journal_path.exists():
+                    return False
+                session_data = self._load(user_id, session_name)
+                self._write_snapshot(session_path, session_data)
+                journal_path.unlink()
+                self._journal_counts[journal_path] = 0
+            logger.debug(f"[session_store] Compacted session '{session_name}' for user {user_id}")
+            return True
+        except Exception as e:
+            logger.error(f"[session_store] Failed to compact session: {e}")
+            return False
+    
+    def close(self) -> None:
+        """Stop the background compactor and compact outstanding journals."""
+        if self._compactor is not None and self._compactor.is_alive():
+            self._compact_queue.put(None)
+            self._compactor.join(timeout=10)
+        self._compactor = None
+        
+        if self.journal:
+            for journal_path in list(self._journal_counts):
+                if self._journal_counts.get(journal_path):
+                    self.compact(int(journal_path.parent.name), journal_path.stem)
+    
+    # ==================== Backend API ====================
+    
+    def exists(self, user_id: int, session_name: str) -> bool:
+        return self._get_session_path(user_id, session_name).exists()
+    
+    def create(self, user_id: int, session_name: str, session_data: Dict[str, Any]) -> bool:
+        session_path = self._get_session_path(user_id, session_name)
+        if session_path.exists():
+            return False
+        
+        try:
+            with self._lock_for(session_path):
+                self._write_snapshot(session_path, session_data)
+            return True
+        except Exception as e:
+            logger.error(f"[session_store] Failed to create session: {e}")
+            return False
+    
+    def load(self, user_id: int, session_name: str) -> Optional[Dict[str, Any]]:
+        session_path = self._get_session_path(user_id, session_name)
+        if not session_path.exists():
+            return None
+        
+        try:
+            with self._lock_for(session_path):
+                return self._load(user_id, session_name)
+        except Exception as e:
+            logger.error(f"[session_store] Failed to read session: {e}")
+            return None
+    
+    def save(self, user_id: int, session_name: str, session_data: Dict[str, Any]) -> bool:
+        session_path = self._get_session_path(user_id, session_name)
+        try:
+            with self._lock_for(session_path):
+                self._write_snapshot(session_path, session_data)
+                if self.journal:
+                    # The snapshot now supersedes any journaled changes
+                    journal_path = self._get_journal_path(user_id, session_name)
+                    if journal_path.exists():
+                        journal_path.unlink()
+                    self._journal_counts[journal_path] = 0
+            return True
+        except Exception as e:
+            logger.error(f"[session_store] Failed to save session: {e}")
+            return False
+    
+    def apply(self, user_id: int, session_name: str, entries: List[Dict[str, Any]]) -> bool:
+        if self.journal:
+            return self._journal_write(user_id, session_name, entries)
+        
+        session_data = self.load(user_id, session_name)
+        if session_data is None:
+            return False
+        return self.save(user_id, session_name, apply_entries(session_data, entries, self.max_messages, self.keep_unsummarized))
+    
+    def list_sessions(self, user_id: int) -> List[Dict[str, Any]]:
+        user_dir = self._get_user_dir(user_id)
+        sessions = []
+        
+        for session_file in user_dir.glob("*.json"):
+            try:
+                with self._lock_for(session_file):
+                    session_data = self._load(user_id, session_file.stem)
+                sessions.append(summarize_session(session_file.stem, session_data))
+            except Exception as e:
+                logger.warning(f"[session_store] Failed to read session {session_file}: {e}")
+        
+        return sorted(sessions, key=lambda x: x.get("updated_at", ""), reverse=True)
+    
+    def delete(self, user_id: int, session_name: str) -> bool:
+        session_path = self._get_session_path(user_id, session_name)
+        if not session_path.exists():
+            return False
+        
+        try:
+            with self._lock_for(session_path):
+                session_path.unlink()
+                journal_path = self._get_journal_path(user_id, session_name)
+                if journal_path.exists():
+                    journal_path.unlink()
+                self._journal_counts.pop(journal_path, None)
+            return True
+        except Exception as e:
+            logger.error(f"[session_store] Failed to delete session: {e}")
+            return False
+    
+    def iter_session_names(self):
+        """Yield (user_id, session_name) for every stored session."""
+        for user_dir in sorted(self.base_path.iterdir()):
+            if not user_dir.is_dir() or not user_dir.name.lstrip("-").isdigit():
+                continue
+            for session_file in sorted(user_dir.glob("*.json")):
+                yield int(user_dir.name), session_file.stem
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """
+    Sessions, messages and metadata in an SQLite database (WAL mode).
+    
+    Listing, metadata reads and appends are single indexed queries instead
+    of parsing whole session files.
+    """
+    
+    incremental = True
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        user_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        message_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, name)
+    );
+    CREATE INDEX IF NOT EXISTS idx_sessions_user_updated ON sessions (user_id, updated_at);
+    
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        session TEXT NOT NULL,
+        role TEXT NOT NULL,
+        content TEXT NOT NULL,
+        timestamp TEXT,
+        extra TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (user_id, session, id);
+    
+    CREATE TABLE IF NOT EXISTS session_metadata (
+        user_id INTEGER NOT NULL,
+        session TEXT NOT NULL,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        PRIMARY KEY (user_id, session, key)
+    );
+    """
+    
+    def __init__(self, db_path: str = "analysis/sessions.db"):
+        super().__init__()
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+    
+    # ==================== Helpers ====================
+    
+    @staticmethod
+    def _message_row(user_id: int, session_name: str, message: Dict[str, Any]) -> Tuple:
+        extra = {k: v for k, v in message.items() if k not in ("role", "content", "timestamp")}
+        return (
+            user_id,
+            session_name,
+            message["role"],
+            message["content"],
+            message.get("timestamp"),
+            json.dumps(extra, ensure_ascii=False) if extra else None
+        )
+    
+    @staticmethod
+    def _row_message(row: Tuple) -> Dict[str, Any]:
+        role, content, timestamp, extra = row
+        message = {"role": role, "content": content, "timestamp": timestamp}
+        if extra:
+            message.update(json.loads(extra))
+        return message
+    
+    def _insert_messages(self, cur: sqlite3.Cursor, user_id: int, session_name: str, messages: List[Dict[str, Any]]) -> None:
+        cur.executemany(
+            "INSERT INTO messages (user_id, session, role, content, timestamp, extra) VALUES (?, ?, ?, ?, ?, ?)",
+            [self._message_row(user_id, session_name, m) for m in messages]
+        )
+    
+    def _set_metadata(self, cur: sqlite3.Cursor, user_id: int, session_name: str, metadata: Dict[str, Any]) -> None:
+        cur.executemany(
+            "INSERT INTO session_metadata (user_id, session, key, value) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (user_id, session, key) DO UPDATE SET value = excluded.value",
+            [(user_id, session_name, k, json.dumps(v, ensure_ascii=False)) for k, v in metadata.items()]
+        )
+    
+    def _trim(self, cur: sqlite3.Cursor, user_id: int, session_name: str) -> None:
+        """Drop the oldest messages beyond ``max_messages`` (see ``trim_messages``)."""
+        row = cur.execute(
+            "SELECT message_count FROM sessions WHERE user_id = ? AND name = ?",
+            (user_id, session_name)
+        ).fetchone()
+        if row is None:
+            # Session deleted concurrently; nothing left to trim
+            return
+        excess = row[0] - self.max_messages
+        if excess <= 0:
+            return
+        if self.keep_unsummarized:
+            summary_upto = cur.execute(
+                "SELECT value FROM session_metadata WHERE user_id = ? AND session = ? AND key = 'summary_upto'",
+                (user_id, session_name)
+            ).fetchone()
+            summary_upto = json.loads(summary_upto[0]) if summary_upto else None
+            if not summary_upto:
+                return
+            summarized = cur.execute(
+                "SELECT COUNT(*) FROM messages WHERE user_id = ? AND session = ? AND timestamp <= ?",
+                (user_id, session_name, summary_upto)
+            ).fetchone()[0]
+            excess = min(excess, summarized)
+            if excess <= 0:
+                return
+        cur.execute(
+            "DELETE FROM messages WHERE id IN ("
+            "SELECT id FROM messages WHERE user_id = ? AND session = ? ORDER BY id LIMIT ?)",
+            (user_id, session_name, excess)
+        )
+        cur.execute(
+            "UPDATE sessions SET message_count = ? WHERE user_id = ? AND name = ?",
+            (row[0] - excess, user_id, session_name)
+        )
+    
+    # ==================== Backend API ====================
+    
+    def exists(self, user_id: int, session_name: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM sessions WHERE user_id = ? AND name = ?",
+                (user_id, session_name)
+            ).fetchone()
+        return row is not None
+    
+    def create(self, user_id: int, session_name: str, session_data: Dict[str, Any]) -> bool:
+        try:
+            with self._lock, self._conn:
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO sessions (user_id, name, created_at, updated_at, message_count) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        user_id,
+                        session_name,
+                        session_data["created_at"],
+                        session_data["updated_at"],
+                        len(session_data.get("messages", []))
+                    )
+                )
+                if cur.rowcount == 0:
+                    return False
+                self._insert_messages(cur, user_id, session_name, session_data.get("messages", []))
+                self._set_metadata(cur, user_id, session_name, session_data.get("metadata", {}))
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"[session_store] Failed to create session: {e}")
+            return False
+    
+    def load(self, user_id: int, session_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, updated_at FROM sessions WHERE user_id = ? AND name = ?",
+                (user_id, session_name)
+            ).fetchone()
+            if row is None:
+                return None
+            messages = self._conn.execute(
+                "SELECT role, content, timestamp, extra FROM messages "
+                "WHERE user_id = ? AND session = ? ORDER BY id",
+                (user_id, session_name)
+            ).fetchall()
+            metadata = self._conn.execute(
+                "SELECT key, value FROM session_metadata WHERE user_id = ? AND session = ?",
+                (user_id, session_name)
+            ).fetchall()
+        
+        return {
+            "name": session_name,
+            "created_at": row[0],
+            "updated_at": row[1],
+            "messages": [self._row_message(m) for m in messages],
+            "metadata": {key: json.loads(value) for key, value in metadata}
+        }
+    
+    def load_metadata(self, user_id: int, session_name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if not self._conn.execute(
+                "SELECT 1 FROM sessions WHERE user_id = ? AND name = ?",
+                (user_id, session_name)
+            ).fetchone():
+                return None
+            rows = self._conn.execute(
+                "SELECT key, value FROM session_metadata WHERE user_id = ? AND session = ?",
+                (user_id, session_name)
+            ).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+    
+    def save(self, user_id: int, session_name: str, session_data: Dict[str, Any]) -> bool:
+        messages = session_data.get("messages", [])
+        try:
+            with self._lock, self._conn:
+                cur = self._conn.cursor()
+                cur.execute(
+                    "INSERT INTO sessions (user_id, name, created_at, updated_at, message_count) "
+                    "VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (user_id, name) DO UPDATE SET "
+                    "updated_at = excluded.updated_at, message_count = excluded.message_count",
+                    (
+                        user_id,
+                        session_name,
+                        session_data.get("created_at") or session_data["updated_at"],
+                        session_data["updated_at"],
+                        len(messages)
+                    )
+                )
+                cur.execute("DELETE FROM messages WHERE user_id = ? AND session = ?", (user_id, session_name))
+                cur.execute("DELETE FROM session_metadata WHERE user_id = ? AND session = ?", (user_id, session_name))
+                self._insert_messages(cur, user_id, session_name, messages)
+                self._set_metadata(cur, user_id, session_name, session_data.get("metadata", {}))
+                self._trim(cur, user_id, session_name)
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"[session_store] Failed to save session: {e}")
+            return False
+    
+    def apply(self, user_id: int, session_name: str, entries: List[Dict[str, Any]]) -> bool:
+        try:
+            with self._lock, self._conn:
+                cur = self._conn.cursor()
+                for entry in entries:
+                    op = entry.get("op")
+                    if op == "append":
+                        self._insert_messages(cur, user_id, session_name, [entry["message"]])
+                        cur.execute(
+                            "UPDATE sessions SET message_count = message_count + 1 WHERE user_id = ? AND name = ?",
+                            (user_id, session_name)
+                        )
+                    elif op == "metadata":
+                        self._set_metadata(cur, user_id, session_name, {entry["key"]: entry["value"]})
+                    elif op == "clear":
+                        cur.execute("DELETE FROM messages WHERE user_id = ? AND session = ?", (user_id, session_name))
+                        cur.execute(
+                            "UPDATE sessions SET message_count = 0 WHERE user_id = ? AND name = ?",
+                            (user_id, session_name)
+                        )
+                    if entry.get("at"):
+                        cur.execute(
+                            "UPDATE sessions SET updated_at = ? WHERE user_id = ? AND name = ?",
+                            (entry["at"], user_id, session_name)
+                        )
+                self._trim(cur, user_id, session_name)
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"[session_store] Failed to apply session changes: {e}")
+            return False
+    
+    def list_sessions(self, user_id: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT s.name, s.created_at, s.updated_at, s.message_count,
+                       (SELECT value FROM session_metadata m
+                        WHERE m.user_id = s.user_id AND m.session = s.name AND m.key = 'model'),
+                       (SELECT value FROM session_metadata m
+                        WHERE m.user_id = s.user_id AND m.session = s.name AND m.key = 'provider')
+                FROM sessions s
+                WHERE s.user_id = ?
+                ORDER BY s.updated_at DESC
+                """,
+                (user_id,)
+            ).fetchall()
+        
+        return [
+            {
+                "name": name,
+                "created_at": created_at,
+                "updated_at": updated_at,
+                "message_count": message_count,
+                "model": json.loads(model) if model else "N/A",
+                "provider": json.loads(provider) if provider else "N/A"
+            }
+            for name, created_at, updated_at, message_count, model, provider in rows
+        ]
+    
+    def delete(self, user_id: int, session_name: str) -> bool:
+        try:
+            with self._lock, self._conn:
+                cur = self._conn.execute(
+                    "DELETE FROM sessions WHERE user_id = ? AND name = ?",
+                    (user_id, session_name)
+                )
+                if cur.rowcount == 0:
+                    return False
+                cur.execute("DELETE FROM messages WHERE user_id = ? AND session = ?", (user_id, session_name))
+                cur.execute("DELETE FROM session_metadata WHERE user_id = ? AND session = ?", (user_id, session_name))
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"[session_store] Failed to delete session: {e}")
+            return False
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_backend(kind: str, base_path: str, **options: Any) -> SessionBackend:
+    """
+    Build a session backend by name.
+    
+    Args:
+        kind: "json" or "sqlite"
+        base_path: Session directory (json) or database file (sqlite)
+        **options: Backend-specific options (e.g. journal, compact_threshold)
+    """
+    if kind == "sqlite":
+        return SQLiteSessionBackend(db_path=base_path)
+    if kind == "json":
+        return JsonFileBackend(base_path=base_path, **options)
+    raise ValueError(f"Unknown session backend: {kind}")
+
+
+def migrate_json_to_sqlite(source_path: str, db_path: str, overwrite: bool = False) -> int:
+    """
+    Import an ``analysis/sessions/<user>/<name>.json`` tree into SQLite.
+    
+    Pending journals next to the snapshots are replayed before import.
+    
+    Args:
+        source_path: Root of the JSON session tree
+        db_path: Target SQLite database
+        overwrite: Replace sessions that already exist in the database
+    
+    Returns:
+        Number of sessions imported
+    """
+    source = JsonFileBackend(base_path=source_path, journal=True)
+    source.max_messages = 10 ** 9  # Keep history as stored; the store trims on write
+    target = SQLiteSessionBackend(db_path=db_path)
+    imported = 0
+    
+    try:
+        for user_id, session_name in source.iter_session_names():
+            session_data = source.load(user_id, session_name)
+            if session_data is None:
+                continue
+            session_data.setdefault("created_at", session_data.get("updated_at", ""))
+            session_data.setdefault("updated_at", session_data["created_at"])
+            
+            if target.exists(user_id, session_name):
+                if not overwrite:
+                    continue
+                target.max_messages = len(session_data.get("messages", [])) or 1
+                ok = target.save(user_id, session_name, session_data)
+            else:
+                ok = target.create(user_id, session_name, session_data)
+            
+            if ok:
+                imported += 1
+                logger.info(f"[session_store] Migrated session '{session_name}' for user {user_id}")
+    finally:
+        target.close()
+    
+    return imported
@@ -5,39 +5,261 @@ session_store.py
 
 Session CRUD & persistence for multi-session support.
 إدارة الجلسات مع الحفظ الدائم (file-based).
+
+Storage is delegated to a pluggable backend (see ``session_backends``):
+- json (default): ``<session>.json`` snapshots, optionally with a JSONL
+  journal compacted in the background.
+- sqlite: indexed tables in a single WAL-mode database.
+
+Any backend can be fronted by a bounded LRU write-back cache of hot sessions
+(``cache_size > 0``) so a chat turn reads the session from storage at most
+once and writes are batched into periodic or size-triggered flushes. Writes
+happen outside the cache lock, and a session whose write fails stays dirty
+until a later flush succeeds.
 """
 
+import copy
 import json
 import logging
-from pathlib import Path
-from typing import Dict, List, Optional, Any
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 
+from app.rag.tokens import estimate_tokens
+from bot.core.session_backends import JsonFileBackend, SessionBackend, apply_entries, trim_messages
+
 logger = logging.getLogger(__name__)
 
+Key = Tuple[int, str]
+# Entries awaiting an incremental write, or None when the whole session must be saved
+Pending = Optional[List[Dict[str, Any]]]
+
+# Metadata computed from the messages, reset when the session is cleared
+CONVERSATION_METADATA_KEYS = ("summary", "summary_upto")
+
 
 class SessionStore:
-    """Manages user sessions with file-based persistence."""
+    """Manages user sessions with pluggable persistence."""
     
-    def __init__(self, base_path: str = "analysis/sessions"):
-        self.base_path = Path(base_path)
-        self.base_path.mkdir(parents=True, exist_ok=True)
+    def __init__(
+        self,
+        base_path: str = "analysis/sessions",
+        journal: bool = False,
+        compact_threshold: int = 50,
+        cache_size: int = 0,
+        flush_interval: float = 5.0,
+        flush_threshold: int = 32,
+        backend: Optional[SessionBackend] = None
+    ):
+        """
+        Initialize session store.
+        
+        Args:
+            base_path: Root directory for session files (json backend)
+            journal: Append changes to a per-session JSONL journal instead of
+                rewriting the whole session file on every message
+            compact_threshold: Journal entries that trigger a background compaction
+            cache_size: Hot sessions kept in memory (0 disables the cache)
+            flush_interval: Seconds between background flushes of dirty sessions
+            flush_threshold: Dirty sessions that trigger an immediate flush
+            backend: Storage backend (defaults to JsonFileBackend on base_path)
+        """
+        self.backend = backend or JsonFileBackend(
+            base_path=base_path,
+            journal=journal,
+            compact_threshold=compact_threshold
+        )
         self.max_messages = 50  # Default, can be overridden
         
-    def _get_user_dir(self, user_id: int) -> Path:
-        """Get or create user-specific directory."""
-        user_dir = self.base_path / str(user_id)
-        user_dir.mkdir(parents=True, exist_ok=True)
-        return user_dir
+        # Write-back cache: key -> session data, key -> pending change entries
+        # (None means the whole session must be rewritten)
+        self.cache_size = max(0, cache_size)
+        self.flush_interval = flush_interval
+        self.flush_threshold = max(1, flush_threshold)
+        self._cache: "OrderedDict[Key, Dict[str, Any]]" = OrderedDict()
+        self._dirty: Dict[Key, Pending] = {}
+        self._cache_lock = threading.RLock()
+        # Serializes write-backs so one session's writes never interleave
+        self._flush_lock = threading.Lock()
+        self._cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "flushes": 0}
+        self._flush_stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        
+        if self.cache_size and self.flush_interval > 0:
+            self._flusher = threading.Thread(
+                target=self._flush_worker,
+                name="session-flusher",
+                daemon=True
+            )
+            self._flusher.start()
+    
+    @property
+    def max_messages(self) -> int:
+        """Maximum messages kept per session."""
+        return self.backend.max_messages
+    
+    @max_messages.setter
+    def max_messages(self, value: int) -> None:
+        self.backend.max_messages = value
+    
+    @property
+    def keep_unsummarized(self) -> bool:
+        """Whether trimming spares messages the summarizer has not folded yet."""
+        return self.backend.keep_unsummarized
+    
+    @keep_unsummarized.setter
+    def keep_unsummarized(self, value: bool) -> None:
+        self.backend.keep_unsummarized = value
+    
+    # ==================== Write-back cache ====================
+    
+    def _cache_get(self, key: Key) -> Optional[Dict[str, Any]]:
+        """Look up a hot session, updating LRU order and counters."""
+        with self._cache_lock:
+            session_data = self._cache.get(key)
+            if session_data is None:
+                self._cache_stats["misses"] += 1
+                return None
+            self._cache.move_to_end(key)
+            self._cache_stats["hits"] += 1
+            return session_data
+    
+    def _cache_put(self, key: Key, session_data: Dict[str, Any]) -> None:
+        """Insert a session, evicting (and flushing) least recently used ones."""
+        evicted = []
+        with self._cache_lock:
+            self._cache[key] = session_data
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                old_key, old_data = self._cache.popitem(last=False)
+                self._cache_stats["evictions"] += 1
+                if old_key in self._dirty:
+                    evicted.append((old_key, old_data, self._dirty.pop(old_key)))
+        if evicted:
+            self._write_back(evicted)
+    
+    def _mark_dirty(self, key: Key, entry: Optional[Dict[str, Any]] = None) -> None:
+        """Record a pending change for a cached session."""
+        with self._cache_lock:
+            if entry is None or not self.backend.incremental:
+                self._dirty[key] = None
+            elif key not in self._dirty:
+                self._dirty[key] = [entry]
+            elif self._dirty[key] is not None:
+                self._dirty[key].append(entry)
+            should_flush = len(self._dirty) >= self.flush_threshold
+        
+        if should_flush:
+            self.flush()
+    
+    def _flush_entry(self, key: Key, session_data: Dict[str, Any], pending: Pending) -> bool:
+        """Write one dirty session back to storage."""
+        user_id, session_name = key
+        if pending is None:
+            return self.backend.save(user_id, session_name, session_data)
+        return self.backend.apply(user_id, session_name, pending)
+    
+    def _requeue(self, key: Key, session_data: Dict[str, Any], pending: Pending) -> None:
+        """Mark a session whose write failed dirty again, ahead of newer changes."""
+        with self._cache_lock:
+            if key not in self._cache:
+                # Evicted while unsaved: keep it in memory until a flush succeeds
+                self._cache[key] = session_data
+                self._cache.move_to_end(key, last=False)
+            if key in self._dirty:
+                newer = self._dirty[key]
+                self._dirty[key] = None if pending is None or newer is None else pending + newer
+            else:
+                self._dirty[key] = pending
+    
+    def _write_back(self, batch: List[Tuple[Key, Dict[str, Any], Pending]]) -> int:
+        """Write ``(key, session, pending)`` snapshots without holding the cache lock."""
+        written = 0
+        with self._flush_lock:
+            for key, session_data, pending in batch:
+                try:
+                    ok = self._flush_entry(key, session_data, pending)
+                except Exception as e:
+                    logger.error(f"[session_store] Write-back of {key} failed: {e}")
+                    ok = False
+                if ok:
+                    written += 1
+                else:
+                    self._requeue(key, session_data, pending)
+        return written
+    
+    def flush(self) -> int:
+        """
+        Write all dirty cached sessions back to storage.
+        
+        Sessions whose write fails stay dirty and are retried by the next flush.
+        
+        Returns:
+            Number of sessions flushed
+        """
+        with self._cache_lock:
+            batch = []
+            for key, pending in self._dirty.items():
+                session_data = self._cache.get(key)
+                if session_data is None:
+                    continue
+                # Whole-session saves write a snapshot; incremental ones only need the entries
+                batch.append((key, copy.deepcopy(session_data) if pending is None else session_data, pending))
+            for key, _, _ in batch:
+                del self._dirty[key]
+        
+        written = self._write_back(batch) if batch else 0
+        if batch:
+            with self._cache_lock:
+                self._cache_stats["flushes"] += 1
+            if written < len(batch):
+                logger.warning(f"[session_store] {len(batch) - written} sessions failed to flush; kept dirty")
+            logger.debug(f"[session_store] Flushed {written} sessions, cache={self.get_cache_stats()}")
+        return written
     
-    def _get_session_path(self, user_id: int, session_name: str) -> Path:
-        """Get path to session file."""
-        return self._get_user_dir(user_id) / f"{session_name}.json"
+    def _flush_worker(self) -> None:
+        """Background loop flushing dirty sessions every ``flush_interval``."""
+        while not self._flush_stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"[session_store] Background flush failed: {e}")
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss/eviction counters."""
+        with self._cache_lock:
+            lookups = self._cache_stats["hits"] + self._cache_stats["misses"]
+            return {
+                "size": len(self._cache),
+                "capacity": self.cache_size,
+                "dirty": len(self._dirty),
+                **self._cache_stats,
+                "hit_rate": round(self._cache_stats["hits"] / lookups, 3) if lookups else 0.0,
+            }
+    
+    # ==================== Lifecycle ====================
+    
+    def compact_session(self, user_id: int, session_name: str) -> bool:
+        """Compact a session's storage (journal backends fold the journal)."""
+        return self.backend.compact(user_id, session_name)
+    
+    def close(self) -> None:
+        """Flush the cache, stop background threads and close the backend."""
+        if self._flusher is not None:
+            self._flush_stop.set()
+            self._flusher.join(timeout=10)
+            self._flusher = None
+        if self.cache_size:
+            self.flush()
+        
+        self.backend.close()
+    
+    # ==================== Public API ====================
     
     def create_session(self, user_id: int, session_name: str) -> bool:
         """Create a new session."""
-        session_path = self._get_session_path(user_id, session_name)
-        if session_path.exists():
+        if self.backend.exists(user_id, session_name):
             return False
         
         session_data = {
@@ -52,70 +274,67 @@ class SessionStore:
             }
         }
         
-        try:
-            with session_path.open("w", encoding="utf-8") as f:
-                json.dump(session_data, f, ensure_ascii=False, indent=2)
-            logger.info(f"[session_store] Created session '{session_name}' for user {user_id}")
-            return True
-        except Exception as e:
-            logger.error(f"[session_store] Failed to create session: {e}")
+        if not self.backend.create(user_id, session_name, session_data):
             return False
+        logger.info(f"[session_store] Created session '{session_name}' for user {user_id}")
+        return True
+    
+    def _ensure_session(self, user_id: int, session_name: str) -> bool:
+        """Check a session exists, auto-creating the default session."""
+        if self.backend.exists(user_id, session_name):
+            return True
+        return session_name == "default" and self.create_session(user_id, session_name)
     
     def get_session(self, user_id: int, session_name: str) -> Optional[Dict[str, Any]]:
-        """Retrieve a session."""
-        session_path = self._get_session_path(user_id, session_name)
-        if not session_path.exists():
+        """Retrieve a copy of a session; persist changes with ``save_session``."""
+        session_data = self._load_session(user_id, session_name)
+        return copy.deepcopy(session_data) if session_data is not None else None
+    
+    def _load_session(self, user_id: int, session_name: str) -> Optional[Dict[str, Any]]:
+        """The session itself (the live cached dict when caching); never hand it out."""
+        key = (user_id, session_name)
+        if self.cache_size:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached
+        
+        session_data = self.backend.load(user_id, session_name)
+        if session_data is None:
             # Auto-create default session
-            if session_name == "default":
-                self.create_session(user_id, session_name)
-            else:
+            if session_name != "default" or not self.create_session(user_id, session_name):
+                return None
+            session_data = self.backend.load(user_id, session_name)
+            if session_data is None:
                 return None
         
-        try:
-            with session_path.open("r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"[session_store] Failed to read session: {e}")
-            return None
+        if self.cache_size:
+            self._cache_put(key, session_data)
+        return session_data
     
     def save_session(self, user_id: int, session_name: str, session_data: Dict[str, Any]) -> bool:
         """Save session data."""
-        session_path = self._get_session_path(user_id, session_name)
         session_data["updated_at"] = datetime.utcnow().isoformat()
         
+        # Callers may have edited message content (e.g. /continue), so refresh cached counts
+        for msg in session_data.get("messages", []):
+            msg["tokens"] = estimate_tokens(msg.get("content", ""))
+        
         # Trim messages if exceeding max
-        if len(session_data.get("messages", [])) > self.max_messages:
-            session_data["messages"] = session_data["messages"][-self.max_messages:]
+        trim_messages(session_data, self.max_messages, self.keep_unsummarized)
         
-        try:
-            with session_path.open("w", encoding="utf-8") as f:
-                json.dump(session_data, f, ensure_ascii=False, indent=2)
+        if self.cache_size:
+            key = (user_id, session_name)
+            self._cache_put(key, copy.deepcopy(session_data))
+            self._mark_dirty(key)
             return True
-        except Exception as e:
-            logger.error(f"[session_store] Failed to save session: {e}")
-            return False
+        
+        return self.backend.save(user_id, session_name, session_data)
     
     def list_sessions(self, user_id: int) -> List[Dict[str, Any]]:
         """List all sessions for a user."""
-        user_dir = self._get_user_dir(user_id)
-        sessions = []
-        
-        for session_file in user_dir.glob("*.json"):
-            try:
-                with session_file.open("r", encoding="utf-8") as f:
-                    session_data = json.load(f)
-                    sessions.append({
-                        "name": session_data.get("name", session_file.stem),
-                        "created_at": session_data.get("created_at", "N/A"),
-                        "updated_at": session_data.get("updated_at", "N/A"),
-                        "message_count": len(session_data.get("messages", [])),
-                        "model": session_data.get("metadata", {}).get("model", "N/A"),
-                        "provider": session_data.get("metadata", {}).get("provider", "N/A")
-                    })
-            except Exception as e:
-                logger.warning(f"[session_store] Failed to read session {session_file}: {e}")
-        
-        return sorted(sessions, key=lambda x: x.get("updated_at", ""), reverse=True)
+        if self.cache_size:
+            self.flush()
+        return self.backend.list_sessions(user_id)
     
     def delete_session(self, user_id: int, session_name: str) -> bool:
         """Delete a session."""
@@ -123,44 +342,61 @@ class SessionStore:
             logger.warning("[session_store] Cannot delete default session, clearing instead")
             return self.clear_session(user_id, session_name)
         
-        session_path = self._get_session_path(user_id, session_name)
-        if not session_path.exists():
-            return False
+        with self._cache_lock:
+            self._cache.pop((user_id, session_name), None)
+            self._dirty.pop((user_id, session_name), None)
         
-        try:
-            session_path.unlink()
-            logger.info(f"[session_store] Deleted session '{session_name}' for user {user_id}")
+        if not self.backend.delete(user_id, session_name):
+            return False
+        logger.info(f"[session_store] Deleted session '{session_name}' for user {user_id}")
+        return True
+    
+    def _record_change(self, user_id: int, session_name: str, entry: Dict[str, Any]) -> bool:
+        """Apply a change to the cached session, or hand it to the backend."""
+        if self.cache_size:
+            session_data = self._load_session(user_id, session_name)
+            if not session_data:
+                return False
+            with self._cache_lock:
+                apply_entries(session_data, [entry], self.max_messages, self.keep_unsummarized)
+            self._mark_dirty((user_id, session_name), entry)
             return True
-        except Exception as e:
-            logger.error(f"[session_store] Failed to delete session: {e}")
+        
+        if not self._ensure_session(user_id, session_name):
             return False
+        return self.backend.apply(user_id, session_name, [entry])
     
     def clear_session(self, user_id: int, session_name: str) -> bool:
-        """Clear messages in a session."""
-        session_data = self.get_session(user_id, session_name)
-        if not session_data:
+        """Clear messages in a session (and metadata derived from them)."""
+        if not self._record_change(user_id, session_name, {
+            "op": "clear",
+            "at": datetime.utcnow().isoformat()
+        }):
             return False
         
-        session_data["messages"] = []
-        return self.save_session(user_id, session_name, session_data)
+        for key in CONVERSATION_METADATA_KEYS:
+            if self.get_metadata(user_id, session_name, key) is not None:
+                self.update_metadata(user_id, session_name, key, None)
+        return True
     
     def append_message(self, user_id: int, session_name: str, role: str, content: str) -> bool:
-        """Append a message to session."""
-        session_data = self.get_session(user_id, session_name)
-        if not session_data:
-            return False
-        
-        session_data["messages"].append({
+        """Append a message to session (with its estimated token count cached)."""
+        message = {
             "role": role,
             "content": content,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+            "timestamp": datetime.utcnow().isoformat(),
+            "tokens": estimate_tokens(content)
+        }
         
-        return self.save_session(user_id, session_name, session_data)
+        return self._record_change(user_id, session_name, {
+            "op": "append",
+            "message": message,
+            "at": message["timestamp"]
+        })
     
     def get_messages(self, user_id: int, session_name: str) -> List[Dict[str, str]]:
         """Get messages from session (without timestamps for API calls)."""
-        session_data = self.get_session(user_id, session_name)
+        session_data = self._load_session(user_id, session_name)
         if not session_data:
             return []
         
@@ -170,25 +406,36 @@ class SessionStore:
             for msg in session_data.get("messages", [])
         ]
     
+    def get_history(self, user_id: int, session_name: str) -> List[Dict[str, Any]]:
+        """Get stored messages including timestamps and cached token counts."""
+        session_data = self._load_session(user_id, session_name)
+        if not session_data:
+            return []
+        return [dict(msg) for msg in session_data.get("messages", [])]
+    
     def update_metadata(self, user_id: int, session_name: str, key: str, value: Any) -> bool:
         """Update session metadata."""
-        session_data = self.get_session(user_id, session_name)
-        if not session_data:
-            return False
-        
-        if "metadata" not in session_data:
-            session_data["metadata"] = {}
-        
-        session_data["metadata"][key] = value
-        return self.save_session(user_id, session_name, session_data)
+        return self._record_change(user_id, session_name, {
+            "op": "metadata",
+            "key": key,
+            "value": value,
+            "at": datetime.utcnow().isoformat()
+        })
     
     def get_metadata(self, user_id: int, session_name: str, key: str, default: Any = None) -> Any:
         """Get session metadata value."""
-        session_data = self.get_session(user_id, session_name)
-        if not session_data:
+        if self.cache_size:
+            session_data = self._load_session(user_id, session_name)
+            metadata = session_data.get("metadata", {}) if session_data else None
+        else:
+            if not self._ensure_session(user_id, session_name):
+                return default
+            metadata = self.backend.load_metadata(user_id, session_name)
+        
+        if metadata is None:
             return default
         
-        return session_data.get("metadata", {}).get(key, default)
+        return metadata.get(key, default)
     
     def export_session(self, user_id: int, session_name: str, format: str = "json") -> Optional[str]:
         """Export session in specified format."""
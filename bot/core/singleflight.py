@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+singleflight.py
+
+Coalescing of identical in-flight requests.
+دمج الطلبات المتطابقة الجارية في طلب واحد.
+
+Concurrent calls with the same key (for example ``make_cache_key`` of a
+completion request) attach to one in-flight task and all receive its result
+or exception. The key is released as soon as the task finishes, so later
+calls start a fresh request; combine with ``ResponseCache`` to also reuse
+finished answers.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key."""
+    
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats = {"calls": 0, "coalesced": 0}
+    
+    @property
+    def inflight(self) -> int:
+        """Number of distinct keys currently in flight."""
+        return len(self._inflight)
+    
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run ``factory()`` once per key among concurrent callers.
+        
+        Args:
+            key: Request identity
+            factory: Coroutine function performing the request
+        
+        Returns:
+            Result of the shared call
+        
+        Raises:
+            Exception: Whatever the shared call raised
+        """
+        self._stats["calls"] += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            self._stats["coalesced"] += 1
+            logger.debug(f"[singleflight] Joined in-flight request {key[:12]}")
+        else:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._release(key, done))
+        
+        # Shield: one caller giving up must not cancel the others' request
+        return await asyncio.shield(future)
+    
+    def _release(self, key: str, future: asyncio.Future) -> None:
+        """Forget a finished call and mark its exception as retrieved."""
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            future.exception()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get call and coalescing counters."""
+        calls = self._stats["calls"]
+        return {
+            **self._stats,
+            "inflight": len(self._inflight),
+            "coalesced_rate": round(self._stats["coalesced"] / calls, 3) if calls else 0.0,
+        }
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+summarizer.py
+
+Rolling summarization of long chat sessions.
+تلخيص تدريجي للمحادثات الطويلة.
+
+Once the unsummarized part of a session grows past ``threshold_tokens``, the
+older turns are folded into a running summary stored in session metadata:
+- ``summary``: the running summary text
+- ``summary_upto``: timestamp of the last message folded into it
+
+Each run only sends the previous summary plus the newly folded turns, so a
+summary is never recomputed from the whole history.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from bot.core.context_builder import message_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "أنت مساعد متخصص في تلخيص المحادثات. حافظ على ملخص تراكمي مختصر يذكر "
+    "الحقائق والقرارات والأسئلة المفتوحة المهمة لمتابعة المحادثة. "
+    "Keep the running summary in the conversation's language."
+)
+
+
+class ConversationSummarizer:
+    """Folds older turns into a running summary in session metadata."""
+    
+    def __init__(
+        self,
+        threshold_tokens: int = 6000,
+        keep_recent_tokens: int = 2000,
+        max_summary_tokens: int = 500
+    ):
+        """
+        Initialize summarizer.
+        
+        Args:
+            threshold_tokens: Unsummarized tokens that trigger a fold (0 disables)
+            keep_recent_tokens: Newest tokens always left as raw turns
+            max_summary_tokens: Completion budget for the summary
+        """
+        self.threshold_tokens = threshold_tokens
+        self.keep_recent_tokens = keep_recent_tokens
+        self.max_summary_tokens = max_summary_tokens
+        self._running: Set[Tuple[int, str]] = set()
+        self.runs = 0
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether automatic summarization is on."""
+        return self.threshold_tokens > 0
+    
+    @staticmethod
+    def split_history(
+        history: List[Dict[str, Any]],
+        summary_upto: Optional[str]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Split history into (already summarized, not yet summarized) turns.
+        
+        Args:
+            history: Stored messages with timestamps, oldest first
+            summary_upto: Timestamp of the last summarized message
+        """
+        if not summary_upto:
+            return [], history
+        
+        # ISO timestamps sort lexicographically; messages are appended in order
+        index = len(history)
+        while index > 0 and (history[index - 1].get("timestamp") or "") > summary_upto:
+            index -= 1
+        return history[:index], history[index:]
+    
+    def select_fold(self, pending: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Choose the oldest pending turns to fold, or none below the threshold.
+        
+        The newest ``keep_recent_tokens`` stay raw and the fold ends right
+        before a user turn so question/answer pairs are not split.
+        """
+        if not self.enabled or sum(message_tokens(m) for m in pending) <= self.threshold_tokens:
+            return []
+        
+        kept = 0
+        cut = len(pending)
+        while cut > 0 and kept + message_tokens(pending[cut - 1]) <= self.keep_recent_tokens:
+            cut -= 1
+            kept += message_tokens(pending[cut])
+        
+        # Always leave the newest turn raw
+        cut = min(cut, len(pending) - 1)
+        while 0 < cut < len(pending) and pending[cut].get("role") != "user":
+            cut -= 1
+        return pending[:cut]
+    
+    def build_prompt(self, previous: Optional[str], turns: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """Build the incremental summarization request."""
+        conversation_text = "\n\n".join(
+            f"{'المستخدم' if msg['role'] == 'user' else 'المساعد'}: {msg['content']}"
+            for msg in turns
+        )
+        request = (
+            f"الملخص السابق:\n{previous}\n\n" if previous else ""
+        ) + (
+            "حدّث الملخص ليشمل الرسائل الجديدة التالية، في نقاط مختصرة:\n\n"
+            f"{conversation_text}"
+        )
+        return [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": request}
+        ]
+    
+    async def maybe_summarize(
+        self,
+        session_store,
+        client,
+        model: str,
+        user_id: int,
+        session_name: str
+    ) -> bool:
+        """
+        Fold older turns into the running summary if the session is long enough.
+        
+        Safe to schedule in the background after a reply: concurrent runs for
+        the same session are skipped and failures are only logged.
+        
+        Returns:
+            True if the summary was updated
+        """
+        key = (user_id, session_name)
+        if not self.enabled or key in self._running:
+            return False
+        
+        self._running.add(key)
+        try:
+            history = session_store.get_history(user_id, session_name)
+            summary_upto = session_store.get_metadata(user_id, session_name, "summary_upto")
+            _, pending = self.split_history(history, summary_upto)
+            
+            fold = self.select_fold(pending)
+            if not fold:
+                return False
+            
+            previous = session_store.get_metadata(user_id, session_name, "summary")
+            summary = await client.achat_completion(
+                messages=self.build_prompt(previous, fold),
+                model=model,
+                temperature=0.3,
+                max_tokens=self.max_summary_tokens
+            )
+            
+            # The session may have been cleared while the summary was generated
+            last_folded = fold[-1].get("timestamp")
+            if session_store.get_metadata(user_id, session_name, "summary_upto") != summary_upto or not any(
+                msg.get("timestamp") == last_folded for msg in session_store.get_history(user_id, session_name)
+            ):
+                return False
+            
+            session_store.update_metadata(user_id, session_name, "summary", summary.strip())
+            session_store.update_metadata(user_id, session_name, "summary_upto", fold[-1]["timestamp"])
+            self.runs += 1
+            logger.info(
+                f"[summarizer] user={user_id} session={session_name} folded={len(fold)} "
+                f"pending={len(pending) - len(fold)}"
+            )
+            return True
+        
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"[summarizer] user={user_id} session={session_name} failed: {e}")
+            return False
+        
+        finally:
+            self._running.discard(key)
@@ -27,8 +27,15 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 # Import core modules
 from bot.core.session_store import SessionStore
-from bot.core.rate_limiter import RateLimiter
+from bot.core.session_backends import create_backend
+from bot.core.rate_limiter import create_rate_limiter
+from bot.core.rate_limit_backends import create_rate_limit_backend
 from bot.core.model_registry import ModelRegistry
+from bot.core.context_builder import ContextBuilder
+from bot.core.summarizer import ConversationSummarizer
+from bot.core.response_cache import ResponseCache
+from bot.core.provider_router import ProviderRouter
+from bot.core.singleflight import SingleFlight
 from bot.core.persona_manager import PersonaManager
 from bot.core.tool_runner import ToolRunner
 
@@ -36,6 +43,7 @@ from bot.core.tool_runner import ToolRunner
 from bot.adapters.openai_client import OpenAIClient
 from bot.adapters.anthropic_client import AnthropicClient
 from bot.adapters.groq_client import GroqClient
+from bot.adapters.http_pool import close_async_client
 
 # Import utils
 from bot.utils.response_builder import ResponseBuilder
@@ -71,11 +79,35 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 ALLOWLIST_ENV = os.getenv("TELEGRAM_ALLOWLIST", "").strip()
 
 SESSION_BASE_PATH = os.getenv("SESSION_BASE_PATH", "analysis/sessions")
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "json").lower()
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "analysis/sessions.db")
 BOT_MAX_MESSAGES_PER_SESSION = int(os.getenv("BOT_MAX_MESSAGES_PER_SESSION", "50"))
+BOT_CONTEXT_MAX_TOKENS = int(os.getenv("BOT_CONTEXT_MAX_TOKENS", "16000"))
+BOT_SUMMARY_THRESHOLD_TOKENS = int(os.getenv("BOT_SUMMARY_THRESHOLD_TOKENS", "6000"))
+BOT_SUMMARY_KEEP_TOKENS = int(os.getenv("BOT_SUMMARY_KEEP_TOKENS", "2000"))
+BOT_SESSION_JOURNAL = os.getenv("BOT_SESSION_JOURNAL", "false").lower() == "true"
+BOT_SESSION_COMPACT_EVERY = int(os.getenv("BOT_SESSION_COMPACT_EVERY", "50"))
+BOT_SESSION_CACHE_SIZE = int(os.getenv("BOT_SESSION_CACHE_SIZE", "0"))
+BOT_SESSION_FLUSH_SECONDS = float(os.getenv("BOT_SESSION_FLUSH_SECONDS", "5"))
 BOT_RATE_WINDOW_SECONDS = int(os.getenv("BOT_RATE_WINDOW_SECONDS", "3600"))
 BOT_RATE_MAX_MESSAGES = int(os.getenv("BOT_RATE_MAX_MESSAGES", "30"))
+BOT_RATE_ALGORITHM = os.getenv("BOT_RATE_ALGORITHM", "sliding")
+BOT_RATE_BACKEND = os.getenv("BOT_RATE_BACKEND", "memory").lower()
+BOT_RATE_REDIS_URL = os.getenv("BOT_RATE_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+BOT_CACHE_SIZE = int(os.getenv("BOT_CACHE_SIZE", "512"))
+BOT_CACHE_TTL_SECONDS = float(os.getenv("BOT_CACHE_TTL_SECONDS", "3600"))
+BOT_CACHE_DB = os.getenv("BOT_CACHE_DB", "")
+BOT_CACHE_MAX_TEMPERATURE = float(os.getenv("BOT_CACHE_MAX_TEMPERATURE", "0.2"))
+BOT_CACHE_CHAT = os.getenv("BOT_CACHE_CHAT", "false").lower() == "true"
+BOT_TEMPERATURE = float(os.getenv("BOT_TEMPERATURE", "0.7"))
+BOT_FAILOVER = os.getenv("BOT_FAILOVER", "true").lower() == "true"
+BOT_HEDGE_REQUESTS = os.getenv("BOT_HEDGE_REQUESTS", "false").lower() == "true"
+BOT_PROVIDER_TIMEOUT = float(os.getenv("BOT_PROVIDER_TIMEOUT", "30"))
+BOT_COALESCE_REQUESTS = os.getenv("BOT_COALESCE_REQUESTS", "true").lower() == "true"
 BOT_PERSONA = os.getenv("BOT_PERSONA", "default")
 BOT_SILENT_SUGGESTIONS = os.getenv("BOT_SILENT_SUGGESTIONS", "false").lower() == "true"
+BOT_STREAMING = os.getenv("BOT_STREAMING", "true").lower() == "true"
+BOT_STREAM_EDIT_INTERVAL = float(os.getenv("BOT_STREAM_EDIT_INTERVAL", "1.0"))
 
 GITHUB_REPO = os.getenv("GITHUB_REPO", "MOTEB1989/Top-TieR-Global-HUB-AI")
 
@@ -161,24 +193,82 @@ def initialize_components(app: Application) -> None:
     logger.info("[bot] Initializing components...")
     
     # Session store
-    session_store = SessionStore(base_path=SESSION_BASE_PATH)
+    if SESSION_BACKEND == "sqlite":
+        backend = create_backend("sqlite", SESSION_SQLITE_PATH)
+        storage = f"sqlite:{SESSION_SQLITE_PATH}"
+    else:
+        backend = create_backend(
+            "json",
+            SESSION_BASE_PATH,
+            journal=BOT_SESSION_JOURNAL,
+            compact_threshold=BOT_SESSION_COMPACT_EVERY
+        )
+        storage = f"{SESSION_BASE_PATH} (mode={'journal' if BOT_SESSION_JOURNAL else 'snapshot'})"
+    
+    session_store = SessionStore(
+        backend=backend,
+        cache_size=BOT_SESSION_CACHE_SIZE,
+        flush_interval=BOT_SESSION_FLUSH_SECONDS
+    )
     session_store.max_messages = BOT_MAX_MESSAGES_PER_SESSION
     app.bot_data["session_store"] = session_store
-    logger.info(f"[bot] Session store initialized: {SESSION_BASE_PATH}")
+    logger.info(f"[bot] Session store initialized: {storage}, cache={BOT_SESSION_CACHE_SIZE}")
     
-    # Rate limiter
-    rate_limiter = RateLimiter(
+    # Rate limiter (Redis backend shares one quota across replicas)
+    rate_options = {}
+    if BOT_RATE_BACKEND == "redis":
+        rate_options["backend"] = create_rate_limit_backend("redis", url=BOT_RATE_REDIS_URL)
+    rate_limiter = create_rate_limiter(
+        BOT_RATE_ALGORITHM,
         window_seconds=BOT_RATE_WINDOW_SECONDS,
-        max_messages=BOT_RATE_MAX_MESSAGES
+        max_messages=BOT_RATE_MAX_MESSAGES,
+        **rate_options
     )
     app.bot_data["rate_limiter"] = rate_limiter
-    logger.info(f"[bot] Rate limiter initialized: {BOT_RATE_MAX_MESSAGES} msgs / {BOT_RATE_WINDOW_SECONDS}s")
+    logger.info(
+        f"[bot] Rate limiter initialized: {BOT_RATE_ALGORITHM}/{BOT_RATE_BACKEND} "
+        f"{BOT_RATE_MAX_MESSAGES} msgs / {BOT_RATE_WINDOW_SECONDS}s"
+    )
     
     # Model registry
     model_registry = ModelRegistry()
     app.bot_data["model_registry"] = model_registry
     logger.info("[bot] Model registry initialized")
     
+    # Context builder (token budget per model)
+    app.bot_data["context_builder"] = ContextBuilder(
+        model_registry,
+        max_context_tokens=BOT_CONTEXT_MAX_TOKENS
+    )
+    logger.info(f"[bot] Context builder initialized: max_context_tokens={BOT_CONTEXT_MAX_TOKENS}")
+    
+    # Rolling summarizer (folds older turns into session metadata)
+    app.bot_data["summarizer"] = ConversationSummarizer(
+        threshold_tokens=BOT_SUMMARY_THRESHOLD_TOKENS,
+        keep_recent_tokens=BOT_SUMMARY_KEEP_TOKENS
+    )
+    # Never trim turns the summarizer has not folded in yet
+    session_store.keep_unsummarized = app.bot_data["summarizer"].enabled
+    logger.info(
+        f"[bot] Summarizer initialized: threshold={BOT_SUMMARY_THRESHOLD_TOKENS} "
+        f"keep_recent={BOT_SUMMARY_KEEP_TOKENS}"
+    )
+    
+    # Response cache (low-temperature and opt-in completions)
+    if BOT_CACHE_SIZE > 0:
+        app.bot_data["response_cache"] = ResponseCache(
+            max_entries=BOT_CACHE_SIZE,
+            ttl_seconds=BOT_CACHE_TTL_SECONDS,
+            db_path=BOT_CACHE_DB or None,
+            max_temperature=BOT_CACHE_MAX_TEMPERATURE
+        )
+        logger.info(f"[bot] Response cache initialized: size={BOT_CACHE_SIZE} db={BOT_CACHE_DB or 'memory'}")
+    
+    # Request coalescing (identical in-flight completions share one call)
+    if BOT_COALESCE_REQUESTS:
+        app.bot_data["singleflight"] = SingleFlight()
+        logger.info("[bot] Request coalescing enabled")
+    
     # Persona manager
     persona_manager = PersonaManager(repo_name=GITHUB_REPO)
     app.bot_data["persona_manager"] = persona_manager
@@ -211,6 +301,18 @@ def initialize_components(app: Application) -> None:
     else:
         logger.warning("[bot] ⚠️ Groq client not available (missing API key)")
     
+    # Provider router (failover to equivalent models, optional hedging)
+    if BOT_FAILOVER:
+        app.bot_data["provider_router"] = ProviderRouter(
+            {"openai": openai_client, "anthropic": anthropic_client, "groq": groq_client},
+            model_registry=model_registry,
+            attempt_timeout=BOT_PROVIDER_TIMEOUT,
+            hedge=BOT_HEDGE_REQUESTS
+        )
+        logger.info(
+            f"[bot] Provider router initialized: timeout={BOT_PROVIDER_TIMEOUT}s hedge={BOT_HEDGE_REQUESTS}"
+        )
+    
     # Utils
     response_builder = ResponseBuilder(silent_suggestions=BOT_SILENT_SUGGESTIONS)
     app.bot_data["response_builder"] = response_builder
@@ -220,9 +322,35 @@ def initialize_components(app: Application) -> None:
     app.bot_data["safety_filter"] = safety_filter
     logger.info("[bot] Safety filter initialized")
     
+    # Streaming replies
+    app.bot_data["streaming"] = BOT_STREAMING
+    app.bot_data["temperature"] = BOT_TEMPERATURE
+    app.bot_data["cache_chat"] = BOT_CACHE_CHAT
+    app.bot_data["stream_edit_interval"] = BOT_STREAM_EDIT_INTERVAL
+    logger.info(f"[bot] Streaming replies: {BOT_STREAMING} (edit every {BOT_STREAM_EDIT_INTERVAL}s)")
+    
     logger.info("[bot] ✅ All components initialized")
 
 
+async def shutdown_components(app: Application) -> None:
+    """Flush and release bot components on shutdown."""
+    session_store = app.bot_data.get("session_store")
+    if session_store:
+        session_store.close()
+        logger.info(f"[bot] Session store closed: cache={session_store.get_cache_stats()}")
+    
+    rate_limiter = app.bot_data.get("rate_limiter")
+    if rate_limiter:
+        rate_limiter.close()
+    
+    response_cache = app.bot_data.get("response_cache")
+    if response_cache:
+        logger.info(f"[bot] Response cache closed: {response_cache.get_stats()}")
+        response_cache.close()
+    
+    await close_async_client()
+
+
 # ==================== Main ====================
 
 def main() -> None:
@@ -247,7 +375,7 @@ def main() -> None:
     logger.info("=" * 60)
     
     # Build application
-    app = Application.builder().token(TELEGRAM_TOKEN).build()
+    app = Application.builder().token(TELEGRAM_TOKEN).post_shutdown(shutdown_components).build()
     
     # Initialize components
     initialize_components(app)
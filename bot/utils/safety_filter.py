@@ -7,10 +7,11 @@ Basic content safety filtering (secrets detection).
 فلتر الأمان للمحتوى.
 """
 
-import re
 import logging
 from typing import Tuple, List
 
+from bot.utils.secret_scanner import REDACTED, get_default_scanner
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,24 +19,10 @@ class SafetyFilter:
     """Filters sensitive content from user input."""
     
     def __init__(self):
-        """Initialize safety filter with patterns."""
+        """Initialize safety filter with the shared precompiled scanner."""
+        self.scanner = get_default_scanner()
         # Patterns for common secret formats
-        self.secret_patterns = [
-            (r'sk-[A-Za-z0-9]{20,}', "OpenAI API key"),
-            (r'ghp_[A-Za-z0-9]{36,}', "GitHub Personal Access Token"),
-            (r'gho_[A-Za-z0-9]{36,}', "GitHub OAuth Token"),
-            (r'ghs_[A-Za-z0-9]{36,}', "GitHub App Token"),
-            (r'ghu_[A-Za-z0-9]{36,}', "GitHub User Token"),
-            (r'glpat-[A-Za-z0-9_\-]{20,}', "GitLab Personal Access Token"),
-            (r'xox[baprs]-[A-Za-z0-9\-]+', "Slack Token"),
-            (r'AKIA[0-9A-Z]{16}', "AWS Access Key"),
-            (r'AIza[0-9A-Za-z\-_]{35}', "Google API Key"),
-            (r'[0-9]+-[0-9A-Za-z_]{32}\.apps\.googleusercontent\.com', "Google OAuth"),
-            (r'sq0[a-z]{3}-[0-9A-Za-z\-_]{22,}', "Square OAuth Secret"),
-            (r'-----BEGIN [A-Z]+ PRIVATE KEY-----', "Private Key"),
-            (r'bearer\s+[A-Za-z0-9\-_=]+\.[A-Za-z0-9\-_=]+\.[A-Za-z0-9\-_=]+', "JWT Token"),
-            (r'eyJ[A-Za-z0-9\-_=]+\.[A-Za-z0-9\-_=]+\.[A-Za-z0-9\-_=]+', "JWT Token (base64)"),
-        ]
+        self.secret_patterns = [(rule.pattern, rule.name) for rule in self.scanner.rules]
         
         logger.info(f"[safety_filter] Initialized with {len(self.secret_patterns)} patterns")
     
@@ -45,16 +32,14 @@ class SafetyFilter:
         
         Args:
             text: Text to scan
-            
+        
         Returns:
             Tuple of (has_secrets, list_of_detected_types)
         """
-        detected = []
+        detected = self.scanner.scan(text)
         
-        for pattern, description in self.secret_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                detected.append(description)
-                logger.warning(f"[safety_filter] Detected potential secret: {description}")
+        for description in detected:
+            logger.warning(f"[safety_filter] Detected potential secret: {description}")
         
         return len(detected) > 0, detected
     
@@ -64,7 +49,7 @@ class SafetyFilter:
         
         Args:
             text: User input text
-            
+        
         Returns:
             Tuple of (is_safe, message, detected_types)
             - is_safe: True if no secrets detected
@@ -100,18 +85,21 @@ class SafetyFilter:
         
         Args:
             text: Text to mask
-            
+        
         Returns:
             Text with secrets masked
         """
-        masked_text = text
+        masked_text, _ = self.scanner.scan_and_mask(text, REDACTED)
+        return masked_text
+    
+    def scan_and_mask(self, text: str) -> Tuple[str, List[str]]:
+        """
+        Detect and mask secrets in a single pass.
         
-        for pattern, _ in self.secret_patterns:
-            masked_text = re.sub(
-                pattern,
-                "[SECRET_REDACTED]",
-                masked_text,
-                flags=re.IGNORECASE
-            )
+        Args:
+            text: Text to scan
         
-        return masked_text
+        Returns:
+            Tuple of (masked_text, detected_types)
+        """
+        return self.scanner.scan_and_mask(text, REDACTED)
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+secret_scanner.py
+
+Single-pass secret detection and masking.
+فحص الأسرار وإخفاؤها بمرور واحد على النص.
+
+All rules are compiled once. A combined trigger regex made of each rule's
+literal prefix (``sk-``, ``ghp_``, ``AKIA``, ``eyJ`` ...) finds candidates, and
+the matched literal is dispatched to the rule that owns it, which is then
+matched at that position. The trigger has no capture groups on purpose:
+Python's regex engine only applies its fast literal-prefix skip to plain
+alternations, which makes this much faster than an alternation of the full
+patterns or one search per pattern. Rules without a literal trigger (such as
+the PII patterns from ``policies/guardrails.yaml``) are scanned directly and
+merged in order.
+"""
+
+import heapq
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Pattern, Sequence, Tuple
+
+try:  # pragma: no cover - optional dependency guard
+    import yaml
+except ImportError:  # pragma: no cover - guardrail rules are skipped
+    yaml = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+GUARDRAILS_PATH = Path(__file__).resolve().parents[2] / "policies" / "guardrails.yaml"
+
+
+@dataclass(frozen=True)
+class SecretRule:
+    """A secret format and the literal that triggers it."""
+    name: str
+    pattern: str
+    trigger: Optional[str] = None  # None scans the full pattern directly
+    lookbehind: int = 0  # >0 when the trigger sits at the end of the secret
+
+
+@dataclass(frozen=True)
+class SecretMatch:
+    """A detected secret span."""
+    name: str
+    start: int
+    end: int
+
+
+# Key formats are case-sensitive; only the "bearer" keyword ignores case
+DEFAULT_RULES: Tuple[SecretRule, ...] = (
+    SecretRule("OpenAI API key", r'sk-[A-Za-z0-9]{20,}', r'sk-'),
+    SecretRule("GitHub Personal Access Token", r'ghp_[A-Za-z0-9]{36,}', r'ghp_'),
+    SecretRule("GitHub OAuth Token", r'gho_[A-Za-z0-9]{36,}', r'gho_'),
+    SecretRule("GitHub App Token", r'ghs_[A-Za-z0-9]{36,}', r'ghs_'),
+    SecretRule("GitHub User Token", r'ghu_[A-Za-z0-9]{36,}', r'ghu_'),
+    SecretRule("GitLab Personal Access Token", r'glpat-[A-Za-z0-9_\-]{20,}', r'glpat-'),
+    SecretRule("Slack Token", r'xox[baprs]-[A-Za-z0-9\-]+', r'xox[baprs]-'),
+    SecretRule("AWS Access Key", r'AKIA[0-9A-Z]{16}', r'AKIA'),
+    SecretRule("Google API Key", r'AIza[0-9A-Za-z\-_]{35}', r'AIza'),
+    SecretRule(
+        "Google OAuth",
+        r'[0-9]+-[0-9A-Za-z_]{32}\.apps\.googleusercontent\.com',
+        r'\.apps\.googleusercontent\.com',
+        lookbehind=96
+    ),
+    SecretRule("Square OAuth Secret", r'sq0[a-z]{3}-[0-9A-Za-z\-_]{22,}', r'sq0'),
+    SecretRule("Private Key", r'-----BEGIN [A-Z]+ PRIVATE KEY-----', r'-----BEGIN '),
+    SecretRule(
+        "JWT Token",
+        r'(?i:bearer)\s+[A-Za-z0-9\-_=]+\.[A-Za-z0-9\-_=]+\.[A-Za-z0-9\-_=]+',
+        r'(?i:bearer)\s'
+    ),
+    SecretRule("JWT Token (base64)", r'eyJ[A-Za-z0-9\-_=]+\.[A-Za-z0-9\-_=]+\.[A-Za-z0-9\-_=]+', r'eyJ'),
+)
+
+REDACTED = "[SECRET_REDACTED]"
+
+
+class SecretScanner:
+    """Precompiled prefix-dispatch scanner for secret formats."""
+    
+    def __init__(self, rules: Sequence[SecretRule] = DEFAULT_RULES):
+        """
+        Compile the scanner.
+        
+        Args:
+            rules: Secret rules; earlier rules win when triggers overlap
+        """
+        self.rules = tuple(rules)
+        self._triggered = [rule for rule in self.rules if rule.trigger]
+        self._patterns = [re.compile(rule.pattern) for rule in self._triggered]
+        self._triggers = [re.compile(rule.trigger) for rule in self._triggered]
+        self._trigger = (
+            re.compile("|".join(f"(?:{rule.trigger})" for rule in self._triggered))
+            if self._triggered else None
+        )
+        self._direct = [(rule, re.compile(rule.pattern)) for rule in self.rules if not rule.trigger]
+        self._dispatch: Dict[str, int] = {}
+    
+    def _rule_index(self, literal: str) -> int:
+        """Find the rule owning a matched trigger literal (memoized)."""
+        index = self._dispatch.get(literal)
+        if index is None:
+            index = next(i for i, trigger in enumerate(self._triggers) if trigger.fullmatch(literal))
+            if len(self._dispatch) < 1024:
+                self._dispatch[literal] = index
+        return index
+    
+    def iter_matches(self, text: str, pos: int = 0, endpos: Optional[int] = None) -> Iterator[SecretMatch]:
+        """
+        Yield non-overlapping secrets from left to right.
+        
+        Args:
+            text: Text to scan
+            pos: Start offset
+            endpos: End offset (defaults to the end of text)
+        
+        Yields:
+            SecretMatch for each detected secret
+        """
+        endpos = len(text) if endpos is None else endpos
+        if not self._direct:
+            yield from self._iter_triggered(text, pos, endpos)
+            return
+        
+        streams = [self._iter_triggered(text, pos, endpos)] + [
+            self._iter_direct(rule, pattern, text, pos, endpos) for rule, pattern in self._direct
+        ]
+        last_end = pos
+        for match in heapq.merge(*streams, key=lambda m: m.start):
+            if match.start >= last_end:
+                yield match
+                last_end = match.end
+    
+    @staticmethod
+    def _iter_direct(rule: SecretRule, pattern: Pattern, text: str, pos: int, endpos: int) -> Iterator[SecretMatch]:
+        """Yield matches of a rule scanned without a trigger."""
+        for found in pattern.finditer(text, pos, endpos):
+            yield SecretMatch(rule.name, found.start(), found.end())
+    
+    def _iter_triggered(self, text: str, pos: int, endpos: int) -> Iterator[SecretMatch]:
+        """Yield matches of the prefix-dispatched rules."""
+        if self._trigger is None:
+            return
+        
+        trigger_search = self._trigger.search
+        last_end = pos
+        
+        candidate = trigger_search(text, pos, endpos)
+        while candidate:
+            index = self._rule_index(candidate.group())
+            rule = self._triggered[index]
+            
+            if rule.lookbehind:
+                # Trigger ends the secret: search back, never into emitted spans
+                start = max(last_end, candidate.start() - rule.lookbehind)
+                found = self._patterns[index].search(text, start, candidate.end())
+                if found and found.end() != candidate.end():
+                    found = None
+            else:
+                found = self._patterns[index].match(text, candidate.start(), endpos)
+            
+            if found:
+                yield SecretMatch(rule.name, found.start(), found.end())
+                last_end = found.end()
+                candidate = trigger_search(text, last_end, endpos)
+            else:
+                candidate = trigger_search(text, candidate.start() + 1, endpos)
+    
+    def scan(self, text: str) -> List[str]:
+        """
+        Detect secret types in text.
+        
+        Returns:
+            Distinct secret type names in order of first appearance
+        """
+        return list(dict.fromkeys(m.name for m in self.iter_matches(text)))
+    
+    def scan_and_mask(self, text: str, replacement: str = REDACTED) -> Tuple[str, List[str]]:
+        """
+        Detect and mask secrets in one pass.
+        
+        Args:
+            text: Text to scan
+            replacement: Text substituted for each secret
+        
+        Returns:
+            Tuple of (masked_text, detected_types)
+        """
+        parts = []
+        detected = {}
+        cursor = 0
+        
+        for match in self.iter_matches(text):
+            parts.append(text[cursor:match.start])
+            parts.append(replacement)
+            detected[match.name] = None
+            cursor = match.end
+        
+        if not parts:
+            return text, []
+        
+        parts.append(text[cursor:])
+        return "".join(parts), list(detected)
+
+
+def load_guardrail_rules(path: Optional[str] = None) -> List[SecretRule]:
+    """
+    Load PII rules from the ``PII_redaction_patterns`` list of a guardrails file.
+    
+    Entries have the form ``"Label: regex"``. Invalid entries are skipped with
+    a warning.
+    
+    Args:
+        path: Guardrails YAML file (defaults to policies/guardrails.yaml)
+    
+    Returns:
+        List of SecretRule without triggers (scanned directly)
+    """
+    path = Path(path) if path else GUARDRAILS_PATH
+    if yaml is None:
+        logger.warning("[secret_scanner] PyYAML not installed, guardrail PII rules skipped")
+        return []
+    
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            policy = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        logger.warning(f"[secret_scanner] Failed to load guardrails {path}: {e}")
+        return []
+    
+    rules = []
+    for entry in policy.get("PII_redaction_patterns") or []:
+        label, sep, pattern = str(entry).partition(": ")
+        if not sep:
+            logger.warning(f"[secret_scanner] Skipping malformed PII pattern: {entry!r}")
+            continue
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            logger.warning(f"[secret_scanner] Skipping invalid PII pattern {label!r}: {e}")
+            continue
+        rules.append(SecretRule(label.strip(), pattern))
+    return rules
+
+
+_default_scanner: Optional[SecretScanner] = None
+
+
+def get_default_scanner() -> SecretScanner:
+    """Get the shared scanner compiled from DEFAULT_RULES."""
+    global _default_scanner
+    if _default_scanner is None:
+        _default_scanner = SecretScanner()
+    return _default_scanner
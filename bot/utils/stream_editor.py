@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+stream_editor.py
+
+Incremental Telegram message edits for streamed responses.
+تحديث رسالة تيليجرام تدريجياً أثناء وصول الرد.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingReply:
+    """Sends a placeholder reply and edits it in place as tokens arrive."""
+    
+    def __init__(
+        self,
+        message: Message,
+        min_interval: float = 1.0,
+        max_length: int = 4000,
+        placeholder: str = "⏳ ...",
+        cursor: str = " ▌"
+    ):
+        """
+        Initialize streaming reply.
+        
+        Args:
+            message: Incoming message to reply to
+            min_interval: Minimum seconds between edits (Telegram edit rate)
+            max_length: Maximum visible length while streaming
+            placeholder: Text of the initial placeholder message
+            cursor: Marker appended while the answer is still streaming
+        """
+        self.message = message
+        self.min_interval = min_interval
+        self.max_length = max_length
+        self.placeholder = placeholder
+        self.cursor = cursor
+        self.sent: Optional[Message] = None
+        self.edits = 0
+        self._last_edit = 0.0
+        self._last_text = ""
+    
+    @property
+    def started(self) -> bool:
+        """Whether the placeholder message has been sent."""
+        return self.sent is not None
+    
+    async def start(self) -> None:
+        """Send the placeholder message."""
+        self.sent = await self.message.reply_text(self.placeholder)
+        self._last_edit = time.monotonic()
+    
+    async def update(self, text: str) -> None:
+        """Show partial text if the edit interval has elapsed."""
+        if not self.sent or not text.strip():
+            return
+        if time.monotonic() - self._last_edit < self.min_interval:
+            return
+        
+        visible = text[:self.max_length] + self.cursor
+        await self._edit(visible)
+    
+    async def finish(self, text: str) -> None:
+        """Replace the placeholder with the final text."""
+        if not self.sent:
+            await self.message.reply_text(text)
+            return
+        await self._edit(text or self.placeholder, final=True)
+    
+    async def _edit(self, text: str, final: bool = False) -> None:
+        """Edit the placeholder, tolerating no-op edits and flood control."""
+        if text == self._last_text:
+            return
+        
+        self._last_edit = time.monotonic()
+        try:
+            await self.sent.edit_text(text)
+            self._last_text = text
+            self.edits += 1
+        except RetryAfter as e:
+            retry_after = float(getattr(e.retry_after, "total_seconds", lambda: e.retry_after)())
+            logger.warning(f"[stream_editor] Flood control, retry after {retry_after}s")
+            if final:
+                # The final text must land; wait out the flood window once
+                await asyncio.sleep(retry_after)
+                await self.sent.edit_text(text)
+                self._last_text = text
+                self.edits += 1
+            else:
+                # Skip intermediate edits until Telegram allows the next one
+                self._last_edit = time.monotonic() + retry_after
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
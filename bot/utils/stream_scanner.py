@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+stream_scanner.py
+
+Chunked secret/PII scanning for large files and text streams.
+فحص الأسرار والبيانات الشخصية في الملفات الكبيرة على دفعات.
+
+Text is read in fixed-size chunks. The last ``overlap`` characters of each
+buffer are carried into the next one so secrets split across a chunk
+boundary are still found, and a match touching the end of the buffer is held
+back until the next chunk shows where it ends (up to ``max_match``
+characters). Memory stays bounded by ``chunk_size + max(overlap, max_match)``
+regardless of the input size.
+"""
+
+import codecs
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Union
+
+from bot.utils.secret_scanner import (
+    DEFAULT_RULES,
+    REDACTED,
+    SecretScanner,
+    load_guardrail_rules,
+)
+
+logger = logging.getLogger(__name__)
+
+TextSource = Union[str, Iterable[str], IO]
+
+
+@dataclass
+class ScanResult:
+    """Outcome of scanning a stream."""
+    text: str = ""  # masked prefix
+    counts: Dict[str, int] = field(default_factory=dict)
+    chars: int = 0  # length of the full masked text
+    truncated: bool = False
+    
+    @property
+    def detected(self) -> List[str]:
+        """Detected types in order of first appearance."""
+        return list(self.counts)
+
+
+def iter_text_chunks(source: TextSource, chunk_size: int = 64 * 1024) -> Iterator[str]:
+    """
+    Read text from a file object, string or iterable of strings in chunks.
+    
+    Binary file objects are decoded incrementally as UTF-8 (invalid bytes are
+    replaced), so multi-byte characters split across reads stay intact.
+    """
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+        return
+    
+    read = getattr(source, "read", None)
+    if read is None:
+        yield from source
+        return
+    
+    decoder = None
+    while True:
+        data = read(chunk_size)
+        if not data:
+            break
+        if isinstance(data, bytes):
+            decoder = decoder or codecs.getincrementaldecoder("utf-8")(errors="replace")
+            data = decoder.decode(data)
+        if data:
+            yield data
+    if decoder:
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+
+class StreamScanner:
+    """Masks secrets and PII in arbitrarily large text with bounded memory."""
+    
+    def __init__(
+        self,
+        scanner: Optional[SecretScanner] = None,
+        chunk_size: int = 64 * 1024,
+        overlap: int = 512,
+        max_match: int = 64 * 1024,
+        replacement: str = REDACTED
+    ):
+        """
+        Initialize stream scanner.
+        
+        Args:
+            scanner: Compiled rules (default: secret rules + guardrail PII rules)
+            chunk_size: Characters read per chunk
+            overlap: Characters carried between chunks; must exceed the
+                longest bounded secret so boundary-spanning matches are found
+            max_match: Longest match held back while it may still grow
+            replacement: Text substituted for each match
+        """
+        self.scanner = scanner or get_default_stream_scanner().scanner
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.max_match = max_match
+        self.replacement = replacement
+    
+    def iter_masked(self, source: TextSource, counts: Optional[Counter] = None) -> Iterator[str]:
+        """
+        Yield the masked text of a source piece by piece.
+        
+        Args:
+            source: File object, string or iterable of text chunks
+            counts: Optional Counter updated with matches per type
+        
+        Yields:
+            Masked text; concatenated pieces equal the masked input
+        """
+        counts = Counter() if counts is None else counts
+        carry = ""
+        chunks = iter_text_chunks(source, self.chunk_size)
+        
+        while True:
+            chunk = next(chunks, None)
+            final = chunk is None
+            buffer = carry + (chunk or "")
+            if not buffer:
+                return
+            
+            cut = len(buffer) if final else max(0, len(buffer) - self.overlap)
+            pieces = []
+            pos = 0
+            for match in self.scanner.iter_matches(buffer):
+                if match.start >= cut:
+                    break
+                # A match reaching the buffer end may continue in the next
+                # chunk; hold it back unless it is already implausibly long
+                if (not final and match.end >= len(buffer)
+                        and len(buffer) - match.start <= self.max_match):
+                    cut = match.start
+                    break
+                pieces.append(buffer[pos:match.start])
+                pieces.append(self.replacement)
+                counts[match.name] += 1
+                pos = match.end
+                cut = max(cut, match.end)
+            
+            pieces.append(buffer[pos:cut])
+            carry = buffer[cut:]
+            output = "".join(pieces)
+            if output:
+                yield output
+            if final:
+                return
+    
+    def scan(self, source: TextSource, keep: int = 4000) -> ScanResult:
+        """
+        Scan a whole source, keeping only the first ``keep`` masked characters.
+        
+        Args:
+            source: File object, string or iterable of text chunks
+            keep: Masked characters to keep in the result (0 keeps none)
+        
+        Returns:
+            ScanResult with the masked prefix and match counts per type
+        """
+        counts: Counter = Counter()
+        kept: List[str] = []
+        kept_len = 0
+        chars = 0
+        
+        for piece in self.iter_masked(source, counts):
+            chars += len(piece)
+            if kept_len < keep:
+                kept.append(piece[:keep - kept_len])
+                kept_len += len(kept[-1])
+        
+        result = ScanResult(
+            text="".join(kept),
+            counts=dict(counts),
+            chars=chars,
+            truncated=chars > kept_len
+        )
+        if counts:
+            logger.warning(f"[stream_scanner] Redacted {sum(counts.values())} matches: {dict(counts)}")
+        return result
+
+
+_default_stream_scanner: Optional[StreamScanner] = None
+
+
+def get_default_stream_scanner() -> StreamScanner:
+    """Get the shared scanner for secret rules plus guardrail PII rules."""
+    global _default_stream_scanner
+    if _default_stream_scanner is None:
+        rules = list(DEFAULT_RULES) + load_guardrail_rules()
+        _default_stream_scanner = StreamScanner(scanner=SecretScanner(rules))
+    return _default_stream_scanner
@@ -0,0 +1,50 @@
+-- Full-text search over rag.chunks with Arabic normalization
+-- Replaces the `content ILIKE '%kw%'` sequential scan used by rag_query.
+-- Run with: psql "$DB_URL" -f db/postgres/migrations/001_rag_chunks_fulltext.sql
+--
+-- Adding the stored generated column rewrites rag.chunks under an exclusive
+-- lock; run during a maintenance window on large tables.
+
+BEGIN;
+
+-- ============================================================================
+-- ARABIC NORMALIZATION
+-- ============================================================================
+
+-- Strip diacritics (U+064B-U+0652, U+0670, U+06D6-U+06ED) and tatweel (U+0640),
+-- map alef forms (أ إ آ ٱ) to ا and alef maksura (ى) to ي.
+-- Characters of the first argument without a counterpart in the second are
+-- deleted by translate(). Keep in sync with app/rag/arabic.py.
+CREATE OR REPLACE FUNCTION rag.normalize_arabic(input text)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE
+STRICT
+PARALLEL SAFE
+AS $$
+    SELECT translate(
+        input,
+        U&'\0623\0625\0622\0671\0649'
+        || U&'\064B\064C\064D\064E\064F\0650\0651\0652\0670'
+        || U&'\06D6\06D7\06D8\06D9\06DA\06DB\06DC\06DD\06DE\06DF\06E0\06E1\06E2\06E3\06E4\06E5\06E6\06E7\06E8\06E9\06EA\06EB\06EC\06ED'
+        || U&'\0640',
+        U&'\0627\0627\0627\0627\064A'
+    )
+$$;
+
+-- ============================================================================
+-- SEARCH VECTOR AND INDEX
+-- ============================================================================
+
+-- 'simple' configuration: no stemming or stop words, so Arabic tokens are
+-- matched exactly after normalization.
+ALTER TABLE rag.chunks
+    ADD COLUMN IF NOT EXISTS search_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', rag.normalize_arabic(coalesce(content, '')))) STORED;
+
+CREATE INDEX IF NOT EXISTS chunks_search_tsv_gin
+    ON rag.chunks USING gin (search_tsv);
+
+ANALYZE rag.chunks;
+
+COMMIT;
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from typing import Any
 
@@ -15,6 +16,7 @@ class GPTRequest(BaseModel):
     temperature: float | None = 0.7
     model: str | None = "gpt-3.5-turbo"
     user: str | None = "system"
+    cache: bool | None = None  # None caches only low temperatures
 
 
 class GPTResponse(BaseModel):
@@ -44,8 +46,10 @@ class GPTClient:
             raise ValueError("OpenAI API key not configured")
 
         try:
-            # Use the older openai v0.27.10 API format
-            response = openai.Completion.create(
+            # Use the older openai v0.27.10 API format (blocking, so run it
+            # off the event loop to let concurrent requests overlap)
+            response = await asyncio.to_thread(
+                openai.Completion.create,
                 engine=request.model if request.model != "gpt-3.5-turbo" else "text-davinci-003",
                 prompt=request.prompt,
                 max_tokens=request.max_tokens,
@@ -85,8 +89,6 @@ def main():
 
     try:
         # Simple test to verify API connectivity
-        import asyncio
-
         async def test_connection():
             request = GPTRequest(
                 prompt="Say 'OK' if you can hear me",
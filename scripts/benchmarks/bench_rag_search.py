@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+RAG search benchmark
+قياس أداء البحث في مقاطع الوثائق
+
+Fills a scratch table with synthetic Arabic chunks (1M by default) and
+compares query latency of the previous ``content ILIKE '%kw%'`` scan with the
+ranked ``tsvector`` search backed by a GIN index. Needs a Postgres reachable
+at DB_URL with ``rag.normalize_arabic`` installed
+(db/postgres/migrations/001_rag_chunks_fulltext.sql).
+
+Usage:
+    python scripts/benchmarks/bench_rag_search.py --chunks 1000000 --repeat 5
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import psycopg2
+
+from app.rag.arabic import normalize_arabic
+from app.rag.db import DB_URL
+
+SCHEMA = "rag_bench"
+WORDS = (
+    "المادة اللائحة النظام القرار مجلس الوزراء الهيئة البنك المركزي التعميم "
+    "الالتزام المخاطر الترخيص الرقابة الإفصاح العقوبات الغرامة المصرف التمويل "
+    "الاستثمار الأوراق المالية التأمين الحوكمة الامتثال غسل الأموال الإرهاب"
+).split()
+QUERIES = ["غسل الأموال", "الترخيص", "العقوبات الغرامة", "إفصاح", "الامتثال"]
+
+SETUP_SQL = f"""
+    DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+    CREATE SCHEMA {SCHEMA};
+    CREATE TABLE {SCHEMA}.chunks (id bigserial PRIMARY KEY, content text NOT NULL);
+    INSERT INTO {SCHEMA}.chunks (content)
+    SELECT string_agg(words[1 + floor(random() * array_length(words, 1))::int], ' ')
+    FROM generate_series(1, %(chunks)s) AS chunk(n),
+         generate_series(1, %(words)s) AS word(n),
+         (SELECT %(vocabulary)s::text[] AS words) AS vocabulary
+    GROUP BY chunk.n;
+"""
+
+INDEX_SQL = f"""
+    ALTER TABLE {SCHEMA}.chunks
+        ADD COLUMN search_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('simple', rag.normalize_arabic(content))) STORED;
+    CREATE INDEX ON {SCHEMA}.chunks USING gin (search_tsv);
+    ANALYZE {SCHEMA}.chunks;
+"""
+
+ILIKE_SQL = f"SELECT id, content FROM {SCHEMA}.chunks WHERE content ILIKE %s LIMIT 5"
+FTS_SQL = f"""
+    SELECT c.id, c.content, ts_rank(c.search_tsv, q.query) AS rank
+    FROM websearch_to_tsquery('simple', %s) AS q(query)
+    JOIN {SCHEMA}.chunks c ON c.search_tsv @@ q.query
+    ORDER BY rank DESC
+    LIMIT 5
+"""
+
+
+def time_query(cur, sql, param, repeat):
+    """Return per-run latencies in milliseconds and the last row count."""
+    latencies = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cur.execute(sql, (param,))
+        rows = len(cur.fetchall())
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies, rows
+
+
+def report(label, latencies, rows):
+    print(
+        f"  {label:<8} p50={statistics.median(latencies):9.2f} ms  "
+        f"max={max(latencies):9.2f} ms  rows={rows}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark committee RAG chunk search")
+    parser.add_argument("--dsn", default=DB_URL, help="Postgres connection string")
+    parser.add_argument("--chunks", type=int, default=1_000_000, help="Synthetic chunks to load")
+    parser.add_argument("--words", type=int, default=60, help="Words per synthetic chunk")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per query")
+    parser.add_argument("--keep", action="store_true", help=f"Keep the {SCHEMA} schema afterwards")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(args.dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            started = time.perf_counter()
+            cur.execute(SETUP_SQL, {"chunks": args.chunks, "words": args.words, "vocabulary": WORDS})
+            print(f"Loaded {args.chunks:,} chunks in {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            cur.execute(INDEX_SQL)
+            print(f"Built tsvector column + GIN index in {time.perf_counter() - started:.1f}s\n")
+
+            for query in QUERIES:
+                print(f"Query: {query}")
+                report("ILIKE", *time_query(cur, ILIKE_SQL, f"%{query}%", args.repeat))
+                report("FTS", *time_query(cur, FTS_SQL, normalize_arabic(query), args.repeat))
+    finally:
+        if not args.keep:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
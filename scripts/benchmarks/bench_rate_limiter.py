@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Rate limiter benchmark
+قياس أداء محدد معدل الرسائل
+
+Records messages for many distinct users and reports per-call latency and
+traced memory for the deque-based RateLimiter and GCRARateLimiter, next to
+the previous list-of-datetime implementation for comparison.
+
+Usage:
+    python scripts/benchmarks/bench_rate_limiter.py --users 100000 --messages 5
+"""
+
+import argparse
+import logging
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from bot.core.rate_limiter import GCRARateLimiter, RateLimiter
+
+
+class ListRateLimiter:
+    """Previous implementation: list of datetimes rebuilt on every check."""
+
+    def __init__(self, window_seconds: int = 3600, max_messages: int = 30):
+        self.window_seconds = window_seconds
+        self.max_messages = max_messages
+        self.user_logs = {}
+
+    def _clean_old_entries(self, user_id):
+        if user_id not in self.user_logs:
+            return
+        cutoff = datetime.utcnow() - timedelta(seconds=self.window_seconds)
+        self.user_logs[user_id] = [ts for ts in self.user_logs[user_id] if ts > cutoff]
+
+    def check_limit(self, user_id):
+        self._clean_old_entries(user_id)
+        self.user_logs.setdefault(user_id, [])
+        return len(self.user_logs[user_id]) < self.max_messages
+
+    def record_message(self, user_id):
+        self.user_logs.setdefault(user_id, []).append(datetime.utcnow())
+
+    def get_reset_time(self, user_id):
+        self._clean_old_entries(user_id)
+        if not self.user_logs.get(user_id):
+            return 0
+        reset_time = min(self.user_logs[user_id]) + timedelta(seconds=self.window_seconds)
+        return max(0, int((reset_time - datetime.utcnow()).total_seconds()))
+
+
+def run(limiter, users: int, messages: int) -> dict:
+    """Drive one limiter through check/record/reset calls for every user."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(messages):
+        for uid in range(users):
+            if limiter.check_limit(uid):
+                limiter.record_message(uid)
+    for uid in range(users):
+        limiter.get_reset_time(uid)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    calls = users * (messages * 2 + 1)
+    return {"seconds": elapsed, "us_per_call": elapsed / calls * 1e6, "peak_mb": peak / 1e6}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the bot rate limiter")
+    parser.add_argument("--users", type=int, default=100_000, help="Distinct user ids")
+    parser.add_argument("--messages", type=int, default=5, help="Messages recorded per user")
+    parser.add_argument("--max-messages", type=int, default=30, help="Limiter quota per window")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only benchmark the current limiter")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+
+    limiters = [
+        ("deque", RateLimiter(max_messages=args.max_messages, sweep_interval=0)),
+        ("gcra", GCRARateLimiter(max_messages=args.max_messages, sweep_interval=0)),
+    ]
+    if not args.skip_legacy:
+        limiters.append(("list", ListRateLimiter(max_messages=args.max_messages)))
+
+    print(f"users={args.users} messages/user={args.messages} quota={args.max_messages}")
+    for name, limiter in limiters:
+        result = run(limiter, args.users, args.messages)
+        print(
+            f"{name:>6}: {result['seconds']:.2f}s total, "
+            f"{result['us_per_call']:.2f}us/call, peak {result['peak_mb']:.1f} MB"
+        )
+
+    swept = RateLimiter(window_seconds=1, max_messages=args.max_messages, sweep_interval=0)
+    for uid in range(args.users):
+        swept.record_message(uid)
+    started = time.perf_counter()
+    removed = swept.sweep(now=time.time() + 2)
+    print(f" sweep: removed {removed} idle users in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
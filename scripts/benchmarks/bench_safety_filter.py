@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Safety filter benchmark
+قياس أداء فلتر الأسرار
+
+Times secret detection and masking on a 4 KB Telegram-sized message and on a
+multi-MB upload, comparing the precompiled prefix-dispatch scanner with the
+previous per-pattern ``re.search``/``re.sub`` loop.
+
+Usage:
+    python scripts/benchmarks/bench_safety_filter.py --file-mb 4
+"""
+
+import argparse
+import logging
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from bot.utils.secret_scanner import DEFAULT_RULES, get_default_scanner
+
+WORDS = (
+    "the quick brown fox jumps over api request response token session skill ghost "
+    "مرحبا بك في البوت هذا نص تجريبي للرسائل 2024 12345 config deploy error"
+).split()
+SECRETS = [
+    "sk-" + "A1b2C3d4E5" * 3,
+    "ghp_" + "x" * 36,
+    "AKIA" + "ABCDEFGHIJKLMNOP",
+    "Bearer eyJhbGciOi.eyJzdWIiOi.c2lnbmF0dXJl",
+]
+
+
+def legacy_scan_and_mask(text):
+    """Previous behaviour: one IGNORECASE search and one sub per pattern."""
+    patterns = [rule.pattern.replace("(?i:bearer)", "bearer") for rule in DEFAULT_RULES]
+    detected = [p for p in patterns if re.search(p, text, re.IGNORECASE)]
+    for pattern in patterns:
+        text = re.sub(pattern, "[SECRET_REDACTED]", text, flags=re.IGNORECASE)
+    return text, detected
+
+
+def make_text(size: int, secret_every: int) -> str:
+    """Build pseudo-random bilingual text with secrets sprinkled in."""
+    rng = random.Random(42)
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(SECRETS) if secret_every and rng.randrange(secret_every) == 0 else rng.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def timeit(func, text: str, repeat: int) -> float:
+    """Mean milliseconds per call."""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func(text)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark secret detection and masking")
+    parser.add_argument("--file-mb", type=float, default=4, help="Size of the large upload sample")
+    parser.add_argument("--repeat", type=int, default=200, help="Iterations for the 4 KB message")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    scanner = get_default_scanner()
+
+    samples = [
+        ("4KB message", make_text(4096, 0), args.repeat),
+        ("4KB w/ secrets", make_text(4096, 150), args.repeat),
+        (f"{args.file_mb:g}MB file", make_text(int(args.file_mb * 1024 * 1024), 5000), 2),
+    ]
+    for label, text, repeat in samples:
+        legacy = timeit(legacy_scan_and_mask, text, repeat)
+        current = timeit(scanner.scan_and_mask, text, repeat)
+        assert scanner.scan_and_mask(text)[0] == legacy_scan_and_mask(text)[0]
+        print(f"{label:>15}: legacy {legacy:9.2f} ms  scanner {current:9.2f} ms  ({legacy / current:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
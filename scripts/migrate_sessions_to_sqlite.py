@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Session migration tool
+نقل جلسات البوت من ملفات JSON إلى قاعدة SQLite
+
+Imports the analysis/sessions/<user_id>/<session>.json tree (including any
+pending .jsonl journals) into the SQLite session backend.
+
+Usage:
+    python scripts/migrate_sessions_to_sqlite.py --source analysis/sessions --db analysis/sessions.db
+"""
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.core.session_backends import migrate_json_to_sqlite
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Migrate JSON bot sessions to SQLite")
+    parser.add_argument("--source", default="analysis/sessions", help="Root of the JSON session tree")
+    parser.add_argument("--db", default="analysis/sessions.db", help="Target SQLite database")
+    parser.add_argument("--overwrite", action="store_true", help="Replace sessions already in the database")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.INFO)
+
+    if not Path(args.source).is_dir():
+        print(f"❌ المجلد غير موجود: {args.source}")
+        return 1
+
+    count = migrate_json_to_sqlite(args.source, args.db, overwrite=args.overwrite)
+    print(f"✅ تم نقل {count} جلسة إلى {args.db}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
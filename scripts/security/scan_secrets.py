@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Secret/PII scanner for large files
+فحص الملفات الكبيرة بحثاً عن الأسرار والبيانات الشخصية
+
+Streams files (logs, PDF-extracted text, ingestion corpora) through the bot's
+chunked scanner with bounded memory. Prints match counts per file and can
+write a redacted copy.
+
+Usage:
+    python scripts/security/scan_secrets.py logs/*.log
+    python scripts/security/scan_secrets.py data/raw/records.jsonl --redact-to data/clean/records.jsonl
+"""
+
+import argparse
+import logging
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from bot.utils.stream_scanner import get_default_stream_scanner
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Scan files for secrets and PII")
+    parser.add_argument("paths", nargs="+", help="Files to scan")
+    parser.add_argument("--redact-to", help="Write the redacted text here (single input only)")
+    args = parser.parse_args()
+
+    logging.basicConfig(format="%(asctime)s [%(levelname)s] %(message)s", level=logging.ERROR)
+    if args.redact_to and len(args.paths) != 1:
+        parser.error("--redact-to needs exactly one input file")
+
+    scanner = get_default_stream_scanner()
+    found_any = False
+    for path in args.paths:
+        counts: Counter = Counter()
+        with open(path, "rb") as src:
+            if args.redact_to:
+                with open(args.redact_to, "w", encoding="utf-8") as dst:
+                    for piece in scanner.iter_masked(src, counts):
+                        dst.write(piece)
+            else:
+                counts.update(scanner.scan(src, keep=0).counts)
+
+        found_any = found_any or bool(counts)
+        summary = ", ".join(f"{name}={count}" for name, count in counts.items()) or "clean"
+        print(f"{path}: {summary}")
+
+    return 1 if found_any else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
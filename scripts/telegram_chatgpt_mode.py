@@ -22,6 +22,7 @@ telegram_chatgpt_mode.py
 """
 
 import os
+import sys
 import json
 import logging
 import textwrap
@@ -43,6 +44,10 @@ from telegram.ext import (
 from dotenv import load_dotenv
 load_dotenv()
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bot.utils.stream_scanner import get_default_stream_scanner
+
 # ---------------------- إعداد السجل ----------------------
 logging.basicConfig(
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
@@ -494,12 +499,14 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await message.reply_text(f"❌ تعذر تنزيل الملف من تيليجرام: {e}")
         return
 
-    # قراءة المحتوى النصي إذا أمكن
+    # قراءة المحتوى النصي على دفعات مع إخفاء الأسرار والبيانات الشخصية قبل إرساله للنموذج
     suffix = local_file.suffix.lower()
     text_content = ""
     if suffix in [".txt", ".md", ".log", ".json", ".yaml", ".yml", ".py", ".ts", ".sh"]:
         try:
-            text_content = local_file.read_text(encoding="utf-8", errors="ignore")
+            with local_file.open("rb") as f:
+                scan = get_default_stream_scanner().scan(f, keep=4000)
+            text_content = scan.text
         except Exception as e:
             await message.reply_text(f"⚠️ تم تنزيل الملف، لكن تعذر قراءته كنص: {e}")
             return
@@ -511,6 +518,12 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         return
 
+    if scan.counts:
+        found = "\n".join(f"• {name}: {count}" for name, count in scan.counts.items())
+        await message.reply_text(
+            "🔒 تم إخفاء محتوى حساس من الملف قبل تحليله:\n" + found
+        )
+
     # إذا لا يوجد OpenAI: نعيد مقتطف فقط
     if not OPENAI_API_KEY:
         snippet = text_content[:1500]
@@ -0,0 +1,253 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from bot.adapters.anthropic_client import AnthropicClient, AnthropicError
+from bot.adapters.groq_client import GroqClient, GroqError
+from bot.adapters.openai_client import OpenAIClient, OpenAIError
+from bot.adapters.pacing import RateLimitPacer, parse_reset
+
+
+def openai_reply(text):
+    return {
+        "choices": [{"message": {"role": "assistant", "content": text}}],
+        "usage": {"total_tokens": 3},
+    }
+
+
+def sse_body(events):
+    return "".join(f"data: {e}\n\n" for e in events)
+
+
+def flaky_transport(responses, calls):
+    def handler(request):
+        calls.append(request)
+        return responses[min(len(calls), len(responses)) - 1]
+    return httpx.MockTransport(handler)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAsyncAdapters:
+    """Test cases for the non-blocking provider adapters"""
+
+    @pytest.mark.asyncio
+    async def test_openai_async_completion(self):
+        """OpenAI async call posts the chat payload and returns the content"""
+        seen = {}
+
+        def handler(request):
+            seen["url"] = str(request.url)
+            seen["payload"] = json.loads(request.content)
+            return httpx.Response(200, json=openai_reply("pong"))
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            client = OpenAIClient(api_key="test-key", http_client=http)
+            result = await client.achat_completion([{"role": "user", "content": "ping"}])
+
+        assert result == "pong"
+        assert seen["url"].endswith("/chat/completions")
+        assert seen["payload"]["messages"] == [{"role": "user", "content": "ping"}]
+
+    @pytest.mark.asyncio
+    async def test_anthropic_async_extracts_system_prompt(self):
+        """Anthropic async call moves the system prompt out of the messages"""
+        seen = {}
+
+        def handler(request):
+            seen["payload"] = json.loads(request.content)
+            return httpx.Response(200, json={"content": [{"type": "text", "text": "مرحبا"}]})
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            client = AnthropicClient(api_key="test-key", http_client=http)
+            result = await client.achat_completion([
+                {"role": "system", "content": "be brief"},
+                {"role": "user", "content": "hi"},
+            ])
+
+        assert result == "مرحبا"
+        assert seen["payload"]["system"] == "be brief"
+        assert seen["payload"]["messages"] == [{"role": "user", "content": "hi"}]
+
+    @pytest.mark.asyncio
+    async def test_http_error_is_mapped(self):
+        """Non-200 responses raise the provider error"""
+        transport = httpx.MockTransport(lambda request: httpx.Response(500, text="boom"))
+        async with httpx.AsyncClient(transport=transport) as http:
+            with pytest.raises(AnthropicError, match="Anthropic error 500"):
+                await AnthropicClient(api_key="k", http_client=http).achat_completion([{"role": "user", "content": "x"}])
+            with pytest.raises(OpenAIError, match="OpenAI error 500"):
+                await OpenAIClient(api_key="k", http_client=http).achat_completion([{"role": "user", "content": "x"}])
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_do_not_serialize(self):
+        """Slow upstream calls overlap instead of running one after another"""
+        async def handler(request):
+            await asyncio.sleep(0.2)
+            return httpx.Response(200, json=openai_reply("ok"))
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            client = GroqClient(api_key="k", http_client=http)
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            results = await asyncio.gather(*[
+                client.achat_completion([{"role": "user", "content": str(i)}]) for i in range(5)
+            ])
+            elapsed = loop.time() - started
+
+        assert results == ["ok"] * 5
+        assert elapsed < 0.6
+
+    @pytest.mark.asyncio
+    async def test_missing_key_raises(self, monkeypatch):
+        """Calls without an API key fail before any request"""
+        monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+        with pytest.raises(OpenAIError, match="API key not configured"):
+            await OpenAIClient(api_key="").achat_completion([{"role": "user", "content": "x"}])
+
+
+class TestStreaming:
+    """Test cases for streamed provider responses"""
+
+    @pytest.mark.asyncio
+    async def test_openai_stream_yields_deltas(self):
+        """OpenAI-style SSE chunks are yielded until [DONE]"""
+        seen = {}
+
+        def handler(request):
+            seen["payload"] = json.loads(request.content)
+            chunks = [json.dumps({"choices": [{"delta": {"content": t}}]}) for t in ("مر", "حبا")]
+            return httpx.Response(200, text=sse_body(chunks + ["[DONE]"]))
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            client = OpenAIClient(api_key="k", http_client=http)
+            parts = [p async for p in client.astream_chat_completion([{"role": "user", "content": "hi"}])]
+
+        assert parts == ["مر", "حبا"]
+        assert seen["payload"]["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_anthropic_stream_yields_text_deltas(self):
+        """Anthropic content_block_delta events are yielded as text"""
+        events = [
+            json.dumps({"type": "message_start", "message": {}}),
+            json.dumps({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "a"}}),
+            json.dumps({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "b"}}),
+            json.dumps({"type": "message_stop"}),
+        ]
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, text=sse_body(events)))
+        async with httpx.AsyncClient(transport=transport) as http:
+            client = AnthropicClient(api_key="k", http_client=http)
+            parts = [p async for p in client.astream_chat_completion([{"role": "user", "content": "hi"}])]
+
+        assert parts == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_stream_http_error_is_mapped(self):
+        """A non-200 stream response raises the provider error"""
+        transport = httpx.MockTransport(lambda request: httpx.Response(429, text="slow down"))
+        async with httpx.AsyncClient(transport=transport) as http:
+            client = GroqClient(api_key="k", http_client=http)
+            with pytest.raises(GroqError, match="429"):
+                async for _ in client.astream_chat_completion([{"role": "user", "content": "x"}]):
+                    pass
+
+
+class TestRetryAndPacing:
+    """Test cases for provider retries, backoff and rate-limit pacing"""
+
+    @pytest.mark.asyncio
+    async def test_transient_error_is_retried(self):
+        """5xx responses are retried with backoff until success"""
+        calls = []
+        transport = flaky_transport([httpx.Response(503), httpx.Response(200, json=openai_reply("ok"))], calls)
+        async with httpx.AsyncClient(transport=transport) as http:
+            client = OpenAIClient(api_key="retry-key", http_client=http, backoff_base=0.01)
+            assert await client.achat_completion([{"role": "user", "content": "x"}]) == "ok"
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_client_error_is_not_retried(self):
+        """4xx responses other than 408/429 fail immediately"""
+        calls = []
+        transport = flaky_transport([httpx.Response(400, text="bad")], calls)
+        async with httpx.AsyncClient(transport=transport) as http:
+            client = GroqClient(api_key="bad-request-key", http_client=http, backoff_base=0.01)
+            with pytest.raises(GroqError) as excinfo:
+                await client.achat_completion([{"role": "user", "content": "x"}])
+        assert excinfo.value.status_code == 400
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_retry_after_is_honored(self):
+        """A short Retry-After is waited out; a long one ends the call"""
+        calls = []
+        responses = [httpx.Response(429, headers={"retry-after": "0.05"}), httpx.Response(200, json=openai_reply("ok"))]
+        async with httpx.AsyncClient(transport=flaky_transport(responses, calls)) as http:
+            client = OpenAIClient(api_key="retry-after-key", http_client=http, backoff_base=5)
+            assert await client.achat_completion([{"role": "user", "content": "x"}]) == "ok"
+        assert len(calls) == 2
+
+        calls = []
+        responses = [httpx.Response(429, headers={"retry-after": "120"})]
+        async with httpx.AsyncClient(transport=flaky_transport(responses, calls)) as http:
+            client = OpenAIClient(api_key="long-retry-key", http_client=http, max_queue_wait=1)
+            with pytest.raises(OpenAIError) as excinfo:
+                await client.achat_completion([{"role": "user", "content": "x"}])
+        assert excinfo.value.retry_after == 120
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_retried_before_first_token(self):
+        """A failed stream is retried when nothing has been yielded yet"""
+        calls = []
+        chunk = json.dumps({"choices": [{"delta": {"content": "hi"}}]})
+        responses = [httpx.Response(502), httpx.Response(200, text=sse_body([chunk, "[DONE]"]))]
+        async with httpx.AsyncClient(transport=flaky_transport(responses, calls)) as http:
+            client = OpenAIClient(api_key="stream-retry-key", http_client=http, backoff_base=0.01)
+            parts = [p async for p in client.astream_chat_completion([{"role": "user", "content": "x"}])]
+        assert parts == ["hi"]
+        assert len(calls) == 2
+
+    def test_parse_reset_formats(self):
+        """Reset headers parse as seconds, durations and timestamps"""
+        assert parse_reset("2") == 2.0
+        assert parse_reset("6m0s") == 360.0
+        assert parse_reset("1m30.5s") == 90.5
+        assert parse_reset("250ms") == 0.25
+        assert parse_reset("1970-01-01T00:01:40Z", now=40.0) == 60.0
+        assert parse_reset("soon") is None
+
+    def test_pacer_queues_when_budget_is_exhausted(self):
+        """Requests wait for the window reset once the reported budget is used"""
+        clock = FakeClock()
+        pacer = RateLimitPacer(clock=clock)
+        pacer.update({"x-ratelimit-remaining-requests": "1", "x-ratelimit-reset-requests": "2s"}, 200)
+
+        assert pacer.reserve() == 0
+        assert pacer.reserve() == 2.0
+        clock.now += 2
+        assert pacer.reserve() == 0
+
+    def test_pacer_blocks_after_429(self):
+        """A 429 with Retry-After blocks the key until it passes"""
+        clock = FakeClock()
+        pacer = RateLimitPacer(clock=clock)
+        pacer.update({"retry-after": "3"}, 429)
+
+        assert pacer.reserve() == 3.0
+        clock.now += 3
+        assert pacer.reserve() == 0
+
+    def test_clients_share_pacer_per_key(self):
+        """Clients using the same API key share one pacer"""
+        assert OpenAIClient(api_key="shared").pacer is OpenAIClient(api_key="shared").pacer
+        assert OpenAIClient(api_key="shared").pacer is not OpenAIClient(api_key="other").pacer
@@ -0,0 +1,118 @@
+import committee_service
+from app.rag.chunker import Chunker, chunk_text
+
+
+def char_tokens(text):
+    return len(text)
+
+
+def word_tokens(text):
+    return len(text.split())
+
+
+class FakeCursor:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def fetchone(self):
+        return (7,)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.cursor_obj = FakeCursor()
+        self.commits = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        self.cursor_obj.execute(sql, params)
+
+    def fetchone(self):
+        return self.cursor_obj.fetchone()
+
+    def commit(self):
+        self.commits += 1
+
+
+class TestChunker:
+    """Test cases for boundary-aware chunking"""
+
+    def test_short_paragraphs_are_packed_together(self):
+        """Paragraphs that fit the budget share a chunk"""
+        chunks = Chunker(max_tokens=100, overlap_tokens=0, count_tokens=char_tokens).split("أولى.\n\nثانية.")
+        assert [c.content for c in chunks] == ["أولى.\n\nثانية."]
+
+    def test_long_paragraph_splits_on_sentences(self):
+        """Oversized paragraphs are cut at sentence ends, never mid-word"""
+        text = "المادة الأولى تنص على الحكم. المادة الثانية تنص على الاستثناء؟ المادة الثالثة للنفاذ."
+        chunks = Chunker(max_tokens=40, overlap_tokens=0, count_tokens=char_tokens).split(text)
+
+        assert [c.content for c in chunks] == [
+            "المادة الأولى تنص على الحكم.",
+            "المادة الثانية تنص على الاستثناء؟",
+            "المادة الثالثة للنفاذ.",
+        ]
+        words = set(text.split())
+        assert all(word in words for c in chunks for word in c.content.split())
+
+    def test_overlong_sentence_splits_on_words(self):
+        """A sentence longer than the budget falls back to word boundaries"""
+        chunks = Chunker(max_tokens=2, overlap_tokens=0, count_tokens=word_tokens).split("كلمة " * 6)
+        assert [c.content for c in chunks] == ["كلمة كلمة", "كلمة كلمة", "كلمة كلمة"]
+
+    def test_overlap_repeats_trailing_sentences(self):
+        """The next chunk starts with the previous chunk's last sentence"""
+        text = "أ أ أ. ب ب ب. ج ج ج. د د د."
+        chunks = Chunker(max_tokens=14, overlap_tokens=6, count_tokens=char_tokens).split(text)
+        assert [c.content for c in chunks] == ["أ أ أ. ب ب ب.", "ب ب ب. ج ج ج.", "ج ج ج. د د د."]
+        assert [c.chunk_no for c in chunks] == [0, 1, 2]
+
+    def test_invalid_overlap_is_rejected(self):
+        """Overlap must be smaller than the chunk size"""
+        try:
+            Chunker(max_tokens=10, overlap_tokens=10)
+        except ValueError:
+            return
+        raise AssertionError("expected ValueError")
+
+    def test_default_chunker_uses_token_estimate(self):
+        """chunk_text bounds chunks by the estimated token count"""
+        chunks = chunk_text("جملة قصيرة. " * 200, max_tokens=64, overlap_tokens=8)
+        assert len(chunks) > 1
+        assert all(c.tokens <= 64 for c in chunks)
+
+
+class TestCommitteeIngest:
+    """Test cases for batched chunk inserts in committee_service"""
+
+    def test_chunks_are_inserted_in_one_statement(self, monkeypatch):
+        """All chunks of a document go through a single execute_values call"""
+        conn = FakeConnection()
+        calls = []
+        monkeypatch.setattr(committee_service, "db_conn", lambda: conn)
+        monkeypatch.setattr(
+            committee_service,
+            "execute_values",
+            lambda cur, sql, rows, page_size: calls.append((sql, rows, page_size)),
+        )
+
+        doc_id = committee_service.ingest_committee_document("قرار", "فقرة أولى.\n\n" * 300)
+
+        assert doc_id == 7
+        assert len(calls) == 1
+        sql, rows, page_size = calls[0]
+        assert "VALUES %s" in sql
+        assert page_size == len(rows) > 1
+        assert [row[1] for row in rows] == list(range(len(rows)))
+        assert conn.commits == 1
@@ -0,0 +1,90 @@
+from bot.adapters.anthropic_client import AnthropicClient
+from bot.core.context_builder import ContextBuilder, estimate_tokens
+from bot.core.model_registry import ModelRegistry
+from bot.core.session_store import SessionStore
+
+
+def turn(role, content, tokens=None):
+    message = {"role": role, "content": content}
+    if tokens is not None:
+        message["tokens"] = tokens
+    return message
+
+
+class TestContextBuilder:
+    """Test cases for token-budgeted history packing"""
+
+    def test_estimate_tokens_weighs_arabic_denser(self):
+        """Non-ASCII text counts more tokens per character"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("a" * 40) == 10
+        assert estimate_tokens("م" * 40) == 20
+
+    def test_budget_reserves_max_tokens_per_model(self):
+        """The budget is the model window minus the completion reserve"""
+        builder = ContextBuilder(ModelRegistry(), safety_margin=0)
+
+        assert builder.get_budget("mixtral-8x7b-32768", 1000) == 31768
+        assert builder.get_budget("claude-3-haiku-20240307", 1000) == 199000
+        assert builder.get_budget("unknown-model", 1000) == 7192
+        assert ContextBuilder(ModelRegistry(), max_context_tokens=500).get_budget("gpt-4o", 1000) == 500
+
+    def test_packs_newest_turns_and_starts_with_user(self):
+        """Older turns are dropped and the window never opens with an assistant turn"""
+        history = [
+            turn("user", "q1", 100),
+            turn("assistant", "a1", 100),
+            turn("user", "q2", 100),
+            turn("assistant", "a2", 100),
+            turn("user", "q3", 100),
+        ]
+        builder = ContextBuilder(max_context_tokens=330, safety_margin=0)
+
+        messages, stats = builder.build(history, "gpt-4o", max_tokens=0, system_prompt="sys")
+
+        assert [m["content"] for m in messages] == ["sys", "q2", "a2", "q3"]
+        assert stats.kept == 3 and stats.dropped == 2
+        assert stats.used <= stats.budget
+
+    def test_newest_turn_always_kept(self):
+        """A single oversized turn is still sent"""
+        messages, stats = ContextBuilder(max_context_tokens=10).build(
+            [turn("user", "x" * 400)], "gpt-4o", max_tokens=0
+        )
+        assert messages == [{"role": "user", "content": "x" * 400}]
+        assert stats.kept == 1
+
+    def test_anthropic_payload_keeps_persona_and_summary(self):
+        """Both system messages reach Anthropic's single system field"""
+        messages, _ = ContextBuilder().build(
+            [turn("user", "q")], "claude-3-haiku-20240307", max_tokens=100,
+            system_prompt="persona prompt", summary="earlier turns"
+        )
+        payload = AnthropicClient(api_key="k")._build_payload(messages, "claude-3-haiku-20240307", 0.7, 100)
+
+        assert payload["system"].startswith("persona prompt\n\n")
+        assert "earlier turns" in payload["system"]
+        assert payload["messages"] == [{"role": "user", "content": "q"}]
+
+    def test_session_store_caches_token_counts(self, tmp_path):
+        """Stored messages carry their estimated token count"""
+        store = SessionStore(base_path=str(tmp_path))
+        store.append_message(1, "default", "user", "hello world, this is a test")
+
+        history = store.get_history(1, "default")
+        assert history[0]["tokens"] == estimate_tokens("hello world, this is a test")
+        assert store.get_messages(1, "default") == [
+            {"role": "user", "content": "hello world, this is a test"}
+        ]
+
+    def test_save_session_refreshes_edited_token_counts(self, tmp_path):
+        """Editing a message's content and saving updates its cached count"""
+        store = SessionStore(base_path=str(tmp_path), cache_size=4, flush_interval=0)
+        store.append_message(1, "default", "assistant", "short")
+
+        session_data = store.get_session(1, "default")
+        session_data["messages"][-1]["content"] += "\n\n" + "continued " * 50
+        store.save_session(1, "default", session_data)
+
+        history = store.get_history(1, "default")
+        assert history[0]["tokens"] == estimate_tokens(history[0]["content"])
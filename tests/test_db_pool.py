@@ -0,0 +1,143 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.rag.db import DatabasePool, PoolTimeout
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise RuntimeError("server closed the connection")
+        self.conn.queries.append(sql)
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = 0
+        self.broken = False
+        self.queries = []
+        self.rollbacks = 0
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class Connector:
+    def __init__(self):
+        self.made = []
+
+    def __call__(self):
+        conn = FakeConnection(len(self.made))
+        self.made.append(conn)
+        return conn
+
+
+class TestDatabasePool:
+    """Test cases for the pooled committee_service database layer"""
+
+    def test_connections_are_reused(self):
+        """Sequential checkouts reuse one connection instead of reconnecting"""
+        connector = Connector()
+        pool = DatabasePool(minconn=1, maxconn=2, connect=connector).open()
+
+        for _ in range(3):
+            with pool.connection() as conn:
+                assert conn is connector.made[0]
+
+        stats = pool.get_stats()
+        assert stats["created"] == 1
+        assert stats["checkouts"] == 3
+        assert stats["in_use"] == 0
+
+    def test_returned_connections_are_rolled_back(self):
+        """Open transactions never leak to the next user, even on errors"""
+        pool = DatabasePool(minconn=0, maxconn=1, connect=Connector())
+        with pytest.raises(ValueError):
+            with pool.connection() as conn:
+                raise ValueError("query failed")
+        assert (conn.commits, conn.rollbacks) == (0, 1)
+        assert pool.get_stats()["idle"] == 1
+
+    def test_clean_exit_commits(self):
+        """A block that exits normally commits, like psycopg2's ``with conn``"""
+        pool = DatabasePool(minconn=0, maxconn=1, connect=Connector())
+        with pool.connection() as conn:
+            conn.cursor().execute("INSERT INTO t VALUES (1)")
+        assert conn.commits == 1
+
+    def test_idle_connection_is_health_checked(self):
+        """A connection idle past the threshold is pinged and replaced if dead"""
+        clock = FakeClock()
+        connector = Connector()
+        pool = DatabasePool(minconn=1, maxconn=1, check_idle_after=30, connect=connector, clock=clock).open()
+
+        clock.now = 10
+        with pool.connection() as conn:
+            assert conn.queries == []
+
+        connector.made[0].broken = True
+        clock.now = 100
+        with pool.connection() as conn:
+            assert conn is connector.made[1]
+
+        stats = pool.get_stats()
+        assert stats["health_failures"] == 1
+        assert stats["size"] == 1
+        assert connector.made[0].closed
+
+    def test_checkout_times_out_when_exhausted(self):
+        """Checkouts beyond maxconn wait, then raise PoolTimeout"""
+        pool = DatabasePool(minconn=0, maxconn=1, timeout=0.05, connect=Connector())
+        held = pool.getconn()
+        with pytest.raises(PoolTimeout):
+            pool.getconn()
+        assert pool.get_stats()["timeouts"] == 1
+
+        released = threading.Timer(0.05, pool.putconn, args=(held,))
+        released.start()
+        pool.timeout = 2
+        assert pool.getconn() is held
+
+    @pytest.mark.asyncio
+    async def test_async_run_uses_a_worker_thread(self):
+        """run() executes the function with a pooled connection off the loop"""
+        pool = DatabasePool(minconn=0, maxconn=2, connect=Connector())
+        loop_thread = threading.get_ident()
+
+        def work(conn, value):
+            return conn.number, value, threading.get_ident() != loop_thread
+
+        results = await asyncio.gather(pool.run(work, "a"), pool.run(work, "b"))
+        assert [r[1] for r in results] == ["a", "b"]
+        assert all(r[2] for r in results)
+        assert pool.get_stats()["in_use"] == 0
@@ -175,6 +175,33 @@ class TestGPTEndpoint:
         assert response.status_code == 500
         assert response.json()["detail"] == "API Error"
 
+    @pytest.mark.asyncio
+    @patch('api_server.gpt_client')
+    async def test_gpt_endpoint_coalesces_only_cacheable(self, mock_client):
+        """Concurrent identical prompts share a call only when they are cacheable"""
+        import asyncio
+        from api_server import gpt_endpoint
+
+        mock_client.is_available.return_value = True
+        calls = []
+
+        async def mock_generate_response(request):
+            calls.append(request.prompt)
+            number = len(calls)
+            await asyncio.sleep(0.05)
+            return GPTResponse(response=f"answer {number}", usage={}, model=request.model)
+        mock_client.generate_response = mock_generate_response
+
+        sampled = GPTRequest(prompt="coalesce sampled", temperature=0.2, cache=False)
+        answers = await asyncio.gather(gpt_endpoint(sampled), gpt_endpoint(sampled))
+        assert len(calls) == 2
+        assert answers[0].response != answers[1].response
+
+        cacheable = GPTRequest(prompt="coalesce cacheable", temperature=0.0)
+        answers = await asyncio.gather(gpt_endpoint(cacheable), gpt_endpoint(cacheable))
+        assert len(calls) == 3
+        assert answers[0].response == answers[1].response
+
 
 def test_health_check():
     """Test that health check endpoint still works"""
@@ -0,0 +1,241 @@
+import json
+import os
+import threading
+import time
+
+from app.ingestion.base import BaseIngestor
+
+
+class SleepyIngestor(BaseIngestor):
+    """Two-phase ingestor whose fetch latency varies per item."""
+
+    name = "sleepy"
+
+    def __init__(self, count=8, delay=0.05, fail=()):
+        self.count = count
+        self.delay = delay
+        self.fail = set(fail)
+        self.sessions = set()
+
+    def discover(self):
+        return [{"title": f"doc {i}", "url": f"https://example.test/{i}.pdf", "i": i} for i in range(self.count)]
+
+    def fetch(self, item):
+        self.sessions.add((threading.get_ident(), id(self.session)))
+        # Later items finish first to prove results are reordered
+        time.sleep(self.delay * (self.count - item["i"]) / self.count)
+        if item["i"] in self.fail:
+            raise RuntimeError(f"download failed for {item['i']}")
+        return {"size": item["i"] * 10}
+
+    def parse(self, item, fetched):
+        return {"doc_id": item["i"], "size": fetched["size"], "pid": os.getpid()}
+
+
+class LegacyIngestor(BaseIngestor):
+    """Single-step ingestor implementing only fetch_and_parse."""
+
+    name = "legacy"
+
+    def discover(self):
+        return [{"url": str(i)} for i in range(4)]
+
+    def fetch_and_parse(self, item):
+        return {"doc_id": item["url"]}
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=b"", headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class FakeServer:
+    """Serves one PDF with an ETag and honors If-None-Match."""
+
+    def __init__(self, body=b"%PDF v1", etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        self.requests.append(dict(headers or {}))
+        if self.etag and (headers or {}).get("If-None-Match") == self.etag:
+            return FakeResponse(304)
+        response_headers = {"Content-Type": "application/pdf"}
+        if self.etag:
+            response_headers["ETag"] = self.etag
+        return FakeResponse(200, self.body, response_headers)
+
+
+class TestConcurrentIngestion:
+    """Test cases for the BaseIngestor worker pipeline"""
+
+    def test_serial_run_is_default(self):
+        """Without workers the pipeline runs items one by one"""
+        records = SleepyIngestor(count=3, delay=0).run()
+        assert [r["doc_id"] for r in records] == [0, 1, 2]
+
+    def test_concurrent_run_keeps_order(self):
+        """Concurrent fetches return records in discovery order"""
+        records = SleepyIngestor().run(workers=4)
+        assert [r["doc_id"] for r in records] == list(range(8))
+
+    def test_concurrent_run_is_faster(self):
+        """Overlapping fetches beat the serial wall time"""
+        started = time.monotonic()
+        SleepyIngestor(count=8, delay=0.2).run(workers=8)
+        assert time.monotonic() - started < 0.5
+
+    def test_errors_are_captured_per_item(self):
+        """A failing item is recorded without stopping the others"""
+        ingestor = SleepyIngestor(fail={2, 5})
+        records = ingestor.run(workers=3)
+
+        assert [r["doc_id"] for r in records] == [0, 1, 3, 4, 6, 7]
+        assert [e["url"] for e in ingestor.errors] == [
+            "https://example.test/2.pdf",
+            "https://example.test/5.pdf",
+        ]
+        assert "download failed for 2" in ingestor.errors[0]["error"]
+
+    def test_sessions_are_per_thread(self):
+        """Each worker thread reuses its own HTTP session"""
+        ingestor = SleepyIngestor(count=12, delay=0.02)
+        ingestor.run(workers=3)
+
+        threads = {thread for thread, _ in ingestor.sessions}
+        sessions = {session for _, session in ingestor.sessions}
+        assert len(threads) <= 3
+        assert len(sessions) == len(threads)
+
+    def test_parse_runs_on_process_pool(self):
+        """CPU-bound parse runs in worker processes"""
+        records = SleepyIngestor(count=4, delay=0).run(workers=2, processes=2)
+
+        assert [r["doc_id"] for r in records] == [0, 1, 2, 3]
+        assert all(r["pid"] != os.getpid() for r in records)
+
+    def test_legacy_fetch_and_parse_still_works(self):
+        """Sources implementing only fetch_and_parse run concurrently too"""
+        records = LegacyIngestor().run(workers=2)
+        assert [r["doc_id"] for r in records] == ["0", "1", "2", "3"]
+
+
+class TestIncrementalSama:
+    """Test cases for manifest-driven incremental SAMA ingestion"""
+
+    ITEMS = [{"title": "تعميم 1", "url": "https://example.test/c1.pdf"}]
+
+    def make_ingestor(self, tmp_path, monkeypatch, server):
+        from app.ingestion.sources import sama
+
+        monkeypatch.setattr(sama, "OUT_DIR", str(tmp_path))
+        monkeypatch.setattr(sama, "pdf_to_text", lambda path, **kwargs: open(path, "rb").read().decode())
+        ingestor = sama.SamaIngestor(manifest_path=str(tmp_path / "manifest.json"))
+        monkeypatch.setattr(ingestor, "discover", lambda: list(self.ITEMS))
+        ingestor.__dict__["_local"] = threading.local()
+        ingestor._local.session = server
+        return ingestor
+
+    def test_unchanged_document_is_skipped_with_conditional_get(self, tmp_path, monkeypatch):
+        """The second run sends If-None-Match and emits nothing on 304"""
+        server = FakeServer()
+        assert len(self.make_ingestor(tmp_path, monkeypatch, server).run()) == 1
+
+        ingestor = self.make_ingestor(tmp_path, monkeypatch, server)
+        assert ingestor.run() == []
+        assert ingestor.skipped == 1
+        assert server.requests[-1]["If-None-Match"] == '"v1"'
+
+    def test_changed_document_is_re_emitted(self, tmp_path, monkeypatch):
+        """A new version is downloaded, parsed and recorded in the manifest"""
+        server = FakeServer()
+        self.make_ingestor(tmp_path, monkeypatch, server).run()
+
+        server.body, server.etag = b"%PDF v2", '"v2"'
+        ingestor = self.make_ingestor(tmp_path, monkeypatch, server)
+        records = ingestor.run()
+
+        assert [r["content"] for r in records] == ["%PDF v2"]
+        entry = ingestor.manifest.get(records[0]["doc_id"])
+        assert entry["etag"] == '"v2"'
+        assert entry["text_sha1"] == records[0]["text_sha1"]
+
+    def test_same_bytes_without_validators_are_skipped(self, tmp_path, monkeypatch):
+        """Servers without ETag/Last-Modified fall back to the PDF digest"""
+        server = FakeServer(etag=None)
+        self.make_ingestor(tmp_path, monkeypatch, server).run()
+
+        ingestor = self.make_ingestor(tmp_path, monkeypatch, server)
+        assert ingestor.run() == []
+        assert ingestor.skipped == 1
+
+    def test_manifest_is_saved_only_at_checkpoint(self, tmp_path, monkeypatch):
+        """Draining iter_records leaves the manifest unwritten until checkpoint"""
+        ingestor = self.make_ingestor(tmp_path, monkeypatch, FakeServer())
+        assert len(list(ingestor.iter_records())) == 1
+        assert not (tmp_path / "manifest.json").exists()
+
+        ingestor.checkpoint()
+        assert (tmp_path / "manifest.json").exists()
+
+
+class TestStreamingIngestion:
+    """Test cases for streaming records into the JSONL index"""
+
+    def test_iter_records_is_lazy(self):
+        """Records are produced one at a time rather than collected up front"""
+        records = SleepyIngestor(count=4, delay=0).iter_records()
+        assert next(records)["doc_id"] == 0
+        assert [r["doc_id"] for r in records] == [1, 2, 3]
+
+    def test_run_ingestion_streams_to_jsonl(self, tmp_path, monkeypatch):
+        """run_ingestion appends each record and returns a cursor, not records"""
+        from app.ingestion import cli
+
+        ingestor = SleepyIngestor(count=5, delay=0, fail=(2,))
+        monkeypatch.setattr(cli, "get_ingestor", lambda source: ingestor)
+        monkeypatch.setattr(cli, "FSYNC_EVERY", 2)
+        index = tmp_path / "index.jsonl"
+        index.write_text('{"doc_id": "old"}\n', encoding="utf-8")
+        progress = []
+
+        result = cli.run_ingestion("sleepy", index_jsonl=str(index), on_progress=progress.append)
+
+        lines = index.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["doc_id"] for line in lines] == ["old", 0, 1, 3, 4]
+        assert "records" not in result
+        assert result["count"] == 4
+        assert len(result["errors"]) == 1
+        cursor = result["cursor"]
+        assert cursor["processed"] == cursor["total"] == 5
+        assert (cursor["parsed"], cursor["failed"]) == (4, 1)
+        assert cursor["last_doc_id"] == 4
+        assert cursor["start_offset"] == len('{"doc_id": "old"}\n')
+        assert cursor["end_offset"] == index.stat().st_size
+        assert [p["processed"] for p in progress] == [1, 2, 3, 4, 5, 5]
+
+    def test_search_index_update_is_opt_in(self, tmp_path, monkeypatch):
+        """The JSONL search index is only updated when asked for"""
+        from app.ingestion import cli
+
+        monkeypatch.setattr(cli, "get_ingestor", lambda source: SleepyIngestor(count=2, delay=0))
+        index = tmp_path / "index.jsonl"
+
+        assert cli.run_ingestion("sleepy", index_jsonl=str(index))["search_indexed"] is None
+        assert not (tmp_path / "index.jsonl.idx").exists()
+        assert cli.run_ingestion("sleepy", index_jsonl=str(index), update_index=True)["search_indexed"] == 4
+
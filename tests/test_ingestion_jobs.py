@@ -0,0 +1,134 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import api_server
+from app.ingestion.jobs import JobManager
+
+
+class GatedRunner:
+    """Fake run_ingestion that reports progress and waits for a release."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.release = threading.Event()
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, source, on_progress=None, **params):
+        with self.lock:
+            self.calls.append((source, params))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            on_progress({"total": 3, "processed": 1, "fetched": 1, "parsed": 1, "skipped": 0, "failed": 0})
+            self.release.wait(5)
+            if self.fail:
+                raise RuntimeError("crawl failed")
+            return {"source": source, "count": 3, "skipped": 0, "errors": []}
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestJobManager:
+    """Test cases for background ingestion jobs"""
+
+    def test_job_reports_progress_and_result(self):
+        """A running job exposes progress and finishes with the run summary"""
+        runner = GatedRunner()
+        manager = JobManager(max_workers=2, runner=runner)
+        job = manager.submit("sama", limit=3)
+
+        assert wait_for(lambda: job.progress.get("processed") == 1)
+        report = job.to_dict()
+        assert report["status"] == "running"
+        assert report["progress"]["discovered"] == 3
+
+        runner.release.set()
+        assert wait_for(lambda: job.done)
+        report = job.to_dict()
+        assert report["status"] == "succeeded"
+        assert report["result"]["count"] == 3
+        assert report["items_per_second"] is not None
+        assert runner.calls == [("sama", {"limit": 3})]
+        manager.shutdown()
+
+    def test_per_source_limit_queues_jobs(self):
+        """Jobs beyond the per-source limit wait while other sources run"""
+        runner = GatedRunner()
+        manager = JobManager(max_workers=4, per_source=1, runner=runner)
+        first = manager.submit("sama")
+        second = manager.submit("sama")
+        other = manager.submit("cma")
+
+        assert wait_for(lambda: first.status == "running" and other.status == "running")
+        assert second.status == "queued"
+
+        runner.release.set()
+        assert wait_for(lambda: second.done)
+        assert runner.max_active == 2
+        manager.shutdown()
+
+    def test_failure_is_reported_on_the_job(self):
+        """Exceptions from the run mark the job failed instead of propagating"""
+        runner = GatedRunner(fail=True)
+        runner.release.set()
+        manager = JobManager(runner=runner)
+        job = manager.submit("sama")
+
+        assert wait_for(lambda: job.done)
+        assert job.status == "failed"
+        assert "crawl failed" in job.error
+        manager.shutdown()
+
+    def test_old_finished_jobs_are_pruned(self):
+        """Only the newest finished jobs are kept"""
+        runner = GatedRunner()
+        runner.release.set()
+        manager = JobManager(runner=runner, keep=2)
+        jobs = [manager.submit("sama") for _ in range(4)]
+
+        assert wait_for(lambda: all(job.done for job in jobs))
+        manager.shutdown()
+        assert manager.get(jobs[0].id) is None
+        assert manager.get(jobs[-1].id) is not None
+
+
+class TestJobEndpoints:
+    """Test cases for the sync and job status endpoints"""
+
+    def test_sync_returns_job_id_immediately(self, monkeypatch):
+        """POST sync answers 202 while the job is still running"""
+        runner = GatedRunner()
+        monkeypatch.setattr(api_server, "ingestion_jobs", JobManager(runner=runner))
+        client = TestClient(api_server.app)
+
+        response = client.post("/v1/sources/SAMA/sync?limit=2")
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+
+        status = client.get(f"/v1/jobs/{job_id}").json()
+        assert status["source"] == "sama"
+        assert status["status"] in ("queued", "running")
+
+        runner.release.set()
+        assert wait_for(lambda: client.get(f"/v1/jobs/{job_id}").json()["status"] == "succeeded")
+
+    def test_unknown_source_and_job_are_404(self):
+        """Unknown sources and job ids are rejected"""
+        client = TestClient(api_server.app)
+        assert client.post("/v1/sources/nope/sync").status_code == 404
+        assert client.get("/v1/jobs/missing").status_code == 404
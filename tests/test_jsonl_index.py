@@ -0,0 +1,103 @@
+import json
+import mmap
+
+from app.rag import jsonl_index
+from app.rag.jsonl_index import JsonlIndex
+
+
+def append_records(path, records):
+    with open(path, "a", encoding="utf-8") as handle:
+        for record in records:
+            handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+CIRCULARS = [
+    {"doc_id": "a", "title": "تعميم مكافحة غسل الأموال", "content": "تلتزم البنوك بالإبلاغ عن العمليات المشبوهة."},
+    {"doc_id": "b", "title": "تعميم الترخيص", "content": "شروط ترخيص شركات التمويل الأصغر."},
+    {"doc_id": "c", "title": "تعميم الإفصاح", "content": "الإفصاح عن العمليات المشبوهة والقوائم المالية."},
+]
+
+
+class TestJsonlIndex:
+    """Test cases for the mmap'd inverted index over ingestion JSONL"""
+
+    def test_search_reads_matching_records_by_offset(self, tmp_path):
+        """Queries return only records containing every normalized term"""
+        path = tmp_path / "circulars.jsonl"
+        append_records(path, CIRCULARS)
+        index = JsonlIndex(str(path))
+        assert index.update() == 3
+
+        hits = index.search("العمليات المشبوهة")
+        assert sorted(h["doc_id"] for h in hits) == ["a", "c"]
+        assert index.search("الاموال")[0]["doc_id"] == "a"
+        assert index.search("ترخيص الافصاح") == []
+        assert sorted(h["doc_id"] for h in index.search("ترخيص الافصاح", match_all=False)) == ["b", "c"]
+        assert index.search("غير موجود") == []
+
+    def test_files_are_memory_mapped(self, tmp_path):
+        """The doc table, postings and JSONL are opened with mmap"""
+        path = tmp_path / "circulars.jsonl"
+        append_records(path, CIRCULARS)
+        index = JsonlIndex(str(path))
+        index.update()
+        assert isinstance(index._docs, mmap.mmap)
+        assert isinstance(index._jsonl, mmap.mmap)
+        assert all(isinstance(s._post, mmap.mmap) for s in index._segments)
+
+    def test_incremental_update_adds_a_segment(self, tmp_path):
+        """Appended records are indexed without re-reading older ones"""
+        path = tmp_path / "circulars.jsonl"
+        append_records(path, CIRCULARS[:2])
+        JsonlIndex(str(path)).update()
+
+        append_records(path, CIRCULARS[2:])
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write('{"doc_id": "partial"')  # still being written
+        index = JsonlIndex(str(path))
+        assert index.update() == 1
+        assert len(index) == 3
+        assert len(index.manifest["segments"]) == 2
+        assert index.update() == 0
+
+        reopened = JsonlIndex(str(path))
+        assert sorted(h["doc_id"] for h in reopened.search("المشبوهة")) == ["a", "c"]
+
+    def test_truncated_jsonl_is_rebuilt(self, tmp_path):
+        """A JSONL shorter than the indexed size is re-indexed from scratch"""
+        path = tmp_path / "circulars.jsonl"
+        append_records(path, CIRCULARS)
+        JsonlIndex(str(path)).update()
+
+        path.write_text("", encoding="utf-8")
+        append_records(path, CIRCULARS[1:2])
+        index = JsonlIndex(str(path))
+        assert len(index) == 0
+        assert index.update() == 1
+        assert [h["doc_id"] for h in index.search("ترخيص")] == ["b"]
+        assert index.search("المشبوهة") == []
+
+    def test_newer_version_of_a_document_wins(self, tmp_path):
+        """Only the latest record of a re-ingested doc_id is returned"""
+        path = tmp_path / "circulars.jsonl"
+        append_records(path, CIRCULARS)
+        append_records(path, [{"doc_id": "a", "title": "تعميم محدث", "content": "العمليات المشبوهة بعد التعديل"}])
+        index = JsonlIndex(str(path))
+        index.update()
+
+        hits = index.search("المشبوهة")
+        assert sorted((h["doc_id"], h["title"]) for h in hits) == [("a", "تعميم محدث"), ("c", "تعميم الإفصاح")]
+        assert index.search("البنوك") == []
+
+    def test_segments_are_compacted(self, tmp_path, monkeypatch):
+        """Too many segments are merged into one without losing postings"""
+        monkeypatch.setattr(jsonl_index, "MAX_SEGMENTS", 2)
+        path = tmp_path / "circulars.jsonl"
+        index = JsonlIndex(str(path))
+        for record in CIRCULARS:
+            append_records(path, [record])
+            index.update()
+
+        assert len(index.manifest["segments"]) == 1
+        assert len(list(tmp_path.joinpath("circulars.jsonl.idx").glob("seg-*.dict"))) == 1
+        assert sorted(h["doc_id"] for h in index.search("تعميم")) == ["a", "b", "c"]
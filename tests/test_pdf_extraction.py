@@ -0,0 +1,81 @@
+import pytest
+
+from app.ingestion import pdf
+from app.ingestion.pdf import TextCache, extract_text, join_pages, normalize_page, page_ranges
+
+
+class FakePdf:
+    """Patches page_count/extract_range with in-memory pages."""
+
+    def __init__(self, monkeypatch, pages):
+        self.pages = pages
+        self.calls = []
+        monkeypatch.setattr(pdf, "page_count", lambda path: len(self.pages))
+        monkeypatch.setattr(pdf, "extract_range", self.extract_range)
+
+    def extract_range(self, path, start, end):
+        self.calls.append((start, end))
+        return [normalize_page(page) for page in self.pages[start:end]]
+
+
+class TestPdfExtraction:
+    """Test cases for page-level PDF extraction and the text cache"""
+
+    def test_normalization_matches_whole_document_passes(self):
+        """Per-page normalization plus the join equals the old joined passes"""
+        pages = ["  عنوان\r\nسطر\t\tأول\n\n\n", "\n\nالصفحة  الثانية\r"]
+        assert join_pages([normalize_page(p) for p in pages]) == "عنوان\nسطر أول\n\nالصفحة الثانية"
+
+    def test_page_ranges_cover_all_pages(self):
+        """Ranges are contiguous, balanced and never exceed the page count"""
+        assert page_ranges(10, 3) == [(0, 4), (4, 7), (7, 10)]
+        assert page_ranges(2, 4) == [(0, 1), (1, 2)]
+
+    def test_cache_hit_skips_extraction(self, tmp_path, monkeypatch):
+        """A PDF with a known sha1 is extracted only once"""
+        fake = FakePdf(monkeypatch, ["page one", "page two"])
+        cache = TextCache(str(tmp_path))
+
+        first = extract_text("a.pdf", pdf_sha1="abc123", processes=1, cache=cache)
+        second = extract_text("copy.pdf", pdf_sha1="abc123", processes=1, cache=cache)
+
+        assert first == second == "page one\npage two"
+        assert fake.calls == [(0, 2)]
+        assert cache.path("abc123").startswith(str(tmp_path / "ab"))
+
+    def test_without_sha1_nothing_is_cached(self, tmp_path, monkeypatch):
+        """Extraction without a digest bypasses the cache"""
+        fake = FakePdf(monkeypatch, ["x"])
+        extract_text("a.pdf", processes=1, cache=TextCache(str(tmp_path)))
+        extract_text("a.pdf", processes=1, cache=TextCache(str(tmp_path)))
+        assert len(fake.calls) == 2
+        assert not any(tmp_path.iterdir())
+
+    def test_parse_worker_extracts_in_process(self, monkeypatch):
+        """Inside a child process no nested extraction pool is started"""
+        fake = FakePdf(monkeypatch, ["p"] * 100)
+        monkeypatch.setattr(pdf.multiprocessing, "parent_process", lambda: object())
+        monkeypatch.setattr(pdf, "_get_pool", lambda processes: pytest.fail("pool started"))
+        assert extract_text("a.pdf", processes=4) == "\n".join(["p"] * 100)
+        assert fake.calls == [(0, 100)]
+
+    def test_pool_follows_requested_processes(self, monkeypatch):
+        """A different process count replaces the shared pool"""
+        created = []
+
+        class FakeExecutor:
+            def __init__(self, processes, mp_context=None):
+                self.processes = processes
+                self.shut_down = False
+                created.append(self)
+
+            def shutdown(self, wait=True):
+                self.shut_down = True
+
+        monkeypatch.setattr(pdf, "ProcessPoolExecutor", FakeExecutor)
+        monkeypatch.setattr(pdf, "_pool", None)
+        assert pdf._get_pool(2) is pdf._get_pool(2)
+        assert pdf._get_pool(3).processes == 3
+        assert [e.processes for e in created] == [2, 3]
+        assert created[0].shut_down
+
@@ -0,0 +1,224 @@
+import asyncio
+
+import pytest
+
+from bot.adapters.openai_client import OpenAIClient, OpenAIError
+from bot.core.model_registry import ModelRegistry
+from bot.core.provider_router import ProviderRouter, ProviderUnavailableError, is_failover_error
+
+
+class FakeError(Exception):
+    def __init__(self, status_code=None):
+        super().__init__(f"error {status_code}")
+        self.status_code = status_code
+
+
+class FakeClient:
+    def __init__(self, name, delay=0.0, error=None, available=True):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.available = available
+        self.calls = 0
+        self.cancelled = 0
+
+    def is_available(self):
+        return self.available
+
+    async def achat_completion(self, messages, model, temperature, max_tokens):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return f"{self.name}:{model}"
+
+    async def astream_chat_completion(self, messages, model, temperature, max_tokens):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        for part in ("he", "llo"):
+            yield part
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def make_router(**clients):
+    return ProviderRouter(clients, model_registry=ModelRegistry(), min_samples=3)
+
+
+class TestProviderRouter:
+    """Test cases for provider failover and hedging"""
+
+    def test_failover_error_classification(self):
+        """Timeouts, connection errors and 5xx/429 fail over; other 4xx do not"""
+        assert is_failover_error(asyncio.TimeoutError())
+        assert is_failover_error(OpenAIError("timeout", timeout=True))
+        assert is_failover_error(OpenAIError("connection reset", transient=True))
+        assert is_failover_error(ConnectionResetError())
+        assert not is_failover_error(FakeError(None))
+        assert not is_failover_error(ValueError("bad json"))
+        assert not is_failover_error(OpenAIError("OPENAI_API_KEY not set"))
+        assert is_failover_error(FakeError(503))
+        assert is_failover_error(FakeError(429))
+        assert not is_failover_error(FakeError(400))
+        assert not is_failover_error(FakeError(401))
+
+    def test_adapter_errors_carry_status_code(self):
+        """Adapters attach the HTTP status to their errors"""
+        with pytest.raises(OpenAIError) as excinfo:
+            OpenAIClient(api_key="sk-test")._parse_response(502, "bad gateway", None, "gpt-4o-mini")
+        assert excinfo.value.status_code == 502
+
+    def test_candidates_use_same_tier(self):
+        """Failover targets are same-tier models on available providers"""
+        router = make_router(
+            openai=FakeClient("openai"),
+            anthropic=FakeClient("anthropic"),
+            groq=FakeClient("groq", available=False)
+        )
+
+        assert router.candidates("openai", "gpt-4o") == [
+            ("openai", "gpt-4o"),
+            ("anthropic", "claude-3-5-sonnet-20241022"),
+        ]
+
+    def test_candidates_fit_the_context_window(self):
+        """Equivalents too small for the request are not failover targets"""
+        router = make_router(
+            openai=FakeClient("openai"),
+            anthropic=FakeClient("anthropic"),
+            groq=FakeClient("groq")
+        )
+
+        assert len(router.candidates("openai", "gpt-4o-mini", required_tokens=1000)) == 4
+        assert router.candidates("openai", "gpt-4o-mini", required_tokens=40000) == [
+            ("openai", "gpt-4o-mini"),
+            ("anthropic", "claude-3-haiku-20240307"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_long_prompt_skips_small_fallback(self):
+        """A prompt larger than a fallback's window fails over past it"""
+        groq = FakeClient("groq")
+        router = make_router(
+            openai=FakeClient("openai", error=FakeError(503)),
+            anthropic=FakeClient("anthropic", error=FakeError(503)),
+            groq=groq
+        )
+        long_prompt = [{"role": "user", "content": "word " * 30000}]
+
+        with pytest.raises(FakeError):
+            await router.complete(long_prompt, provider="openai", model="gpt-4o-mini")
+        assert groq.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_fails_over_on_5xx(self):
+        """A 5xx from the selected provider is served by an equivalent model"""
+        router = make_router(
+            openai=FakeClient("openai", error=FakeError(500)),
+            anthropic=FakeClient("anthropic")
+        )
+
+        result = await router.complete(MESSAGES, provider="openai", model="gpt-4o-mini")
+
+        assert result.content == "anthropic:claude-3-haiku-20240307"
+        assert result.attempts == 2
+        assert router.stats_for("openai", "gpt-4o-mini").error_rate == 1.0
+
+    @pytest.mark.asyncio
+    async def test_fails_over_on_timeout(self):
+        """An attempt exceeding the timeout fails over"""
+        router = make_router(
+            openai=FakeClient("openai", delay=1.0),
+            anthropic=FakeClient("anthropic")
+        )
+        router.attempt_timeout = 0.05
+
+        result = await router.complete(MESSAGES, provider="openai", model="gpt-4o-mini")
+        assert result.provider == "anthropic"
+
+    @pytest.mark.asyncio
+    async def test_client_error_is_not_retried(self):
+        """A 4xx is raised without trying other providers"""
+        anthropic = FakeClient("anthropic")
+        router = make_router(openai=FakeClient("openai", error=FakeError(400)), anthropic=anthropic)
+
+        with pytest.raises(FakeError):
+            await router.complete(MESSAGES, provider="openai", model="gpt-4o-mini")
+        assert anthropic.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_all_routes_fail(self):
+        """The last error is raised when every route fails"""
+        router = make_router(
+            openai=FakeClient("openai", error=FakeError(500)),
+            anthropic=FakeClient("anthropic", error=FakeError(503))
+        )
+
+        with pytest.raises(FakeError) as excinfo:
+            await router.complete(MESSAGES, provider="openai", model="gpt-4o-mini")
+        assert excinfo.value.status_code == 503
+
+    @pytest.mark.asyncio
+    async def test_no_available_provider(self):
+        """Unconfigured providers raise ProviderUnavailableError"""
+        router = make_router(openai=FakeClient("openai", available=False))
+
+        with pytest.raises(ProviderUnavailableError):
+            await router.complete(MESSAGES, provider="openai", model="gpt-4o-mini")
+
+    @pytest.mark.asyncio
+    async def test_hedged_request_wins(self):
+        """A slow first attempt is hedged after its p95 and the faster answer wins"""
+        openai = FakeClient("openai")
+        anthropic = FakeClient("anthropic")
+        router = make_router(openai=openai, anthropic=anthropic)
+        router.hedge = True
+        router.hedge_min_delay = 0.01
+        for _ in range(3):
+            router.stats_for("openai", "gpt-4o-mini").record_success(0.01)
+
+        openai.delay = 1.0
+        result = await router.complete(MESSAGES, provider="openai", model="gpt-4o-mini")
+
+        assert result.provider == "anthropic"
+        assert result.hedged
+        assert openai.cancelled == 1
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_samples(self):
+        """Hedging waits until the route has enough latency samples"""
+        openai = FakeClient("openai", delay=0.05)
+        anthropic = FakeClient("anthropic")
+        router = make_router(openai=openai, anthropic=anthropic)
+        router.hedge = True
+
+        result = await router.complete(MESSAGES, provider="openai", model="gpt-4o-mini")
+        assert result.provider == "openai"
+        assert anthropic.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_primary_is_demoted(self):
+        """A route with a high error rate is tried after healthy equivalents"""
+        router = make_router(openai=FakeClient("openai"), anthropic=FakeClient("anthropic"))
+        for _ in range(3):
+            router.stats_for("openai", "gpt-4o-mini").record_error()
+
+        result = await router.complete(MESSAGES, provider="openai", model="gpt-4o-mini")
+        assert result.provider == "anthropic"
+
+    @pytest.mark.asyncio
+    async def test_stream_fails_over_before_first_token(self):
+        """Streams fail over only until the first delta"""
+        router = make_router(
+            openai=FakeClient("openai", error=FakeError(502)),
+            anthropic=FakeClient("anthropic")
+        )
+
+        deltas = [d async for d in router.astream(MESSAGES, provider="openai", model="gpt-4o-mini")]
+        assert "".join(deltas) == "hello"
@@ -0,0 +1,97 @@
+import re
+from pathlib import Path
+
+from psycopg2 import errors as pg_errors
+
+import committee_service
+from app.rag.arabic import DIACRITICS, LETTER_FORMS, TATWEEL, normalize_arabic
+
+MIGRATION = Path(__file__).parent.parent / "db" / "postgres" / "migrations" / "001_rag_chunks_fulltext.sql"
+
+
+def sql_unicode_literals(sql):
+    """Decode the U&'\\XXXX...' literals of the normalize_arabic function."""
+    literals = re.findall(r"U&'((?:\\[0-9A-F]{4})+)'", sql)
+    return ["".join(chr(int(code, 16)) for code in re.findall(r"\\([0-9A-F]{4})", lit)) for lit in literals]
+
+
+class RecordingConnection:
+    def __init__(self, rows, fail_first=None):
+        self.rows = rows
+        self.fail_first = fail_first
+        self.executed = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        if self.fail_first is not None:
+            error, self.fail_first = self.fail_first, None
+            raise error
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def fetchall(self):
+        return self.rows
+
+
+class TestArabicNormalization:
+    """Test cases for Arabic normalization used by full-text search"""
+
+    def test_diacritics_and_tatweel_are_removed(self):
+        """Harakat, shadda and tatweel disappear"""
+        assert normalize_arabic("مُحَمَّـــد") == "محمد"
+
+    def test_alef_and_yaa_forms_are_unified(self):
+        """Hamza/madda alef forms become bare alef and alef maksura becomes yaa"""
+        assert normalize_arabic("أإآٱ مستشفى") == "اااا مستشفي"
+
+    def test_sql_function_matches_python(self):
+        """The migration's translate() maps exactly the same characters"""
+        literals = sql_unicode_literals(MIGRATION.read_text(encoding="utf-8"))
+        source, target = "".join(literals[:-1]), literals[-1]
+
+        assert source[: len(target)] == "".join(LETTER_FORMS)
+        assert target == "".join(LETTER_FORMS.values())
+        assert set(source[len(target):]) == set(DIACRITICS + TATWEEL)
+
+
+class TestRagQuery:
+    """Test cases for ranked full-text rag_query"""
+
+    def test_query_is_normalized_and_ranked(self):
+        """The keyword is normalized and results carry their ts_rank"""
+        conn = RecordingConnection([(3, "تعميم", "نص", 0.0759)])
+        refs = committee_service._rag_query(conn, "الإفصَاح", limit=10)
+
+        sql, params = conn.executed[0]
+        assert "websearch_to_tsquery" in sql and "ts_rank" in sql
+        assert "ILIKE" not in sql
+        assert params == ("الافصاح", 10)
+        assert refs == [{"doc_id": 3, "title": "تعميم", "snippet": "نص", "rank": 0.0759}]
+
+    def test_empty_query_skips_the_database(self):
+        """Queries that normalize to nothing return no results"""
+        conn = RecordingConnection([])
+        assert committee_service._rag_query(conn, "ـَ ") == []
+        assert conn.executed == []
+
+    def test_missing_migration_falls_back_to_ilike(self):
+        """Without search_tsv the query rolls back and uses the ILIKE scan"""
+        conn = RecordingConnection([(3, "تعميم", "نص", 0.0)], fail_first=pg_errors.UndefinedColumn())
+        refs = committee_service._rag_query(conn, " الإفصاح ", limit=4)
+
+        assert conn.rollbacks == 1
+        sql, params = conn.executed[1]
+        assert "ILIKE" in sql
+        assert params == ("%الإفصاح%", 4)
+        assert refs == [{"doc_id": 3, "title": "تعميم", "snippet": "نص", "rank": 0.0}]
@@ -0,0 +1,199 @@
+from types import SimpleNamespace
+
+import pytest
+
+from bot.core import rate_limit_backends
+from bot.core.rate_limit_backends import RedisRateLimitBackend
+from bot.core.rate_limiter import GCRARateLimiter, RateLimiter, create_rate_limiter
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestSlidingWindow:
+    """Test cases for the deque-based sliding window limiter"""
+
+    def test_limit_and_reset_time(self):
+        """The quota is enforced and resets when the oldest entry expires"""
+        clock = FakeClock()
+        limiter = RateLimiter(window_seconds=60, max_messages=2, clock=clock)
+        limiter.record_message(1)
+        clock.now += 10
+        limiter.record_message(1)
+
+        assert not limiter.check_limit(1)
+        assert limiter.get_remaining(1) == 0
+        assert limiter.get_reset_time(1) == 50
+
+        clock.now += 51
+        assert limiter.check_limit(1)
+        assert limiter.get_remaining(1) == 1
+
+    def test_deque_is_bounded(self):
+        """A user never holds more than max_messages timestamps"""
+        limiter = RateLimiter(window_seconds=60, max_messages=3, clock=FakeClock())
+        for _ in range(10):
+            limiter.record_message(1)
+
+        assert len(limiter.backend.user_logs[1]) == 3
+
+    def test_idle_users_are_swept(self):
+        """Users with nothing inside the window are forgotten"""
+        clock = FakeClock()
+        limiter = RateLimiter(window_seconds=60, max_messages=5, sweep_interval=30, clock=clock)
+        limiter.record_message(1)
+        clock.now += 40
+        limiter.record_message(2)
+
+        clock.now += 30
+        limiter.check_limit(3)
+        assert set(limiter.backend.user_logs) == {2}
+        assert limiter.get_stats() == {"backend": "memory", "users": 1, "entries": 1}
+
+    def test_acquire_and_refund(self):
+        """Acquire records atomically and refund gives the slot back"""
+        limiter = RateLimiter(window_seconds=60, max_messages=1, clock=FakeClock())
+
+        assert limiter.acquire(1)
+        assert not limiter.acquire(1)
+        limiter.refund(1)
+        assert limiter.acquire(1)
+
+
+class TestGCRA:
+    """Test cases for the GCRA limiter"""
+
+    def test_burst_then_gradual_refill(self):
+        """A full burst is allowed, then one message per emission interval"""
+        clock = FakeClock()
+        limiter = GCRARateLimiter(window_seconds=60, max_messages=3, clock=clock)
+        for _ in range(3):
+            assert limiter.check_limit(1)
+            limiter.record_message(1)
+
+        assert not limiter.check_limit(1)
+        assert limiter.get_reset_time(1) == 20
+
+        clock.now += 20
+        assert limiter.get_remaining(1) == 1
+        assert limiter.check_limit(1)
+
+    def test_sweep_drops_refilled_users(self):
+        """Users whose quota refilled completely are forgotten"""
+        clock = FakeClock()
+        limiter = GCRARateLimiter(window_seconds=60, max_messages=3, clock=clock)
+        limiter.record_message(1)
+        clock.now += 21
+
+        assert limiter.sweep() == 1
+        assert limiter.get_remaining(1) == 3
+
+    def test_factory(self):
+        """The factory selects the algorithm by name"""
+        assert isinstance(create_rate_limiter("gcra"), GCRARateLimiter)
+        assert isinstance(create_rate_limiter(), RateLimiter)
+        with pytest.raises(ValueError):
+            create_rate_limiter("leaky")
+
+
+class UnreachableRedis:
+    """Injected client whose every call fails like a dropped connection."""
+
+    def register_script(self, script):
+        def run(keys, args):
+            raise ConnectionError("connection refused")
+        return run
+
+    def zrem(self, key, member):
+        raise ConnectionError("connection refused")
+
+
+class TestRedisBackend:
+    """Test cases for the shared Redis rate limit backend"""
+
+    @pytest.fixture
+    def redis_client(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        return fakeredis.FakeRedis()
+
+    @pytest.fixture
+    def server_clock(self, monkeypatch):
+        """Drive the Redis TIME command from a fake clock"""
+        from fakeredis.commands_mixins import server_mixin
+
+        clock = FakeClock(5000.0)
+        monkeypatch.setattr(server_mixin, "time", SimpleNamespace(time=clock))
+        return clock
+
+    def test_replicas_share_one_quota(self, redis_client):
+        """Two limiters on the same Redis grant the quota only once"""
+        clock = FakeClock()
+        replicas = [
+            RateLimiter(window_seconds=60, max_messages=3, clock=clock, backend=RedisRateLimitBackend(client=redis_client))
+            for _ in range(2)
+        ]
+
+        granted = [replicas[i % 2].acquire(42) for i in range(6)]
+        assert granted == [True, True, True, False, False, False]
+        assert replicas[1].get_remaining(42) == 0
+
+    def test_window_uses_server_clock(self, redis_client, server_clock):
+        """Windows follow Redis TIME; reset times are reported on the local clock"""
+        clock = FakeClock()  # Replica clock far behind the server
+        limiter = RateLimiter(window_seconds=60, max_messages=2, clock=clock, backend=RedisRateLimitBackend(client=redis_client))
+        limiter.acquire(1)
+        server_clock.now += 10
+        clock.now += 10
+        limiter.acquire(1)
+
+        assert redis_client.zrange("bot:ratelimit:1", 0, 0, withscores=True)[0][1] == 5000.0
+        assert limiter.get_reset_time(1) == 50
+        server_clock.now += 51
+        assert limiter.get_remaining(1) == 1
+        assert redis_client.pttl("bot:ratelimit:1") > 0
+
+    def test_refund_removes_only_own_entry(self, redis_client, server_clock):
+        """Refund drops the slot its acquire added, not a newer one from another replica"""
+        clock = FakeClock()
+        replicas = [
+            RateLimiter(window_seconds=60, max_messages=3, clock=clock, backend=RedisRateLimitBackend(client=redis_client))
+            for _ in range(2)
+        ]
+        replicas[0].acquire(1)
+        server_clock.now += 1
+        replicas[1].acquire(1)
+        newer = redis_client.zrange("bot:ratelimit:1", -1, -1)
+
+        replicas[0].refund(1)
+        replicas[0].refund(1)
+        assert redis_client.zrange("bot:ratelimit:1", 0, -1) == newer
+
+    def test_refund_and_record(self, redis_client):
+        """Refund gives the slot back and record keeps at most the quota"""
+        clock = FakeClock()
+        limiter = RateLimiter(window_seconds=60, max_messages=2, clock=clock, backend=RedisRateLimitBackend(client=redis_client))
+        limiter.acquire(1)
+        limiter.refund(1)
+        assert limiter.get_remaining(1) == 2
+
+        for _ in range(5):
+            limiter.record_message(1)
+        assert redis_client.zcard("bot:ratelimit:1") == 2
+
+    def test_fails_open_without_redis_package(self, monkeypatch):
+        """An injected client still fails open when redis is not installed"""
+        monkeypatch.setattr(rate_limit_backends, "redis", None)
+        monkeypatch.setattr(rate_limit_backends, "RedisError", Exception)
+        backend = RedisRateLimitBackend(client=UnreachableRedis())
+
+        assert backend.acquire(1, now=1000.0, window=60, limit=1) == (True, 0)
+        assert backend.usage(1, now=1000.0, window=60) == (0, None)
+        backend.refund(1)  # Nothing was recorded, so nothing to give back
+        assert backend.errors == 2
+
@@ -0,0 +1,181 @@
+from types import SimpleNamespace
+
+import pytest
+
+from bot.commands.chat import process_chat_message
+from bot.core.response_cache import ResponseCache, make_cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+
+    async def achat_completion(self, messages, model, temperature, max_tokens):
+        self.calls += 1
+        return f"answer #{self.calls}"
+
+
+class FakeChatClient(FakeClient):
+    def is_available(self):
+        return True
+
+
+class FakeMessage:
+    def __init__(self):
+        self.replies = []
+
+    async def reply_text(self, text):
+        self.replies.append(text)
+
+    async def send_action(self, action):
+        pass
+
+
+def make_chat(client, cache, **bot_data):
+    """An update/context pair for ``process_chat_message`` with no session store."""
+    message = FakeMessage()
+    message.chat = message
+    update = SimpleNamespace(effective_user=SimpleNamespace(id=1), message=message)
+    context = SimpleNamespace(
+        bot_data={"openai_client": client, "response_cache": cache, **bot_data},
+        user_data={},
+    )
+    return update, context
+
+
+MESSAGES = [{"role": "system", "content": "be brief"}, {"role": "user", "content": "مرحبا"}]
+
+
+class TestResponseCache:
+    """Test cases for the completion response cache"""
+
+    def test_key_is_canonical(self):
+        """Equivalent requests share a key; any parameter change alters it"""
+        key = make_cache_key("openai", "gpt-4o-mini", MESSAGES, 0.0, 100)
+        noisy = [dict(m, tokens=3) for m in MESSAGES]
+
+        assert key == make_cache_key("openai", "gpt-4o-mini", noisy, 0.0, 100)
+        assert key != make_cache_key("groq", "gpt-4o-mini", MESSAGES, 0.0, 100)
+        assert key != make_cache_key("openai", "gpt-4o-mini", MESSAGES, 0.1, 100)
+        assert key != make_cache_key("openai", "gpt-4o-mini", MESSAGES, 0.0, 200)
+
+    def test_ttl_expiry(self):
+        """Entries expire after the TTL"""
+        clock = FakeClock()
+        cache = ResponseCache(ttl_seconds=60, clock=clock)
+        cache.set("k", "v")
+
+        clock.now += 59
+        assert cache.get("k") == "v"
+        clock.now += 2
+        assert cache.get("k") is None
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted first"""
+        cache = ResponseCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_temperature_gating(self):
+        """Only low temperatures are cached unless forced"""
+        cache = ResponseCache(max_temperature=0.2)
+
+        assert cache.is_cacheable(0.0)
+        assert not cache.is_cacheable(0.7)
+        assert not cache.is_cacheable(None)
+        assert cache.is_cacheable(0.7, force=True)
+        assert not cache.is_cacheable(0.0, force=False)
+
+    def test_sqlite_tier_persists(self, tmp_path):
+        """The SQLite tier survives a new cache instance"""
+        db_path = str(tmp_path / "cache.db")
+        cache = ResponseCache(db_path=db_path)
+        cache.set("k", {"response": "hi"})
+        cache.close()
+
+        reopened = ResponseCache(db_path=db_path)
+        assert reopened.get("k") == {"response": "hi"}
+        assert reopened.get_stats()["disk_hits"] == 1
+        assert reopened.get("k") == {"response": "hi"}
+        assert reopened.get_stats()["disk_hits"] == 1
+        reopened.close()
+
+    def test_sqlite_tier_respects_ttl(self, tmp_path):
+        """Expired disk entries are not returned"""
+        clock = FakeClock()
+        db_path = str(tmp_path / "cache.db")
+        cache = ResponseCache(ttl_seconds=10, db_path=db_path, clock=clock)
+        cache.set("k", "v")
+        cache.close()
+
+        clock.now += 11
+        assert ResponseCache(db_path=db_path, clock=clock).get("k") is None
+
+    @pytest.mark.asyncio
+    async def test_acomplete_calls_provider_once(self):
+        """Repeated low-temperature prompts hit the provider once"""
+        cache = ResponseCache()
+        client = FakeClient()
+
+        first = await cache.acomplete(client, "openai", MESSAGES, "gpt-4o-mini", 0.0, 100)
+        second = await cache.acomplete(client, "openai", MESSAGES, "gpt-4o-mini", 0.0, 100)
+
+        assert first == second == "answer #1"
+        assert client.calls == 1
+        assert cache.get_stats()["hit_rate"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_acomplete_bypasses_high_temperature(self):
+        """High-temperature prompts are not cached without opt-in"""
+        cache = ResponseCache()
+        client = FakeClient()
+
+        await cache.acomplete(client, "openai", MESSAGES, "gpt-4o-mini", 0.7, 100)
+        await cache.acomplete(client, "openai", MESSAGES, "gpt-4o-mini", 0.7, 100)
+        assert client.calls == 2
+
+        await cache.acomplete(client, "openai", MESSAGES, "gpt-4o-mini", 0.7, 100, force=True)
+        await cache.acomplete(client, "openai", MESSAGES, "gpt-4o-mini", 0.7, 100, force=True)
+        assert client.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_chat_handler_serves_cache_hit(self):
+        """A repeated chat message at a cacheable temperature skips the provider"""
+        cache = ResponseCache()
+        client = FakeChatClient()
+        update, context = make_chat(client, cache, temperature=0.1)
+
+        await process_chat_message(update, context, "مرحبا")
+        await process_chat_message(update, context, "مرحبا")
+
+        assert client.calls == 1
+        assert update.message.replies == ["answer #1", "answer #1"]
+        assert cache.get_stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_chat_handler_cache_opt_in(self):
+        """Default-temperature chat is cached only with cache_chat"""
+        client = FakeChatClient()
+        update, context = make_chat(client, ResponseCache())
+        await process_chat_message(update, context, "مرحبا")
+        await process_chat_message(update, context, "مرحبا")
+        assert client.calls == 2
+
+        update, context = make_chat(client, ResponseCache(), cache_chat=True)
+        await process_chat_message(update, context, "مرحبا")
+        await process_chat_message(update, context, "مرحبا")
+        assert client.calls == 3
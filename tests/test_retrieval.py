@@ -0,0 +1,158 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.rag.bm25 import BM25Index
+from app.rag.chunker import Chunker
+from app.rag.retrieval import RetrievalEngine
+from app.rag.vectors import HashingEmbedder, IVFIndex, VectorStore
+
+DOCS = {
+    "aml": "تلتزم البنوك بإجراءات مكافحة غسل الأموال وتمويل الإرهاب والإبلاغ عن العمليات المشبوهة.",
+    "licensing": "يشترط للحصول على ترخيص شركة التمويل تقديم طلب إلى البنك المركزي مع خطة العمل.",
+    "disclosure": "يجب على الشركات المدرجة الإفصاح عن القوائم المالية الربعية خلال ثلاثين يوما.",
+}
+
+
+def make_engine(path, **kwargs):
+    return RetrievalEngine(str(path), embedder=HashingEmbedder(dim=128), chunker=Chunker(max_tokens=64, overlap_tokens=0), **kwargs)
+
+
+class TestEmbeddingAndStore:
+    """Test cases for the hashing embedder and the memory-mapped store"""
+
+    def test_hashing_embedder_is_deterministic_and_normalized(self):
+        """Equal text gives equal unit vectors; normalization variants match"""
+        embedder = HashingEmbedder(dim=64)
+        first, second, variant = embedder.embed(["الإفصاح المالي", "الإفصاح المالي", "الافصاح المالى"])
+        assert np.allclose(first, second)
+        assert np.isclose(np.linalg.norm(first), 1.0)
+        assert np.allclose(first, variant)
+
+    def test_store_appends_and_reopens_with_memmap(self, tmp_path):
+        """Rows survive a reopen and the matrix is memory-mapped"""
+        store = VectorStore(str(tmp_path), dim=4)
+        store.add(np.eye(4, dtype=np.float32)[:2], [{"n": 0}, {"n": 1}])
+
+        reopened = VectorStore(str(tmp_path), dim=4)
+        assert len(reopened) == 2
+        assert isinstance(reopened.matrix, np.memmap)
+        assert reopened.payload(1) == {"n": 1}
+        assert reopened.search(np.array([0, 1, 0, 0], dtype=np.float32), k=1) == [(1, 1.0)]
+
+    def test_store_truncates_torn_tail(self, tmp_path):
+        """A half-written row left by a crash is dropped on open"""
+        store = VectorStore(str(tmp_path), dim=4)
+        store.add(np.ones((1, 4), dtype=np.float32), [{"n": 0}])
+        with open(store.vectors_path, "ab") as handle:
+            handle.write(b"\x00" * 6)
+        with open(store.meta_path, "ab") as handle:
+            handle.write(b'{"n": 1}\n{"n"')
+
+        reopened = VectorStore(str(tmp_path), dim=4)
+        assert len(reopened) == 1
+        reopened.add(np.zeros((1, 4), dtype=np.float32), [{"n": 2}])
+        assert VectorStore(str(tmp_path), dim=4).payload(1) == {"n": 2}
+
+    def test_dimension_mismatch_is_rejected(self, tmp_path):
+        """Opening a store with another embedder configuration fails loudly"""
+        VectorStore(str(tmp_path), dim=4)
+        with pytest.raises(ValueError):
+            VectorStore(str(tmp_path), dim=8)
+
+    def test_ivf_probes_the_nearest_lists(self):
+        """IVF candidates come from the lists closest to the query"""
+        rng = np.random.default_rng(1)
+        centers = np.eye(8, dtype=np.float32)[:4]
+        matrix = np.repeat(centers, 50, axis=0) + rng.normal(0, 0.01, (200, 8)).astype(np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+
+        ivf = IVFIndex.train(matrix, nlist=4)
+        candidates = ivf.candidates(centers[2], nprobe=1)
+        assert len(candidates) == 50
+        assert set(candidates) == set(range(100, 150))
+
+
+class TestRetrievalEngine:
+    """Test cases for vector, BM25 and hybrid retrieval"""
+
+    def test_modes_find_the_relevant_document(self, tmp_path):
+        """Every mode ranks the matching document first"""
+        engine = make_engine(tmp_path)
+        for doc_id, text in DOCS.items():
+            engine.add_document(doc_id, doc_id, text, "committee", text_sha1=doc_id)
+
+        for mode in ("vector", "bm25", "hybrid"):
+            hits = engine.search("غسل الاموال", k=2, mode=mode)
+            assert hits[0]["doc_id"] == "aml", mode
+            assert hits[0]["source"] == "committee"
+
+    def test_ivf_search_after_reopen(self, tmp_path):
+        """A trained IVF index is persisted and also covers rows added later"""
+        engine = make_engine(tmp_path)
+        engine.add_document("aml", "aml", DOCS["aml"], "committee", text_sha1="a")
+        engine.add_document("licensing", "licensing", DOCS["licensing"], "committee", text_sha1="l")
+        engine.build_ivf(nlist=2)
+        engine.add_document("disclosure", "disclosure", DOCS["disclosure"], "committee", text_sha1="d")
+
+        reopened = make_engine(tmp_path, nprobe=2)
+        assert len(reopened.ivf.assignments) == len(reopened) == 3
+        assert reopened.search("الافصاح عن القوائم المالية", k=1, mode="vector")[0]["doc_id"] == "disclosure"
+
+    def test_reindexing_is_idempotent_and_supersedes_old_versions(self, tmp_path):
+        """Same text is skipped; a new version hides the old chunks"""
+        engine = make_engine(tmp_path)
+        assert engine.add_document("c1", "تعميم", DOCS["aml"], "sama", text_sha1="v1") == 1
+        assert engine.add_document("c1", "تعميم", DOCS["aml"], "sama", text_sha1="v1") == 0
+        engine.add_document("c1", "تعميم", DOCS["licensing"], "sama", text_sha1="v2")
+
+        for current in (engine, make_engine(tmp_path)):
+            hits = current.search("غسل الاموال ترخيص", k=5, mode="hybrid")
+            assert [h["text_sha1"] for h in hits] == ["v2"]
+
+    def test_index_jsonl_reads_ingestion_records(self, tmp_path):
+        """SAMA ingestion records are chunked and indexed from the JSONL"""
+        index = tmp_path / "index.jsonl"
+        records = [{"doc_id": k, "title": k, "content": v, "text_sha1": k} for k, v in DOCS.items()]
+        index.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in records) + "\n", encoding="utf-8")
+
+        engine = make_engine(tmp_path / "vectors")
+        assert engine.index_jsonl(str(index)) == 3
+        assert engine.search("ترخيص شركة التمويل", k=1, mode="bm25")[0]["doc_id"] == "licensing"
+
+    def test_bm25_prefers_rarer_terms(self):
+        """Rare terms outweigh common ones in BM25 scoring"""
+        bm25 = BM25Index()
+        bm25.add(0, ["بنك", "ترخيص"])
+        bm25.add(1, ["بنك", "غرامة"])
+        bm25.add(2, ["بنك"])
+        assert bm25.search(["بنك", "غرامة"], k=1)[0][0] == 1
+
+    def test_query_endpoint_hybrid_mode(self, tmp_path, monkeypatch):
+        """/v1/rag/query serves local hybrid results without Postgres"""
+        from fastapi.testclient import TestClient
+
+        import committee_service
+
+        engine = make_engine(tmp_path)
+        engine.add_document(9, "قرار", DOCS["disclosure"], "committee", text_sha1="x")
+        monkeypatch.setattr(committee_service, "get_engine", lambda: engine)
+
+        response = TestClient(committee_service.app).get("/v1/rag/query", params={"q": "الإفصاح", "mode": "hybrid"})
+        assert response.status_code == 200
+        assert response.json()["refs"][0]["doc_id"] == 9
+
+    def test_query_endpoint_without_rag_extra(self, monkeypatch):
+        """Local modes answer 503 when the optional numpy dependency is missing"""
+        from fastapi.testclient import TestClient
+
+        import committee_service
+
+        def missing_engine():
+            raise ImportError("numpy is required for local retrieval: pip install '.[rag]'")
+
+        monkeypatch.setattr(committee_service, "get_engine", missing_engine)
+        response = TestClient(committee_service.app).get("/v1/rag/query", params={"q": "الإفصاح", "mode": "bm25"})
+        assert response.status_code == 503
+        assert "numpy" in response.json()["detail"]
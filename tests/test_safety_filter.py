@@ -0,0 +1,103 @@
+from bot.utils.safety_filter import SafetyFilter
+from bot.utils.secret_scanner import DEFAULT_RULES, SecretRule, SecretScanner, load_guardrail_rules
+from bot.utils.stream_scanner import StreamScanner
+
+OPENAI_KEY = "sk-" + "A1b2C3d4E5" * 3
+GITHUB_TOKEN = "ghp_" + "x" * 36
+GOOGLE_OAUTH = "1234567890-" + "a" * 32 + ".apps.googleusercontent.com"
+
+
+class TestSecretScanner:
+    """Test cases for the single-pass secret scanner"""
+
+    def test_detect_and_mask_in_one_pass(self):
+        """Every secret is masked and reported once, in order of appearance"""
+        text = f"key {OPENAI_KEY} and {GITHUB_TOKEN} again {OPENAI_KEY}."
+        masked, detected = SecretScanner().scan_and_mask(text)
+
+        assert masked == "key [SECRET_REDACTED] and [SECRET_REDACTED] again [SECRET_REDACTED]."
+        assert detected == ["OpenAI API key", "GitHub Personal Access Token"]
+
+    def test_key_formats_are_case_sensitive(self):
+        """Lower-cased look-alikes of case-sensitive prefixes are ignored"""
+        scanner = SecretScanner()
+
+        assert scanner.scan("akia" + "ABCDEFGHIJKLMNOP") == []
+        assert scanner.scan("AKIA" + "ABCDEFGHIJKLMNOP") == ["AWS Access Key"]
+        assert scanner.scan("BEARER aaa.bbb.ccc") == ["JWT Token"]
+
+    def test_trigger_at_end_of_secret(self):
+        """Rules triggered by a suffix search backwards for the full secret"""
+        masked, detected = SecretScanner().scan_and_mask(f"client {GOOGLE_OAUTH} end")
+
+        assert masked == "client [SECRET_REDACTED] end"
+        assert detected == ["Google OAuth"]
+
+    def test_near_misses_and_clean_text(self):
+        """Short candidates are skipped and clean text is returned unchanged"""
+        text = "task-list sk-short مرحبا ghp_tooShort"
+        assert SecretScanner().scan_and_mask(text) == (text, [])
+
+    def test_custom_rules(self):
+        """Custom rule sets are compiled into the same dispatch"""
+        scanner = SecretScanner([SecretRule("Internal token", r'tok_[0-9]{8}', r'tok_')])
+        assert scanner.scan_and_mask("x tok_12345678 y") == ("x [SECRET_REDACTED] y", ["Internal token"])
+
+
+class TestSafetyFilter:
+    """Test cases for SafetyFilter on top of the scanner"""
+
+    def test_filter_input_blocks_secrets(self):
+        """Inputs with secrets are rejected with the detected types"""
+        is_safe, warning, detected = SafetyFilter().filter_input(f"my key is {OPENAI_KEY}")
+
+        assert not is_safe
+        assert detected == ["OpenAI API key"]
+        assert "OpenAI API key" in warning
+
+    def test_mask_secrets(self):
+        """Masking for logs replaces secrets only"""
+        assert SafetyFilter().mask_secrets(f"token={GITHUB_TOKEN}") == "token=[SECRET_REDACTED]"
+
+
+class TestStreamScanner:
+    """Test cases for chunked secret/PII scanning"""
+
+    def test_secret_split_across_chunks(self):
+        """A secret straddling a chunk boundary is still masked"""
+        text = "x" * 90 + f" {OPENAI_KEY} " + "y" * 90
+        scanner = StreamScanner(scanner=SecretScanner(), chunk_size=16, overlap=64)
+        chunks = [text[i:i + 7] for i in range(0, len(text), 7)]
+
+        masked = "".join(scanner.iter_masked(chunks))
+        assert masked == "x" * 90 + " [SECRET_REDACTED] " + "y" * 90
+
+    def test_unbounded_match_held_until_it_ends(self):
+        """A match running to the buffer end waits for the next chunk"""
+        key = "sk-" + "a" * 200
+        scanner = StreamScanner(scanner=SecretScanner(), chunk_size=32, overlap=8)
+
+        assert "".join(scanner.iter_masked(iter([key[:50], key[50:120], key[120:] + " done"]))) == (
+            "[SECRET_REDACTED] done"
+        )
+
+    def test_guardrail_pii_rules_from_binary_file(self, tmp_path):
+        """PII patterns from guardrails.yaml apply to binary file objects"""
+        path = tmp_path / "upload.log"
+        path.write_bytes(("مرحبا user@example.com ssn 123-45-6789 " * 50).encode("utf-8"))
+        scanner = StreamScanner(scanner=SecretScanner(load_guardrail_rules()), chunk_size=100, overlap=64)
+
+        with path.open("rb") as f:
+            result = scanner.scan(f, keep=45)
+
+        assert result.counts == {"Email": 50, "Social Security Number": 50}
+        assert result.text == "مرحبا [SECRET_REDACTED] ssn [SECRET_REDACTED]"
+        assert result.truncated
+
+    def test_masked_output_matches_whole_text_scan(self):
+        """Chunked output equals a single in-memory pass"""
+        text = " ".join([OPENAI_KEY, "a@b.io", GITHUB_TOKEN, GOOGLE_OAUTH] * 30)
+        whole = SecretScanner(list(DEFAULT_RULES) + load_guardrail_rules())
+        scanner = StreamScanner(scanner=whole, chunk_size=50, overlap=160)
+
+        assert "".join(scanner.iter_masked(text)) == whole.scan_and_mask(text)[0]
@@ -0,0 +1,264 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from bot.commands.advanced import cmd_regen
+from bot.core.session_backends import SQLiteSessionBackend, migrate_json_to_sqlite
+from bot.core.session_store import SessionStore
+
+
+@pytest.fixture
+def journal_store(tmp_path):
+    store = SessionStore(base_path=str(tmp_path), journal=True, compact_threshold=1000)
+    yield store
+    store.close()
+
+
+class TestJournalMode:
+    """Test cases for the journaled session storage mode"""
+
+    def test_append_writes_journal_not_snapshot(self, journal_store, tmp_path):
+        """Appends go to the JSONL journal and leave the snapshot untouched"""
+        journal_store.create_session(1, "default")
+        snapshot = (tmp_path / "1" / "default.json").read_text(encoding="utf-8")
+
+        journal_store.append_message(1, "default", "user", "مرحبا")
+        journal_store.append_message(1, "default", "assistant", "أهلاً")
+
+        assert (tmp_path / "1" / "default.json").read_text(encoding="utf-8") == snapshot
+        lines = (tmp_path / "1" / "default.jsonl").read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])["message"]["content"] == "مرحبا"
+        assert journal_store.get_messages(1, "default") == [
+            {"role": "user", "content": "مرحبا"},
+            {"role": "assistant", "content": "أهلاً"},
+        ]
+
+    def test_metadata_and_clear_are_replayed(self, journal_store):
+        """Metadata updates and clears are journaled and replayed in order"""
+        journal_store.append_message(1, "default", "user", "one")
+        journal_store.update_metadata(1, "default", "model", "gpt-4o")
+        journal_store.clear_session(1, "default")
+        journal_store.append_message(1, "default", "user", "two")
+
+        assert journal_store.get_metadata(1, "default", "model") == "gpt-4o"
+        assert journal_store.get_messages(1, "default") == [{"role": "user", "content": "two"}]
+
+    def test_compaction_trims_and_truncates_journal(self, journal_store, tmp_path):
+        """Compaction folds the journal into the snapshot and applies max_messages"""
+        journal_store.max_messages = 3
+        for i in range(5):
+            journal_store.append_message(1, "default", "user", f"m{i}")
+
+        assert journal_store.compact_session(1, "default")
+        assert not (tmp_path / "1" / "default.jsonl").exists()
+
+        with (tmp_path / "1" / "default.json").open(encoding="utf-8") as f:
+            snapshot = json.load(f)
+        assert [m["content"] for m in snapshot["messages"]] == ["m2", "m3", "m4"]
+
+    def test_background_compaction_on_threshold(self, tmp_path):
+        """Reaching the threshold compacts the session in the background"""
+        store = SessionStore(base_path=str(tmp_path), journal=True, compact_threshold=2)
+        store.append_message(1, "default", "user", "a")
+        store.append_message(1, "default", "user", "b")
+        store.close()
+
+        assert not (tmp_path / "1" / "default.jsonl").exists()
+        reopened = SessionStore(base_path=str(tmp_path), journal=True)
+        assert [m["content"] for m in reopened.get_messages(1, "default")] == ["a", "b"]
+
+    def test_torn_journal_line_is_skipped(self, journal_store, tmp_path):
+        """A partially written trailing line does not break loading"""
+        journal_store.append_message(1, "default", "user", "ok")
+        with (tmp_path / "1" / "default.jsonl").open("a", encoding="utf-8") as f:
+            f.write('{"op": "append", "mess')
+
+        assert journal_store.get_messages(1, "default") == [{"role": "user", "content": "ok"}]
+
+    def test_snapshot_mode_unchanged(self, tmp_path):
+        """Default mode still rewrites the JSON snapshot without a journal"""
+        store = SessionStore(base_path=str(tmp_path))
+        store.append_message(1, "default", "user", "hello")
+
+        assert not (tmp_path / "1" / "default.jsonl").exists()
+        with (tmp_path / "1" / "default.json").open(encoding="utf-8") as f:
+            assert json.load(f)["messages"][0]["content"] == "hello"
+
+
+class TestSessionCache:
+    """Test cases for the LRU write-back session cache"""
+
+    def test_turn_reads_disk_once(self, tmp_path):
+        """Repeated reads in one turn are served from the cache"""
+        store = SessionStore(base_path=str(tmp_path), cache_size=4, flush_interval=0)
+        store.create_session(1, "default")
+
+        store.get_metadata(1, "default", "provider")
+        store.get_metadata(1, "default", "model")
+        store.append_message(1, "default", "user", "hi")
+        store.get_messages(1, "default")
+        store.append_message(1, "default", "assistant", "hello")
+
+        stats = store.get_cache_stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 4
+        assert stats["dirty"] == 1
+
+    def test_writes_are_deferred_until_flush(self, tmp_path):
+        """Dirty sessions reach disk only when flushed"""
+        store = SessionStore(base_path=str(tmp_path), cache_size=4, flush_interval=0)
+        store.append_message(1, "default", "user", "hi")
+
+        on_disk = SessionStore(base_path=str(tmp_path))
+        assert on_disk.get_messages(1, "default") == []
+
+        assert store.flush() == 1
+        assert on_disk.get_messages(1, "default") == [{"role": "user", "content": "hi"}]
+
+    def test_eviction_flushes_dirty_session(self, tmp_path):
+        """Evicting a dirty session writes it back first"""
+        store = SessionStore(base_path=str(tmp_path), cache_size=1, flush_interval=0)
+        store.append_message(1, "default", "user", "first")
+        store.append_message(2, "default", "user", "second")
+
+        assert store.get_cache_stats()["evictions"] == 1
+        on_disk = SessionStore(base_path=str(tmp_path))
+        assert on_disk.get_messages(1, "default") == [{"role": "user", "content": "first"}]
+
+    def test_failed_flush_keeps_session_dirty(self, tmp_path, monkeypatch):
+        """A session whose write fails is retried by the next flush"""
+        store = SessionStore(base_path=str(tmp_path), cache_size=4, flush_interval=0)
+        store.append_message(1, "default", "user", "hi")
+
+        monkeypatch.setattr(store.backend, "save", lambda *args: False)
+        assert store.flush() == 0
+        assert store.get_cache_stats()["dirty"] == 1
+
+        monkeypatch.undo()
+        assert store.flush() == 1
+        on_disk = SessionStore(base_path=str(tmp_path))
+        assert on_disk.get_messages(1, "default") == [{"role": "user", "content": "hi"}]
+
+    def test_failed_eviction_keeps_session_cached(self, tmp_path, monkeypatch):
+        """An evicted session that cannot be written stays in memory and dirty"""
+        store = SessionStore(base_path=str(tmp_path), cache_size=1, flush_interval=0)
+        store.append_message(1, "default", "user", "first")
+
+        def fail(*args):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(store.backend, "save", fail)
+        store.append_message(2, "default", "user", "second")
+        assert store.get_cache_stats()["dirty"] == 2
+        assert store.get_messages(1, "default") == [{"role": "user", "content": "first"}]
+
+        monkeypatch.undo()
+        assert store.flush() == 2
+        on_disk = SessionStore(base_path=str(tmp_path))
+        assert on_disk.get_messages(1, "default") == [{"role": "user", "content": "first"}]
+
+    def test_get_session_returns_a_copy(self, tmp_path):
+        """Editing a fetched session changes nothing until it is saved"""
+        store = SessionStore(base_path=str(tmp_path), cache_size=4, flush_interval=0)
+        store.append_message(1, "default", "user", "hi")
+
+        store.get_session(1, "default")["messages"].pop()
+        assert store.get_messages(1, "default") == [{"role": "user", "content": "hi"}]
+
+    def test_regen_without_provider_keeps_last_reply(self, tmp_path):
+        """/regen returning early leaves the cached session untouched"""
+        store = SessionStore(base_path=str(tmp_path), cache_size=4, flush_interval=0)
+        store.append_message(1, "default", "user", "hi")
+        store.append_message(1, "default", "assistant", "hello")
+
+        replies = []
+
+        async def reply_text(text):
+            replies.append(text)
+
+        update = SimpleNamespace(effective_user=SimpleNamespace(id=1), message=SimpleNamespace(reply_text=reply_text))
+        context = SimpleNamespace(bot_data={"session_store": store}, user_data={})
+        asyncio.run(cmd_regen(update, context))
+
+        assert "غير مهيأ" in replies[0]
+        assert [m["role"] for m in store.get_messages(1, "default")] == ["user", "assistant"]
+
+    def test_cache_with_journal_appends_pending_entries(self, tmp_path):
+        """In journal mode, a flush appends the pending entries to the journal"""
+        store = SessionStore(base_path=str(tmp_path), journal=True, cache_size=4, flush_interval=0)
+        store.append_message(1, "default", "user", "a")
+        store.append_message(1, "default", "assistant", "b")
+        store.flush()
+
+        lines = (tmp_path / "1" / "default.jsonl").read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 2
+        store.close()
+
+
+class TestSQLiteBackend:
+    """Test cases for the SQLite session backend"""
+
+    @pytest.fixture
+    def sqlite_store(self, tmp_path):
+        store = SessionStore(backend=SQLiteSessionBackend(str(tmp_path / "sessions.db")))
+        yield store
+        store.close()
+
+    def test_append_trim_and_metadata(self, sqlite_store):
+        """Appends, trimming and metadata round-trip through SQLite"""
+        sqlite_store.max_messages = 2
+        for i in range(3):
+            sqlite_store.append_message(1, "default", "user", f"m{i}")
+        sqlite_store.update_metadata(1, "default", "persona", "engineer")
+
+        assert sqlite_store.get_messages(1, "default") == [
+            {"role": "user", "content": "m1"},
+            {"role": "user", "content": "m2"},
+        ]
+        assert sqlite_store.get_metadata(1, "default", "persona") == "engineer"
+        assert sqlite_store.get_metadata(1, "default", "missing", "x") == "x"
+
+    def test_trim_of_missing_session_is_a_no_op(self, tmp_path):
+        """Trimming a session deleted in the meantime does not raise"""
+        backend = SQLiteSessionBackend(str(tmp_path / "sessions.db"))
+        backend._trim(backend._conn.cursor(), 1, "gone")
+        backend.close()
+
+    def test_list_sessions_uses_summary_columns(self, sqlite_store):
+        """Listing reports counts and metadata ordered by last update"""
+        sqlite_store.create_session(1, "work")
+        sqlite_store.append_message(1, "default", "user", "hi")
+        sqlite_store.append_message(1, "work", "user", "later")
+
+        sessions = sqlite_store.list_sessions(1)
+        assert [s["name"] for s in sessions] == ["work", "default"]
+        assert sessions[0]["message_count"] == 1
+        assert sessions[0]["provider"] == "openai"
+
+    def test_delete_and_clear(self, sqlite_store):
+        """Deleting removes the session, clearing keeps it empty"""
+        sqlite_store.create_session(1, "tmp")
+        assert sqlite_store.delete_session(1, "tmp")
+        assert sqlite_store.get_session(1, "tmp") is None
+
+        sqlite_store.append_message(1, "default", "user", "hi")
+        sqlite_store.clear_session(1, "default")
+        assert sqlite_store.get_messages(1, "default") == []
+
+    def test_migrate_json_tree(self, tmp_path):
+        """The migration tool imports snapshots and pending journals"""
+        json_store = SessionStore(base_path=str(tmp_path / "sessions"), journal=True)
+        json_store.append_message(7, "default", "user", "from journal")
+        json_store.update_metadata(7, "default", "model", "gpt-4o")
+
+        db_path = str(tmp_path / "sessions.db")
+        assert migrate_json_to_sqlite(str(tmp_path / "sessions"), db_path) == 1
+        assert migrate_json_to_sqlite(str(tmp_path / "sessions"), db_path) == 0
+
+        store = SessionStore(backend=SQLiteSessionBackend(db_path))
+        assert store.get_messages(7, "default") == [{"role": "user", "content": "from journal"}]
+        assert store.get_metadata(7, "default", "model") == "gpt-4o"
+        store.close()
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from bot.core.singleflight import SingleFlight
+
+
+class CountingCall:
+    def __init__(self, delay=0.05, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return f"result #{self.calls}"
+
+
+class TestSingleFlight:
+    """Test cases for in-flight request coalescing"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_request(self):
+        """Identical concurrent calls run the factory once"""
+        flight = SingleFlight()
+        call = CountingCall()
+
+        results = await asyncio.gather(*[flight.do("k", call) for _ in range(5)])
+
+        assert results == ["result #1"] * 5
+        assert call.calls == 1
+        assert flight.get_stats()["coalesced"] == 4
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_separately(self):
+        """Calls with different keys are not merged"""
+        flight = SingleFlight()
+        call = CountingCall()
+
+        await asyncio.gather(flight.do("a", call), flight.do("b", call))
+        assert call.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_key_released_after_completion(self):
+        """A finished call is not reused by later callers"""
+        flight = SingleFlight()
+        call = CountingCall(delay=0)
+
+        assert await flight.do("k", call) == "result #1"
+        assert await flight.do("k", call) == "result #2"
+        assert flight.inflight == 0
+
+    @pytest.mark.asyncio
+    async def test_error_reaches_every_caller(self):
+        """All joined callers receive the shared exception"""
+        flight = SingleFlight()
+        call = CountingCall(error=RuntimeError("upstream down"))
+
+        results = await asyncio.gather(*[flight.do("k", call) for _ in range(3)], return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert call.calls == 1
+        assert flight.inflight == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """One caller giving up leaves the shared request running"""
+        flight = SingleFlight()
+        call = CountingCall(delay=0.1)
+
+        first = asyncio.ensure_future(flight.do("k", call))
+        second = asyncio.ensure_future(flight.do("k", call))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == "result #1"
+        assert first.cancelled()
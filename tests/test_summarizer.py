@@ -0,0 +1,112 @@
+import pytest
+
+from bot.core.context_builder import ContextBuilder
+from bot.core.session_backends import SQLiteSessionBackend
+from bot.core.session_store import SessionStore
+from bot.core.summarizer import ConversationSummarizer
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    async def achat_completion(self, messages, model, temperature, max_tokens):
+        self.calls.append(messages)
+        return f"summary #{len(self.calls)}"
+
+
+def fill(store, turns, size=200, start=0):
+    for i in range(start, start + turns):
+        store.append_message(1, "default", "user", f"q{i} " + "x" * size)
+        store.append_message(1, "default", "assistant", f"a{i} " + "y" * size)
+
+
+class TestConversationSummarizer:
+    """Test cases for the rolling conversation summary"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return SessionStore(base_path=str(tmp_path))
+
+    @pytest.mark.asyncio
+    async def test_below_threshold_does_nothing(self, store):
+        """Short sessions are not summarized"""
+        fill(store, 2)
+        client = FakeClient()
+
+        assert not await ConversationSummarizer(threshold_tokens=1000).maybe_summarize(
+            store, client, "gpt-4o-mini", 1, "default"
+        )
+        assert client.calls == []
+
+    @pytest.mark.asyncio
+    async def test_folds_old_turns_incrementally(self, store):
+        """Each run only sends the previous summary and newly folded turns"""
+        summarizer = ConversationSummarizer(threshold_tokens=300, keep_recent_tokens=120)
+        client = FakeClient()
+        fill(store, 4)
+
+        assert await summarizer.maybe_summarize(store, client, "gpt-4o-mini", 1, "default")
+        history = store.get_history(1, "default")
+        upto = store.get_metadata(1, "default", "summary_upto")
+        folded, pending = summarizer.split_history(history, upto)
+        assert store.get_metadata(1, "default", "summary") == "summary #1"
+        assert pending[0]["role"] == "user"
+        assert len(folded) == 6
+
+        fill(store, 3, start=4)
+        assert await summarizer.maybe_summarize(store, client, "gpt-4o-mini", 1, "default")
+        second_request = client.calls[1][1]["content"]
+        assert "summary #1" in second_request
+        assert "q0 " not in second_request and "q3 " in second_request and "q6 " not in second_request
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("kind", ["json", "journal", "cached", "sqlite"])
+    async def test_trimming_keeps_unsummarized_turns(self, tmp_path, kind):
+        """A max_messages below the summary trigger only drops folded turns"""
+        if kind == "sqlite":
+            store = SessionStore(backend=SQLiteSessionBackend(str(tmp_path / "sessions.db")))
+        else:
+            store = SessionStore(
+                base_path=str(tmp_path), journal=kind == "journal", cache_size=4 if kind == "cached" else 0
+            )
+        store.max_messages = 4
+        store.keep_unsummarized = True
+        summarizer = ConversationSummarizer(threshold_tokens=300, keep_recent_tokens=120)
+        client = FakeClient()
+
+        fill(store, 4)
+        assert len(store.get_history(1, "default")) == 8
+
+        assert await summarizer.maybe_summarize(store, client, "gpt-4o-mini", 1, "default")
+        assert "q0 " in client.calls[0][1]["content"]
+
+        store.append_message(1, "default", "user", "q4")
+        history = store.get_history(1, "default")
+        _, pending = summarizer.split_history(history, store.get_metadata(1, "default", "summary_upto"))
+        assert len(history) == 4
+        assert [m["content"][:2] for m in pending] == ["q3", "a3", "q4"]
+
+    def test_context_uses_summary_and_recent_turns(self, store):
+        """The prompt carries the summary followed by unsummarized turns only"""
+        fill(store, 3)
+        history = store.get_history(1, "default")
+        store.update_metadata(1, "default", "summary", "earlier stuff")
+        store.update_metadata(1, "default", "summary_upto", history[3]["timestamp"])
+
+        _, recent = ConversationSummarizer.split_history(history, history[3]["timestamp"])
+        messages, _ = ContextBuilder().build(recent, "gpt-4o-mini", 500, system_prompt="sys", summary="earlier stuff")
+
+        assert messages[0]["content"] == "sys"
+        assert "earlier stuff" in messages[1]["content"]
+        assert [m["content"][:2] for m in messages[2:]] == ["q2", "a2"]
+
+    def test_clear_resets_summary(self, store):
+        """Clearing a session drops its running summary"""
+        fill(store, 1)
+        store.update_metadata(1, "default", "summary", "old")
+        store.update_metadata(1, "default", "summary_upto", "2020-01-01T00:00:00")
+
+        store.clear_session(1, "default")
+        assert store.get_metadata(1, "default", "summary") is None
+        assert store.get_metadata(1, "default", "summary_upto") is None